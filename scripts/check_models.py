@@ -1,76 +1,222 @@
 #!/usr/bin/env python3
 """
-Script para verificar informações dos modelos TFLite
+Matriz de desempenho dos modelos TFLite
+
+Descobre todos os .tflite em data/models e mede cada um em cada combinação
+de `num_threads` e delegate disponível:
+
+- tempo de carga (Interpreter + delegate) e de `allocate_tensors`
+- latência do primeiro invoke e em regime permanente (p50/p90)
+- pico de RSS do processo
+- parâmetros de quantização de entradas e saídas
+
+Cada medição roda em um processo novo: o pico de RSS fica isolado e um
+delegate que derruba o processo vira apenas uma linha "falhou" na tabela.
+
+    python scripts/check_models.py --threads 1,2,4 --json model_matrix.json
 """
 
+import argparse
+import glob
+import json
+import multiprocessing
 import os
 import sys
+import time
+
+import numpy as np
 
-def check_model_info():
-    """Verifica informações dos modelos disponíveis"""
-    
-    # Importar TensorFlow Lite
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+from delegate_cache import VX_DELEGATE_SEARCH_PATHS
+from delegate_chain import DELEGATE_KINDS, build_interpreter
+
+# Delegates: 'vx' = NPU via libvx_delegate, 'xnnpack' = resolvedor padrão do
+# runtime (XNNPACK incluso), 'builtin' = kernels otimizados sem delegates padrão,
+# 'reference' = kernels de referência (lentos; só para comparação)
+DELEGATES = DELEGATE_KINDS
+
+
+def load_tflite():
     try:
         import tflite_runtime.interpreter as tflite
-        print("✅ TensorFlow Lite Runtime disponível")
+        return tflite
     except ImportError:
-        try:
-            import tensorflow as tf
-            tflite = tf.lite
-            print("✅ TensorFlow Lite (do TensorFlow completo) disponível")
-        except ImportError:
-            print("❌ TensorFlow Lite não disponível")
-            return False
-    
-    models_dir = "/app/data/models"
-    models = [
-        "best_int8.tflite",
-        "best_float32_edgetpu.tflite", 
-        "best_float32.tflite"
-    ]
-    
-    print(f"\n📁 Verificando modelos em: {models_dir}")
-    
-    for model_name in models:
-        model_path = os.path.join(models_dir, model_name)
-        print(f"\n🔍 Analisando: {model_name}")
-        
-        if not os.path.exists(model_path):
-            print(f"   ❌ Arquivo não encontrado: {model_path}")
+        import tensorflow as tf
+        return tf.lite
+
+
+def find_vx_library():
+    return next((p for p in VX_DELEGATE_SEARCH_PATHS if os.path.exists(p)), None)
+
+
+def available_delegates():
+    delegates = ['xnnpack', 'builtin']
+    if find_vx_library():
+        delegates.insert(0, 'vx')
+    return delegates
+
+
+def read_peak_rss_mb():
+    """Pico de RSS (VmHWM) do processo atual"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def quantization_info(details):
+    return [{
+        'name': d['name'],
+        'shape': [int(v) for v in d['shape']],
+        'dtype': np.dtype(d['dtype']).name,
+        'scale': float(d['quantization'][0]),
+        'zero_point': int(d['quantization'][1]),
+    } for d in details]
+
+
+def _measure(model_path, delegate, num_threads, iterations, queue):
+    """Executado em processo próprio; envia o resultado pela fila"""
+    try:
+        tflite = load_tflite()
+        rss_before = read_peak_rss_mb()
+
+        start = time.perf_counter()
+        interpreter = build_interpreter(tflite, model_path, delegate, num_threads, vx_library=find_vx_library())
+        load_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        interpreter.allocate_tensors()
+        allocate_ms = (time.perf_counter() - start) * 1000
+
+        detail = interpreter.get_input_details()[0]
+        dtype = detail['dtype']
+        if np.issubdtype(dtype, np.integer):
+            info = np.iinfo(dtype)
+            data = np.random.randint(info.min, info.max + 1, size=detail['shape']).astype(dtype)
+        else:
+            data = np.random.random_sample(detail['shape']).astype(dtype)
+        interpreter.set_tensor(detail['index'], data)
+
+        start = time.perf_counter()
+        interpreter.invoke()
+        first_ms = (time.perf_counter() - start) * 1000
+
+        latencies = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            interpreter.invoke()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        queue.put({
+            'status': 'ok',
+            'load_ms': load_ms,
+            'allocate_ms': allocate_ms,
+            'first_invoke_ms': first_ms,
+            'steady_p50_ms': float(np.percentile(latencies, 50)),
+            'steady_p90_ms': float(np.percentile(latencies, 90)),
+            'peak_rss_mb': read_peak_rss_mb(),
+            'baseline_rss_mb': rss_before,
+            'inputs': quantization_info(interpreter.get_input_details()),
+            'outputs': quantization_info(interpreter.get_output_details()),
+        })
+    except Exception as e:
+        queue.put({'status': 'failed', 'error': str(e)})
+
+
+def measure(model_path, delegate, num_threads, iterations, timeout):
+    """Mede uma combinação em processo isolado (crash ou travamento viram falha)"""
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_measure, args=(model_path, delegate, num_threads, iterations, queue))
+    process.start()
+    try:
+        result = queue.get(timeout=timeout)
+    except Exception:
+        result = None
+    process.join(timeout=5)
+    if process.is_alive():
+        process.kill()
+        process.join()
+    if result is None:
+        result = {'status': 'failed', 'error': f"processo terminou sem resultado (exit {process.exitcode})"}
+    result.update({
+        'model': os.path.basename(model_path),
+        'size_mb': os.path.getsize(model_path) / 1024 ** 2,
+        'delegate': delegate,
+        'num_threads': num_threads,
+    })
+    return result
+
+
+def print_table(results):
+    header = (f"{'modelo':<40} {'deleg.':<9} {'thr':>3} {'carga':>7} {'alloc':>7} "
+              f"{'1º inv':>8} {'p50':>7} {'p90':>7} {'RSS MB':>7}")
+    print('\n' + header)
+    print('-' * len(header))
+    for r in results:
+        prefix = f"{r['model']:<40} {r['delegate']:<9} {r['num_threads']:>3}"
+        if r['status'] != 'ok':
+            print(f"{prefix} falhou: {r['error'][:60]}")
+            continue
+        print(f"{prefix} {r['load_ms']:>7.1f} {r['allocate_ms']:>7.1f} {r['first_invoke_ms']:>8.1f} "
+              f"{r['steady_p50_ms']:>7.1f} {r['steady_p90_ms']:>7.1f} {r['peak_rss_mb']:>7.1f}")
+
+    print("\nQuantização (entrada -> saídas):")
+    seen = set()
+    for r in results:
+        if r['status'] != 'ok' or r['model'] in seen:
             continue
-            
-        try:
-            # Carregar modelo
-            interpreter = tflite.Interpreter(model_path=model_path)
-            interpreter.allocate_tensors()
-            
-            # Obter detalhes de entrada
-            input_details = interpreter.get_input_details()
-            output_details = interpreter.get_output_details()
-            
-            print(f"   ✅ Modelo carregado com sucesso")
-            print(f"   📊 Input shape: {input_details[0]['shape']}")
-            print(f"   🔢 Input dtype: {input_details[0]['dtype']}")
-            print(f"   📤 Outputs: {len(output_details)}")
-            
-            # Verificar se é quantizado
-            if input_details[0]['dtype'] == 'uint8':
-                print(f"   🎯 MODELO QUANTIZADO (INT8) - Ideal para NPU!")
-            else:
-                print(f"   💻 Modelo float - CPU/GPU")
-                
-            # Obter tamanho do arquivo
-            file_size = os.path.getsize(model_path) / (1024 * 1024)  # MB
-            print(f"   💾 Tamanho: {file_size:.2f} MB")
-            
-        except Exception as e:
-            print(f"   ❌ Erro ao carregar modelo: {e}")
-    
-    return True
+        seen.add(r['model'])
+        fmt = lambda d: f"{d['dtype']}{d['shape']} s={d['scale']:.5g} zp={d['zero_point']}"
+        outputs = ', '.join(fmt(d) for d in r['outputs'])
+        print(f"  {r['model']}: {', '.join(fmt(d) for d in r['inputs'])} -> {outputs}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Matriz de desempenho dos modelos TFLite")
+    parser.add_argument('--models-dir', default=os.path.join(base_dir, 'data', 'models'))
+    parser.add_argument('--model', action='append', help="modelo específico (repetível; padrão: todos em --models-dir)")
+    parser.add_argument('--threads', default=f"1,{os.cpu_count() or 1}", help="lista de num_threads (ex.: 1,2,4)")
+    parser.add_argument('--delegates', default=','.join(available_delegates()),
+                        help=f"lista de delegates entre {', '.join(DELEGATES)}")
+    parser.add_argument('--iterations', type=int, default=30, help="invokes medidos após o primeiro")
+    parser.add_argument('--timeout', type=float, default=300.0, help="limite por medição (s)")
+    parser.add_argument('--json', default='model_matrix.json', help="arquivo JSON de saída ('' desabilita)")
+    args = parser.parse_args()
+
+    models = args.model or sorted(glob.glob(os.path.join(args.models_dir, '*.tflite')))
+    if not models:
+        print(f"❌ Nenhum modelo .tflite em {args.models_dir}")
+        return 1
+    threads = sorted({int(t) for t in args.threads.split(',') if t.strip()})
+    delegates = [d.strip() for d in args.delegates.split(',') if d.strip()]
+    unknown = set(delegates) - set(DELEGATES)
+    if unknown:
+        parser.error(f"delegates desconhecidos: {sorted(unknown)}")
+
+    print(f"📁 {len(models)} modelo(s) | threads {threads} | delegates {delegates}")
+    results = []
+    for model_path in models:
+        for delegate in delegates:
+            # O delegate VX executa na NPU: num_threads não muda o resultado
+            for num_threads in (threads[:1] if delegate == 'vx' else threads):
+                result = measure(model_path, delegate, num_threads, args.iterations, args.timeout)
+                status = (f"p50 {result['steady_p50_ms']:.1f}ms" if result['status'] == 'ok'
+                          else f"falhou ({result['error'][:60]})")
+                print(f"🔍 {result['model']} [{delegate}, {num_threads} thr]: {status}")
+                results.append(result)
+
+    print_table(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Resultados em {args.json}")
+    return 0 if any(r['status'] == 'ok' for r in results) else 1
+
 
 if __name__ == "__main__":
-    if check_model_info():
-        print("\n✅ Verificação concluída!")
-    else:
-        print("\n❌ Verificação falhou!")
-        sys.exit(1)
+    sys.exit(main())
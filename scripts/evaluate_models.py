@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Avaliação offline de modelos: acurácia e desempenho na mesma execução
+
+Roda cada modelo sobre um diretório de imagens rotuladas no formato YOLO
+(`classe cx cy w h` normalizados, um .txt por imagem) usando um pool de
+processos, cada um com o seu interpretador. Pré-processamento, decodificação
+e NMS são os mesmos do VisionSystem (InputWriter + decoders).
+
+Saída por modelo: precisão e recall por classe no limiar de operação, AP@0.5
+por classe, mAP@0.5 e mAP@0.5:0.95, imagens/s e percentis de latência.
+Modelos cujas classes não batem com os rótulos (ex.: o SSD COCO em
+data/models contra rótulos de batata) são pulados, a menos que
+`--allow-label-mismatch` seja usado; nesse caso o relatório os marca.
+
+    python scripts/evaluate_models.py dataset/ --model data/models/best_int8.tflite \\
+        --model data/models/best_full_integer_quant.tflite --workers 4 --json avaliacao.json
+"""
+
+import argparse
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+from decoders import create_decoder
+from preprocessing import InputWriter
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('evaluate')
+
+IMAGE_EXTENSIONS = ('jpg', 'jpeg', 'png', 'bmp')
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+# Limiar baixo para a curva precisão x recall (o AP precisa das detecções fracas)
+AP_CONF_THRESHOLD = 0.01
+
+
+def find_samples(dataset_dir):
+    """Pares (imagem, rótulo) aceitando `images/` + `labels/` irmãos ou .txt ao lado da imagem"""
+    images = sorted(p for ext in IMAGE_EXTENSIONS
+                    for p in glob.glob(os.path.join(dataset_dir, '**', f'*.{ext}'), recursive=True))
+    samples = []
+    for image_path in images:
+        stem = os.path.splitext(image_path)[0]
+        candidates = [stem + '.txt']
+        parts = stem.split(os.sep)
+        if 'images' in parts:
+            i = len(parts) - 1 - parts[::-1].index('images')
+            candidates.append(os.sep.join(parts[:i] + ['labels'] + parts[i + 1:]) + '.txt')
+        label_path = next((c for c in candidates if os.path.exists(c)), None)
+        samples.append((image_path, label_path))
+    return samples
+
+
+def load_ground_truth(label_path, frame_w, frame_h):
+    """Lê rótulos YOLO e converte para caixas (x1, y1, x2, y2) em pixels"""
+    if not label_path:
+        return np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.int32)
+    rows = np.loadtxt(label_path, ndmin=2, dtype=np.float32)
+    if rows.size == 0:
+        return np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.int32)
+    class_ids = rows[:, 0].astype(np.int32)
+    cx, cy, w, h = rows[:, 1] * frame_w, rows[:, 2] * frame_h, rows[:, 3] * frame_w, rows[:, 4] * frame_h
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    return boxes, class_ids
+
+
+def box_iou(box, boxes):
+    """IoU de uma caixa contra várias"""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.maximum(0.0, x2 - x1) * np.maximum(0.0, y2 - y1)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return intersection / np.maximum(area + areas - intersection, 1e-9)
+
+
+def match_detections(det_boxes, det_scores, gt_boxes, iou_threshold):
+    """Marca cada detecção (em ordem de score) como verdadeiro positivo ou não"""
+    tp = np.zeros(len(det_boxes), dtype=bool)
+    if len(gt_boxes) == 0:
+        return tp
+    used = np.zeros(len(gt_boxes), dtype=bool)
+    for i in np.argsort(-det_scores):
+        ious = box_iou(det_boxes[i], gt_boxes)
+        ious[used] = -1
+        j = int(np.argmax(ious))
+        if ious[j] >= iou_threshold:
+            used[j] = True
+            tp[i] = True
+    return tp
+
+
+def average_precision(scores, tp, num_gt):
+    """AP com interpolação em todos os pontos (área sob a envoltória da curva P x R)"""
+    if num_gt == 0:
+        return float('nan')
+    if len(scores) == 0:
+        return 0.0
+    order = np.argsort(-scores)
+    tp = tp[order].astype(np.float64)
+    tp_cum = np.cumsum(tp)
+    fp_cum = np.cumsum(1.0 - tp)
+    recall = tp_cum / num_gt
+    precision = tp_cum / np.maximum(tp_cum + fp_cum, 1e-9)
+    recall = np.concatenate([[0.0], recall, [1.0]])
+    precision = np.concatenate([[1.0], precision, [0.0]])
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    steps = np.nonzero(recall[1:] != recall[:-1])[0]
+    return float(np.sum((recall[steps + 1] - recall[steps]) * precision[steps + 1]))
+
+
+def compute_metrics(results, num_classes, conf_threshold):
+    """Métricas por classe a partir dos resultados por imagem (detecções + verdade)"""
+    per_class = {}
+    for class_id in range(num_classes):
+        num_gt = 0
+        scores, tp_by_iou = [], {t: [] for t in IOU_THRESHOLDS}
+        for r in results:
+            gt = r['gt_boxes'][r['gt_classes'] == class_id]
+            num_gt += len(gt)
+            mask = r['class_ids'] == class_id
+            boxes, det_scores = r['boxes'][mask], r['scores'][mask]
+            scores.append(det_scores)
+            for t in IOU_THRESHOLDS:
+                tp_by_iou[t].append(match_detections(boxes, det_scores, gt, t))
+        scores = np.concatenate(scores)
+        tp_by_iou = {t: np.concatenate(v) for t, v in tp_by_iou.items()}
+
+        tp50 = tp_by_iou[IOU_THRESHOLDS[0]]
+        # Mesmo critério do VisionSystem (e dos decodificadores): score estritamente acima do limiar
+        selected = scores > conf_threshold
+        true_positives = int(tp50[selected].sum())
+        per_class[class_id] = {
+            'ground_truth': num_gt,
+            'detections': int(selected.sum()),
+            'precision': true_positives / max(int(selected.sum()), 1),
+            'recall': true_positives / num_gt if num_gt else float('nan'),
+            'ap50': average_precision(scores, tp50, num_gt),
+            'ap50_95': float(np.mean([average_precision(scores, tp_by_iou[t], num_gt) for t in IOU_THRESHOLDS]))
+            if num_gt else float('nan'),
+        }
+
+    with_gt = [m for m in per_class.values() if m['ground_truth']]
+    return {
+        'per_class': per_class,
+        'map50': float(np.mean([m['ap50'] for m in with_gt])) if with_gt else float('nan'),
+        'map50_95': float(np.mean([m['ap50_95'] for m in with_gt])) if with_gt else float('nan'),
+    }
+
+
+def label_mismatch(decoder, label_names):
+    """Motivo para não comparar o modelo com estes rótulos; None se as classes batem"""
+    num_classes = getattr(decoder, 'num_classes', None)
+    if num_classes is None:
+        return f"saída {decoder.format_name} não informa o número de classes"
+    if num_classes != len(label_names):
+        return f"{num_classes} classes no modelo, {len(label_names)} nos rótulos"
+    return None
+
+
+def check_model_labels(model_path, label_names):
+    """Carrega o modelo só para ler a assinatura de saída e comparar com os rótulos"""
+    interpreter = _load_tflite().Interpreter(model_path=model_path)
+    interpreter.allocate_tensors()
+    return label_mismatch(create_decoder(interpreter), label_names)
+
+
+# --- Processos de trabalho: um interpretador por processo ---
+_worker = {}
+
+
+def _load_tflite():
+    try:
+        import tflite_runtime.interpreter as tflite
+    except ImportError:
+        import tensorflow as tf
+        tflite = tf.lite
+    return tflite
+
+
+def _init_worker(model_path, iou_threshold, num_threads):
+    tflite = _load_tflite()
+    interpreter = tflite.Interpreter(model_path=model_path, num_threads=num_threads)
+    interpreter.allocate_tensors()
+    detail = interpreter.get_input_details()[0]
+    _worker.update(
+        interpreter=interpreter,
+        writer=InputWriter(interpreter, detail),
+        decoder=create_decoder(interpreter),
+        iou_threshold=iou_threshold,
+    )
+
+
+def _evaluate_sample(sample):
+    image_path, label_path = sample
+    image = cv2.imread(image_path)
+    if image is None:
+        return None
+    frame_h, frame_w = image.shape[:2]
+    interpreter = _worker['interpreter']
+
+    t0 = time.perf_counter()
+    _worker['writer'].write(image)
+    t1 = time.perf_counter()
+    interpreter.invoke()
+    t2 = time.perf_counter()
+    boxes, scores, class_ids = _worker['decoder'].decode(
+        interpreter, frame_w, frame_h, AP_CONF_THRESHOLD, _worker['iou_threshold']
+    )
+    t3 = time.perf_counter()
+
+    gt_boxes, gt_classes = load_ground_truth(label_path, frame_w, frame_h)
+    return {
+        'boxes': boxes.astype(np.float32),
+        'scores': scores.astype(np.float32),
+        'class_ids': class_ids.astype(np.int32),
+        'gt_boxes': gt_boxes,
+        'gt_classes': gt_classes,
+        'latency': {'preprocess': t1 - t0, 'invoke': t2 - t1, 'decode': t3 - t2, 'total': t3 - t0},
+    }
+
+
+def evaluate_model(model_path, samples, args):
+    """Avalia um modelo; retorna métricas de acurácia e desempenho"""
+    logger.info(f"🧪 {os.path.basename(model_path)}: {len(samples)} imagens, {args.workers} processo(s)")
+    warmup = samples[:args.workers] if args.warmup else []
+    with multiprocessing.Pool(args.workers, initializer=_init_worker,
+                              initargs=(model_path, args.iou, args.threads)) as pool:
+        if warmup:
+            pool.map(_evaluate_sample, warmup * 2, chunksize=1)
+        start = time.perf_counter()
+        results = [r for r in pool.imap(_evaluate_sample, samples, chunksize=args.chunksize) if r is not None]
+        wall = time.perf_counter() - start
+
+    metrics = compute_metrics(results, len(args.label_names), args.conf)
+    latency = {}
+    for stage in ('preprocess', 'invoke', 'decode', 'total'):
+        values = np.array([r['latency'][stage] for r in results]) * 1000
+        latency[stage] = {f'p{p}': float(np.percentile(values, p)) for p in (50, 95, 99)} if values.size else {}
+    metrics.update({
+        'model': os.path.basename(model_path),
+        'images': len(results),
+        'wall_s': wall,
+        'images_per_s': len(results) / wall if wall > 0 else 0.0,
+        'latency_ms': latency,
+    })
+    return metrics
+
+
+def print_report(reports, label_names, skipped=()):
+    header = f"{'modelo':<42} {'mAP50':>6} {'mAP50-95':>8} {'img/s':>7} {'p50 ms':>7} {'p99 ms':>7}"
+    print('\n' + header)
+    print('-' * len(header))
+    for r in reports:
+        total = r['latency_ms']['total']
+        flag = '  (classes diferentes dos rótulos)' if r.get('label_mismatch') else ''
+        print(f"{r['model']:<42} {r['map50']:>6.3f} {r['map50_95']:>8.3f} {r['images_per_s']:>7.1f} "
+              f"{total.get('p50', float('nan')):>7.1f} {total.get('p99', float('nan')):>7.1f}{flag}")
+    for s in skipped:
+        print(f"{s['model']:<42} pulado: {s['label_mismatch']}")
+
+    for r in reports:
+        print(f"\n{r['model']}")
+        print(f"  {'classe':<10} {'GT':>5} {'det':>5} {'prec':>6} {'recall':>6} {'AP50':>6} {'AP50-95':>7}")
+        for class_id, m in r['per_class'].items():
+            name = label_names[class_id] if class_id < len(label_names) else str(class_id)
+            print(f"  {name:<10} {m['ground_truth']:>5} {m['detections']:>5} {m['precision']:>6.3f} "
+                  f"{m['recall']:>6.3f} {m['ap50']:>6.3f} {m['ap50_95']:>7.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Avaliação offline de acurácia e desempenho de modelos TFLite")
+    parser.add_argument('dataset', help="diretório com imagens e rótulos YOLO (.txt)")
+    parser.add_argument('--model', action='append',
+                        help="modelo .tflite (repetível; padrão: todos em data/models)")
+    parser.add_argument('--labels', default=os.path.join(base_dir, 'data', 'models', 'labels.txt'))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="processos (um interpretador cada)")
+    parser.add_argument('--threads', type=int, default=1, help="num_threads de cada interpretador")
+    parser.add_argument('--conf', type=float, default=float(os.getenv('CONFIDENCE_THRESHOLD', '0.5')),
+                        help="limiar de operação para precisão/recall")
+    parser.add_argument('--iou', type=float, default=float(os.getenv('IOU_THRESHOLD', '0.45')), help="IoU do NMS")
+    parser.add_argument('--chunksize', type=int, default=4)
+    parser.add_argument('--no-warmup', dest='warmup', action='store_false',
+                        help="não aquecer os interpretadores antes de medir")
+    parser.add_argument('--allow-label-mismatch', action='store_true',
+                        help="avalia também modelos cujas classes não batem com os rótulos (marcados no relatório)")
+    parser.add_argument('--json', help="grava o relatório completo em JSON")
+    args = parser.parse_args()
+
+    with open(args.labels) as f:
+        args.label_names = [line.strip() for line in f if line.strip()]
+    models = args.model or sorted(glob.glob(os.path.join(base_dir, 'data', 'models', '*.tflite')))
+    samples = find_samples(args.dataset)
+    if not samples:
+        logger.error(f"Nenhuma imagem encontrada em {args.dataset}")
+        return 1
+    labelled = sum(1 for _, label in samples if label)
+    logger.info(f"📂 {len(samples)} imagens ({labelled} com rótulo), classes {args.label_names}")
+
+    reports, skipped = [], []
+    for model_path in models:
+        name = os.path.basename(model_path)
+        try:
+            mismatch = check_model_labels(model_path, args.label_names)
+            if mismatch and not args.allow_label_mismatch:
+                logger.warning(f"⏭️  {name}: {mismatch} - pulado (use --allow-label-mismatch para avaliar)")
+                skipped.append({'model': name, 'label_mismatch': mismatch})
+                continue
+            report = evaluate_model(model_path, samples, args)
+            report['label_mismatch'] = mismatch
+            reports.append(report)
+        except Exception as e:
+            logger.error(f"❌ {name}: {e}")
+
+    print_report(reports, args.label_names, skipped)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports + [dict(s, skipped=True) for s in skipped], f, indent=2, default=str)
+    return 0 if reports else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
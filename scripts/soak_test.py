@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Teste de longa duração (soak) do VisionSystem sem hardware
+
+Alimenta o loop de inferência com frames sintéticos ou reproduzidos (vídeo ou
+diretório de imagens), com PLC simulado, e amostra periodicamente RSS,
+descritores abertos, número de threads e percentis de latência por etapa.
+Ao final ajusta uma reta a cada métrica e falha se a inclinação passar do
+limite configurado - vazamentos e degradação aparecem antes de chegar à linha.
+
+    python scripts/soak_test.py --duration 4h --interval 60
+    python scripts/soak_test.py --source gravacao.mp4 --fps 30 --report soak.json
+    python scripts/soak_test.py --duration 30m --realtime on    # comparar com --realtime off
+    python scripts/soak_test.py --duration 30m --hiccup-every 60 --hiccup-duration 3   # MTTR da câmera
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+from frame_source import FrameSource
+
+os.environ.setdefault('HEADLESS', '1')
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('soak')
+
+STAGES = ('capture', 'inference', 'processing', 'total')
+CAMERA_STUCK_FRAMES_FREEZE = 10
+PERCENTILES = (50, 95, 99)
+
+
+def parse_duration(value):
+    """Aceita segundos ou sufixos s/m/h/d (ex.: 90, 30m, 4h, 2d)"""
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    value = value.strip().lower()
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+def read_rss_bytes():
+    """RSS atual do processo (Linux, /proc)"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def count_open_fds():
+    return len(os.listdir('/proc/self/fd'))
+
+
+class StubPlc:
+    """PLC simulado: registra os valores escritos, sem rede"""
+
+    def __init__(self):
+        self.connected = True
+        self.writes = 0
+        self.last_value = None
+        self.values = {}
+
+    def init_plc(self):
+        return True
+
+    def connect_in_background(self):
+        pass
+
+    def write_db(self, value, start=0):
+        self.writes += 1
+        self.values[start] = value
+        if start == 0:
+            self.last_value = value
+        return True
+
+    def write_reject(self, value, delay_ms):
+        # REJECT_MODE=telegram: valor + ms até o disparo
+        self.writes += 1
+        self.last_value = value
+        return True
+
+    def get_status(self):
+        return {'connected': True, 'writes': self.writes}
+
+    def disconnect(self):
+        self.connected = False
+
+
+class HiccupSource(FrameSource):
+    """Injeta falhas periódicas na fonte, como um cabo USB com mau contato.
+
+    A cada `every` segundos a fonte fica `duration` segundos indisponível:
+    no modo 'unplug' leituras falham (com a espera de um timeout curto); no
+    modo 'freeze' o último frame se repete. Nos dois casos o dispositivo só
+    volta a abrir quando a falha termina.
+    """
+
+    def __init__(self, inner, every, duration, mode='unplug', started=None):
+        super().__init__()
+        self.inner = inner
+        self.every = every
+        self.duration = duration
+        self.mode = mode
+        self.started = started if started is not None else time.monotonic()
+        self.index = inner.index
+        # Relatórios mostram a fonte real, não a falha injetada
+        self.source_name = inner.source_name
+        self._last_image = None
+
+    def active(self):
+        elapsed = time.monotonic() - self.started
+        return elapsed >= self.every and elapsed % self.every < self.duration
+
+    def _open(self):
+        if self.active():
+            return False
+        opened = self.inner.open()
+        self.index = self.inner.index
+        return opened
+
+    def _grab(self):
+        if self.active():
+            if self.mode == 'unplug' or self._last_image is None:
+                time.sleep(0.05)
+                return None
+            return self._last_image
+        frame = self.inner.read()
+        if frame is None:
+            return None
+        self._last_image = frame.image
+        return frame.image
+
+    def _close(self):
+        self.inner.close()
+
+
+class SoakSource:
+    """Envolve uma FrameSource: encerra no fim do prazo e coleta os tempos por etapa.
+
+    A cada `read` registra os tempos do frame anterior (processado entre a
+    última leitura e esta) a partir de `vision.frame_timings`.
+    """
+
+    def __init__(self, vision, source, deadline):
+        self.vision = vision
+        self.source = source
+        self.deadline = deadline
+        self.index = source.index
+        self.source_name = getattr(source, 'source_name', None)
+        self._lock = threading.Lock()
+        self._timings = {stage: [] for stage in STAGES}
+        self._last_seq = 0
+
+    @property
+    def is_open(self):
+        return self.source.is_open and time.monotonic() < self.deadline
+
+    @property
+    def frames(self):
+        return self.source.seq
+
+    @property
+    def degraded(self):
+        return getattr(self.source, 'degraded', False)
+
+    @property
+    def last_reason(self):
+        return getattr(self.source, 'last_reason', '')
+
+    def degraded_for(self):
+        return self.source.degraded_for()
+
+    def read(self):
+        if self.vision.frame_seq != self._last_seq:
+            self._last_seq = self.vision.frame_seq
+            with self._lock:
+                for stage in STAGES:
+                    self._timings[stage].append(self.vision.frame_timings[stage])
+        return self.source.read()
+
+    def drain_timings(self):
+        """Retorna e zera os tempos coletados desde a última chamada"""
+        with self._lock:
+            timings, self._timings = self._timings, {stage: [] for stage in STAGES}
+        return timings
+
+    def stats(self):
+        return self.source.stats()
+
+    def close(self):
+        self.source.close()
+
+
+class SoakMonitor:
+    """Amostra métricas do processo em intervalos fixos, em thread própria"""
+
+    def __init__(self, camera, interval):
+        self.camera = camera
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._started = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name='soak-monitor', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.thread.join(timeout=self.interval + 5)
+
+    def sample(self):
+        timings = self.camera.drain_timings()
+        sample = {
+            'elapsed_s': time.monotonic() - self._started,
+            'frames': self.camera.frames,
+            'rss_mb': read_rss_bytes() / 1024 ** 2,
+            'open_fds': count_open_fds(),
+            'threads': threading.active_count(),
+        }
+        for stage in STAGES:
+            values = np.array(timings[stage]) * 1000
+            for p in PERCENTILES:
+                sample[f'{stage}_p{p}_ms'] = float(np.percentile(values, p)) if values.size else float('nan')
+        # Jitter: distância entre a cauda e a mediana da latência total
+        sample['total_jitter_ms'] = sample['total_p99_ms'] - sample['total_p50_ms']
+        self.samples.append(sample)
+        logger.info(f"⏱️  {sample['elapsed_s'] / 60:.1f}min | frames {sample['frames']} | "
+                    f"RSS {sample['rss_mb']:.1f}MB | fds {sample['open_fds']} | threads {sample['threads']} | "
+                    f"total p50/p99 {sample['total_p50_ms']:.1f}/{sample['total_p99_ms']:.1f}ms | "
+                    f"jitter {sample['total_jitter_ms']:.1f}ms")
+        return sample
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+
+def trend_per_hour(samples, metric, skip):
+    """Inclinação (unidade/hora) da reta ajustada à métrica, ignorando as `skip` primeiras amostras"""
+    points = [(s['elapsed_s'] / 3600, s[metric]) for s in samples[skip:] if not np.isnan(s[metric])]
+    if len(points) < 3:
+        return None
+    hours, values = np.array(points).T
+    if np.ptp(hours) == 0:
+        return None
+    return float(np.polyfit(hours, values, 1)[0])
+
+
+def evaluate(samples, limits, skip):
+    """Compara a tendência de cada métrica com o limite; retorna (resultados, aprovado)"""
+    results = {}
+    passed = True
+    for metric, limit in limits.items():
+        slope = trend_per_hour(samples, metric, skip)
+        ok = slope is None or slope <= limit
+        results[metric] = {'slope_per_hour': slope, 'limit_per_hour': limit, 'ok': ok}
+        passed = passed and ok
+    return results, passed
+
+
+def create_source(name_or_path, fps):
+    """Fonte registrada pelo nome (synthetic, v4l2, ...) ou arquivo/diretório para reprodução"""
+    from main import frame_source_options
+    from frame_source import FRAME_SOURCES, create_frame_source
+
+    if name_or_path in FRAME_SOURCES:
+        options = frame_source_options(name_or_path)
+        if 'fps' in options and name_or_path != 'v4l2':
+            options['fps'] = fps
+        return create_frame_source(name_or_path, **options)
+    return create_frame_source('file', path=name_or_path, fps=fps)
+
+
+def open_source(args, started):
+    """Abre a fonte do soak (com as falhas injetadas, se pedidas); None se não abriu"""
+    source = create_source(args.source, args.fps)
+    if args.hiccup_every:
+        source = HiccupSource(source, args.hiccup_every, args.hiccup_duration, args.hiccup_mode, started)
+    return source if source.open() else None
+
+
+def run_soak(args):
+    from main import VisionSystem, create_capture_watchdog
+
+    # PLC simulado já no construtor: o cliente real não chega a ser criado
+    vision = VisionSystem(plc=StubPlc())
+    vision.warm_up()
+    vision.enter_realtime()
+
+    started = time.monotonic()
+    source = open_source(args, started)
+    if source is None:
+        raise SystemExit(f"Não foi possível abrir a fonte {args.source}")
+    # Mesma recuperação da aplicação; no modo 'freeze' os frames idênticos precisam ser detectados
+    stuck_frames = CAMERA_STUCK_FRAMES_FREEZE if args.hiccup_mode == 'freeze' else None
+    source = create_capture_watchdog(args.source, source, lambda: open_source(args, started), stuck_frames)
+    camera = SoakSource(vision, source, time.monotonic() + args.duration)
+    vision.camera = camera
+    monitor = SoakMonitor(camera, args.interval)
+
+    logger.info(f"🧪 Soak: {args.duration / 3600:.2f}h, fonte={camera.source_name} ({args.source}), "
+                f"amostra a cada {args.interval:.0f}s")
+    monitor.start()
+    try:
+        vision.process_frame()
+    except KeyboardInterrupt:
+        logger.info("Interrompido pelo usuário")
+    finally:
+        monitor.stop()
+        camera_stats = source.stats()
+        vision.cleanup()
+    return monitor.samples, camera_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de longa duração do VisionSystem")
+    parser.add_argument('--duration', type=parse_duration, default=parse_duration('1h'),
+                        help="duração (ex.: 3600, 30m, 4h, 2d)")
+    parser.add_argument('--interval', type=parse_duration, default=60.0, help="intervalo entre amostras")
+    parser.add_argument('--source', default='synthetic',
+                        help="fonte registrada ('synthetic', 'v4l2', ...), arquivo de vídeo ou diretório de imagens")
+    parser.add_argument('--fps', type=float, default=30.0, help="taxa de frames simulada (0 = sem limite)")
+    parser.add_argument('--skip-samples', type=int, default=2,
+                        help="amostras iniciais ignoradas no ajuste (aquecimento, caches)")
+    parser.add_argument('--max-rss-slope', type=float, default=5.0, help="MB/hora")
+    parser.add_argument('--max-fd-slope', type=float, default=1.0, help="descritores/hora")
+    parser.add_argument('--max-thread-slope', type=float, default=1.0, help="threads/hora")
+    parser.add_argument('--max-latency-slope', type=float, default=2.0, help="ms/hora no p99 de cada etapa")
+    parser.add_argument('--realtime', choices=('on', 'off'),
+                        help="força o modo tempo real (padrão: REALTIME_MODE do ambiente)")
+    parser.add_argument('--hiccup-every', type=parse_duration, default=0.0,
+                        help="injeta uma falha de câmera a cada N segundos (0 = sem falhas)")
+    parser.add_argument('--hiccup-duration', type=parse_duration, default=3.0, help="duração de cada falha")
+    parser.add_argument('--hiccup-mode', choices=('unplug', 'freeze'), default='unplug',
+                        help="unplug: leituras falham e o dispositivo some; freeze: o mesmo frame se repete")
+    parser.add_argument('--max-mttr', type=float, default=10.0, help="tempo médio máximo de recuperação da câmera (s)")
+    parser.add_argument('--report', help="grava o relatório em JSON")
+    parser.add_argument('--csv', help="grava as amostras em CSV")
+    args = parser.parse_args()
+
+    if args.realtime:
+        os.environ['REALTIME_MODE'] = '1' if args.realtime == 'on' else '0'
+    samples, camera_stats = run_soak(args)
+    from main import REALTIME_MODE as realtime
+
+    limits = {
+        'rss_mb': args.max_rss_slope,
+        'open_fds': args.max_fd_slope,
+        'threads': args.max_thread_slope,
+    }
+    for stage in STAGES:
+        limits[f'{stage}_p99_ms'] = args.max_latency_slope
+    results, passed = evaluate(samples, limits, args.skip_samples)
+
+    for metric, r in results.items():
+        slope = 'n/d' if r['slope_per_hour'] is None else f"{r['slope_per_hour']:+.3f}/h"
+        logger.info(f"{'✅' if r['ok'] else '❌'} {metric}: {slope} (limite {r['limit_per_hour']}/h)")
+
+    jitter = [s['total_jitter_ms'] for s in samples[args.skip_samples:] if not np.isnan(s['total_jitter_ms'])]
+    p99 = [s['total_p99_ms'] for s in samples[args.skip_samples:] if not np.isnan(s['total_p99_ms'])]
+    latency = {
+        'realtime': realtime,
+        'total_p99_ms_median': float(np.median(p99)) if p99 else None,
+        'total_jitter_ms_median': float(np.median(jitter)) if jitter else None,
+        'total_jitter_ms_max': float(np.max(jitter)) if jitter else None,
+    }
+    if jitter:
+        logger.info(f"⏱️  Tempo real {'ligado' if realtime else 'desligado'}: p99 total (mediana das amostras) "
+                    f"{latency['total_p99_ms_median']:.1f}ms | jitter p99-p50 mediana "
+                    f"{latency['total_jitter_ms_median']:.1f}ms, máx {latency['total_jitter_ms_max']:.1f}ms")
+
+    # Recuperação da câmera: toda falha injetada deve ser detectada e recuperada dentro do limite
+    mttr = camera_stats['mttr_s']
+    camera = {key: camera_stats.get(key) for key in ('source', 'stalls', 'recoveries', 'reopen_attempts',
+                                                     'mttr_s', 'max_downtime_s', 'last_reason')}
+    if camera_stats['stalls']:
+        logger.info(f"📷 Câmera '{camera['source']}': {camera['stalls']} travamentos, {camera['recoveries']} recuperações | "
+                    f"MTTR {mttr if mttr is not None else float('nan'):.2f}s, "
+                    f"máx {camera['max_downtime_s'] or float('nan'):.2f}s | último motivo: {camera['last_reason']}")
+    if args.hiccup_every:
+        expected = int(args.duration // args.hiccup_every)
+        camera['ok'] = (camera['recoveries'] >= max(expected - 1, 1) and mttr is not None and mttr <= args.max_mttr)
+        logger.info(f"{'✅' if camera['ok'] else '❌'} câmera: {camera['recoveries']}/{expected} falhas injetadas "
+                    f"recuperadas (MTTR limite {args.max_mttr:.1f}s)")
+        passed = passed and camera['ok']
+
+    if args.csv and samples:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(samples[0]))
+            writer.writeheader()
+            writer.writerows(samples)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'passed': passed, 'latency': latency, 'camera': camera, 'trends': results,
+                       'samples': samples}, f, indent=2)
+
+    logger.info("✅ Soak aprovado" if passed else "❌ Soak reprovado: métricas em tendência de alta ou câmera sem recuperação")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Teste do watchdog da captura: detecção de travamento, reabertura em segundo plano e sem loop ocupado
+"""
+
+import os
+import sys
+import time
+import logging
+
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+os.environ['HEADLESS'] = '1'
+
+from capture_watchdog import CaptureWatchdog
+from frame_source import FrameSource
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeCamera(FrameSource):
+    """Fonte controlada pelo teste: `broken` faz as leituras falharem, `frozen` repete a imagem"""
+
+    def __init__(self, index=0):
+        super().__init__()
+        self.index = index
+        self.broken = False
+        self.frozen = False
+        self.grabs = 0
+
+    def _open(self):
+        return True
+
+    def _grab(self):
+        self.grabs += 1
+        if self.broken:
+            return None
+        value = 7 if self.frozen else self.grabs % 256
+        return np.full((48, 64, 3), value, dtype=np.uint8)
+
+
+class Devices:
+    """Descoberta simulada: o dispositivo volta depois de `absent_for` tentativas"""
+
+    def __init__(self, absent_for=0):
+        self.absent_for = absent_for
+        self.attempts = 0
+        self.opened = []
+
+    def open(self):
+        self.attempts += 1
+        if self.attempts <= self.absent_for:
+            return None
+        camera = FakeCamera(index=len(self.opened) + 1)
+        camera.open()
+        self.opened.append(camera)
+        return camera
+
+
+def read_until(watchdog, condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    frames = []
+    while time.monotonic() < deadline:
+        frame = watchdog.read()
+        if frame is not None:
+            frames.append(frame)
+        if condition():
+            return frames
+    raise AssertionError("condição não atingida")
+
+
+def test_failures_trigger_background_reopen():
+    """Leituras falhando viram 'degradada'; a câmera é reaberta e a numeração continua"""
+    camera = FakeCamera()
+    camera.open()
+    devices = Devices(absent_for=2)
+    watchdog = CaptureWatchdog(camera, devices.open, max_failures=5, backoff_s=0.05, poll_s=0.05)
+    try:
+        first = watchdog.read()
+        assert first.seq == 1
+        camera.broken = True
+        read_until(watchdog, lambda: watchdog.degraded)
+        assert watchdog.last_reason.startswith('5 leituras') and not camera.is_open
+
+        frames = read_until(watchdog, lambda: watchdog.recoveries == 1)
+        frames += read_until(watchdog, lambda: watchdog.seq >= 3)
+        assert [f.seq for f in frames][-1] == watchdog.seq and frames[0].seq == 2
+        assert watchdog.index == 1 and devices.attempts == 3
+        stats = watchdog.stats()
+        assert stats['stalls'] == 1 and stats['mttr_s'] > 0 and not stats['degraded']
+    finally:
+        watchdog.close()
+    assert not devices.opened[0].is_open
+
+
+def test_degraded_read_waits_instead_of_spinning():
+    """Com o dispositivo ausente, cada read espera `poll_s` (sem loop ocupado)"""
+    camera = FakeCamera()
+    camera.open()
+    camera.broken = True
+    devices = Devices(absent_for=1000)
+    watchdog = CaptureWatchdog(camera, devices.open, max_failures=3, backoff_s=0.05, max_backoff_s=0.1, poll_s=0.1)
+    try:
+        read_until(watchdog, lambda: watchdog.degraded)
+        start = time.monotonic()
+        reads = 0
+        while time.monotonic() - start < 0.5:
+            assert watchdog.read() is None
+            reads += 1
+        assert reads <= 6, reads
+        assert watchdog.is_open and watchdog.degraded_for() > 0.4
+    finally:
+        watchdog.close()
+
+
+def test_frozen_and_stalled_frames_are_detected():
+    camera = FakeCamera()
+    camera.open()
+    watchdog = CaptureWatchdog(camera, Devices().open, stuck_frames=4, backoff_s=0.05, poll_s=0.05)
+    try:
+        assert watchdog.read() is not None
+        camera.frozen = True
+        read_until(watchdog, lambda: watchdog.degraded)
+        assert watchdog.last_reason == '4 frames idênticos seguidos'
+        read_until(watchdog, lambda: watchdog.recoveries == 1)
+    finally:
+        watchdog.close()
+
+    # Poucas falhas, mas nenhum frame há mais de `stall_timeout_s`
+    camera = FakeCamera()
+    camera.open()
+    watchdog = CaptureWatchdog(camera, Devices().open, stall_timeout_s=0.2, max_failures=1000, retry_s=0.05)
+    try:
+        camera.broken = True
+        read_until(watchdog, lambda: watchdog.degraded)
+        assert watchdog.last_reason.startswith('nenhum frame há')
+    finally:
+        watchdog.close()
+
+
+def test_source_end_closes_without_reopen():
+    """Fonte que termina sozinha (arquivo sem loop) encerra a captura sem reabertura"""
+    camera = FakeCamera()
+    camera.open()
+    devices = Devices()
+    watchdog = CaptureWatchdog(camera, devices.open)
+    camera.close()
+    assert watchdog.read() is None and not watchdog.is_open
+    assert devices.attempts == 0 and watchdog.stalls == 0
+    watchdog.close()
+
+
+def test_degraded_camera_is_reported_in_its_own_plc_word():
+    """Estado da câmera vai para o byte CAMERA_STATUS_DB_OFFSET, nunca para o do telegrama de rejeição"""
+    import types
+    import main as vision_main
+
+    class RecordingPlc:
+        def __init__(self):
+            self.writes = []
+
+        def write_db(self, value, start=0):
+            self.writes.append((start, value))
+            return True
+
+    camera = types.SimpleNamespace(last_reason='teste', degraded_for=lambda: 1.0)
+    vision = types.SimpleNamespace(plc=RecordingPlc(), camera=camera, _camera_degraded_reported=0.0,
+                                   class_values={'OK': 0, 'NOK': 1, 'PEDRA': 2})
+    report = vision_main.VisionSystem._report_camera_state
+
+    # Padrão: envio desligado, nada é escrito no PLC
+    assert vision_main.CAMERA_STATUS_DB_OFFSET == -1 and not vision_main.CAMERA_STATUS_REPORT
+    report(vision, True)
+    assert vision.plc.writes == []
+
+    saved = vision_main.CAMERA_STATUS_DB_OFFSET, vision_main.CAMERA_STATUS_REPORT
+    vision_main.CAMERA_STATUS_DB_OFFSET, vision_main.CAMERA_STATUS_REPORT = 4, True
+    try:
+        vision._camera_degraded_reported = 0.0
+        report(vision, True)
+        report(vision, True)            # dentro de CAMERA_DEGRADED_REPORT_S: não repete
+        report(vision, False)
+        assert vision.plc.writes == [(4, vision_main.CAMERA_DEGRADED_VALUE), (4, 0)]
+    finally:
+        vision_main.CAMERA_STATUS_DB_OFFSET, vision_main.CAMERA_STATUS_REPORT = saved
+
+def main():
+    tests = [
+        test_failures_trigger_background_reopen,
+        test_degraded_read_waits_instead_of_spinning,
+        test_frozen_and_stalled_frames_are_detected,
+        test_source_end_closes_without_reopen,
+        test_degraded_camera_is_reported_in_its_own_plc_word,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Teste da cascata de inferência: gatilho do estágio 1, amostragem mínima do detector completo e estatísticas
+"""
+
+import os
+import sys
+import types
+import logging
+
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+from cascade import InferenceCascade
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LABELS = ['OK', 'NOK', 'PEDRA']
+FRAME = np.zeros((48, 64, 3), dtype=np.uint8)
+
+
+class ScriptedClassifier:
+    """Classificador falso [1, C]: cada invoke publica a próxima linha de scores do roteiro"""
+    script = []
+
+    def __init__(self, model_path, num_threads=None, output_dtype=np.float32, quantization=(0.0, 0)):
+        self.input = np.zeros((1, 16, 16, 3), dtype=np.uint8)
+        self.output = np.zeros((1, len(LABELS)), dtype=output_dtype)
+        self.quantization = quantization
+        self.invokes = 0
+
+    def allocate_tensors(self):
+        pass
+
+    def get_input_details(self):
+        return [{'index': 0, 'shape': np.array(self.input.shape), 'dtype': np.uint8, 'quantization': (0.0, 0)}]
+
+    def get_output_details(self):
+        return [{'index': 1, 'shape': np.array(self.output.shape), 'dtype': self.output.dtype,
+                 'quantization': self.quantization}]
+
+    def tensor(self, index):
+        return lambda: self.input
+
+    def invoke(self):
+        self.output[0] = self.script[self.invokes % len(self.script)]
+        self.invokes += 1
+
+    def get_tensor(self, index):
+        return self.output
+
+
+def make_cascade(script, threshold=0.25, min_interval=3, **interpreter_kwargs):
+    ScriptedClassifier.script = script
+    tflite = types.SimpleNamespace(
+        Interpreter=lambda model_path, num_threads=None: ScriptedClassifier(model_path, num_threads,
+                                                                            **interpreter_kwargs))
+    return InferenceCascade(tflite, 'estagio1.tflite', LABELS, trigger_classes=('NOK', 'PEDRA'),
+                            threshold=threshold, min_interval=min_interval, report_interval=3600)
+
+
+def test_trigger_classes_gate_the_full_detector():
+    cascade = make_cascade([
+        [0.9, 0.1, 0.0],       # OK alto não dispara
+        [0.1, 0.3, 0.0],       # NOK acima do limiar
+        [0.1, 0.0, 0.25],      # PEDRA igual ao limiar: não dispara
+        [0.0, 0.0, 0.6],
+    ], min_interval=0)
+    assert cascade.kind == 'classificador' and cascade.trigger_ids == {1, 2}
+    assert [cascade.screen(FRAME) for _ in range(4)] == [False, True, False, True]
+    assert cascade.triggered == 2 and cascade.sampled == 0
+
+
+def test_full_detector_is_forced_after_min_interval():
+    """Sem gatilho, o detector completo ainda roda 1 a cada `min_interval` frames; o gatilho zera a contagem"""
+    cascade = make_cascade([[0.9, 0.0, 0.0]], min_interval=3)
+    assert [cascade.screen(FRAME) for _ in range(7)] == [False, False, True, False, False, True, False]
+    assert cascade.sampled == 2
+
+    cascade = make_cascade([[0.0, 0.9, 0.0]] + [[0.9, 0.0, 0.0]] * 3, min_interval=3)
+    assert [cascade.screen(FRAME) for _ in range(4)] == [True, False, False, True]
+    assert cascade.triggered == 1 and cascade.sampled == 1
+
+
+def test_quantized_output_and_stats():
+    # Saída uint8 com escala 1/255: 100 -> 0.39 (acima de 0.25), 50 -> 0.196
+    cascade = make_cascade([[0, 100, 0], [0, 50, 0], [0, 50, 0], [0, 50, 0]], min_interval=0,
+                           output_dtype=np.uint8, quantization=(1 / 255, 0))
+    results = [cascade.screen(FRAME) for _ in range(4)]
+    assert results == [True, False, False, False]
+    cascade.record_stage2(0.040)
+
+    stats = cascade.stats()
+    assert stats['frames'] == 4 and stats['stage1_hit_rate'] == 0.25 and stats['stage2_rate'] == 0.25
+    assert abs(stats['stage2_ms'] - 40.0) < 1e-6 and stats['stage1_ms'] >= 0
+    assert abs(stats['avg_cost_ms'] - (stats['stage1_ms'] + 10.0)) < 1e-6
+
+    # O relatório periódico zera as estatísticas
+    cascade.report_interval = 0
+    cascade.maybe_report()
+    assert cascade.stats()['frames'] == 0 and cascade.triggered == 0
+
+
+def test_threshold_change_takes_effect_on_next_frame():
+    cascade = make_cascade([[0.0, 0.3, 0.0]], min_interval=0)
+    assert cascade.screen(FRAME)
+    cascade.threshold = 0.5         # como feito pela API de controle na fronteira entre frames
+    assert not cascade.screen(FRAME)
+
+
+def main():
+    tests = [
+        test_trigger_classes_gate_the_full_detector,
+        test_full_detector_is_forced_after_min_interval,
+        test_quantized_output_and_stats,
+        test_threshold_change_takes_effect_on_next_frame,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
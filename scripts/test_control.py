@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Teste da API de controle: validação dos parâmetros, aplicação na fronteira entre frames e erros das ações
+"""
+
+import json
+import os
+import sys
+import types
+import urllib.error
+import urllib.request
+import logging
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+os.environ['HEADLESS'] = '1'
+
+from control import ControlServer, RuntimeSettings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SPEC = {
+    'confidence_threshold': (float, 0.0, 1.0),
+    'frame_skip': (int, 0, 30),
+    'overlay': (bool, None, None),
+}
+
+
+def make_settings():
+    return RuntimeSettings(SPEC, {'confidence_threshold': 0.5, 'frame_skip': 0, 'overlay': False})
+
+
+def request(port, method, path, body=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(f'http://127.0.0.1:{port}{path}', data=data, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_validation_is_all_or_nothing():
+    settings = make_settings()
+    for bad in ({'desconhecido': 1}, {'confidence_threshold': 1.5}, {'frame_skip': 'abc'},
+                {'frame_skip': 2, 'confidence_threshold': -0.1}):
+        try:
+            settings.update(bad)
+            raise AssertionError(f"{bad} deveria ser recusado")
+        except (KeyError, ValueError):
+            pass
+    assert settings.snapshot()['pending'] == {}
+    assert settings.update({'frame_skip': '3', 'overlay': 'on'}) == {'frame_skip': 3, 'overlay': True}
+
+
+def test_changes_apply_only_at_frame_boundary():
+    settings = make_settings()
+    assert settings.apply_pending() == {}
+    settings.update({'confidence_threshold': 0.7})
+    settings.update({'confidence_threshold': 0.8, 'frame_skip': 0})
+    # Até a fronteira do frame, o valor em uso não muda
+    assert settings.get('confidence_threshold') == 0.5 and settings.version == 0
+    applied = settings.apply_pending()
+    # Só o último valor pendente vale; o que não mudou não é reportado
+    assert applied == {'confidence_threshold': (0.5, 0.8)} and settings.version == 1
+    assert settings.get('confidence_threshold') == 0.8 and settings.apply_pending() == {}
+
+
+def test_apply_settings_reaches_components():
+    """O loop repassa os valores aplicados para o limiar, a cascata e o preview"""
+    from main import RUNTIME_SETTINGS_SPEC, VisionSystem
+
+    settings = RuntimeSettings(RUNTIME_SETTINGS_SPEC, {'confidence_threshold': 0.5, 'cascade_threshold': 0.25,
+                                                       'preview_fps': 5.0})
+    vision = types.SimpleNamespace(settings=settings, CONFIDENCE_THRESHOLD=0.5, display=None,
+                                   preview=types.SimpleNamespace(max_fps=5.0),
+                                   cascade=types.SimpleNamespace(threshold=0.25))
+    settings.update({'confidence_threshold': 0.6, 'cascade_threshold': 0.4, 'preview_fps': 2})
+    VisionSystem._apply_settings(vision, settings.apply_pending())
+    assert vision.CONFIDENCE_THRESHOLD == 0.6 and vision.cascade.threshold == 0.4 and vision.preview.max_fps == 2.0
+
+
+def test_http_errors_are_reported_as_json():
+    def busy(params):
+        raise RuntimeError("troca de modelo em andamento")
+
+    def broken(params):
+        raise OSError("falha de E/S")
+
+    def echo(params):
+        if 'n' not in params:
+            raise KeyError('n')
+        return {'n': int(params['n'])}
+
+    server = ControlServer(make_settings(), 0, actions={'/busy': busy, '/broken': broken, '/echo': echo})
+    assert server.start()
+    port = server.httpd.server_address[1]
+    try:
+        status, payload = request(port, 'GET', '/settings')
+        assert status == 200 and payload['values']['frame_skip'] == 0
+        assert payload['limits']['frame_skip'] == {'type': 'int', 'min': 0, 'max': 30}
+
+        assert request(port, 'POST', '/settings', {'frame_skip': 2}) == (202, {'accepted': {'frame_skip': 2}})
+        assert request(port, 'POST', '/settings', {'frame_skip': 99})[0] == 400
+        assert request(port, 'POST', '/settings', [1, 2])[0] == 400
+        assert server.settings.snapshot()['pending'] == {'frame_skip': 2}
+
+        assert request(port, 'POST', '/echo?n=4') == (200, {'n': 4})
+        assert request(port, 'POST', '/echo') == (400, {'error': 'n'})
+        assert request(port, 'POST', '/echo?n=x')[0] == 400
+        assert request(port, 'POST', '/busy') == (409, {'error': 'troca de modelo em andamento'})
+        assert request(port, 'POST', '/broken') == (500, {'error': 'falha de E/S'})
+        assert request(port, 'POST', '/outra')[0] == 404
+        # O servidor continua atendendo depois das falhas
+        assert request(port, 'GET', '/settings')[0] == 200
+    finally:
+        server.stop()
+
+
+def main():
+    tests = [
+        test_validation_is_all_or_nothing,
+        test_changes_apply_only_at_frame_boundary,
+        test_apply_settings_reaches_components,
+        test_http_errors_are_reported_as_json,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Teste da captura de dataset: seleção, cota do diretório e descarte com a fila cheia
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import logging
+
+import cv2
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+from dataset_capture import DatasetCapture
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LABELS = ['OK', 'NOK', 'PEDRA']
+STONE = [('PEDRA', 0.8, (10, 10, 50, 50))]
+
+
+def frame(value=0):
+    return np.full((120, 160, 3), value, dtype=np.uint8)
+
+
+def jpgs(directory):
+    return sorted(n for n in os.listdir(directory) if n.endswith('.jpg'))
+
+
+def test_selection_and_sidecar():
+    directory = tempfile.mkdtemp()
+    try:
+        capture = DatasetCapture(directory, LABELS, score_band=(0.4, 0.6), workers=1)
+        assert capture.select([('OK', 0.95, (0, 0, 1, 1))]) is None
+        assert capture.select([('OK', 0.5, (0, 0, 1, 1))]) == 'band'
+        assert capture.select([('OK', 0.5, (0, 0, 1, 1))] + STONE) == 'class'
+
+        image = frame(100)
+        assert capture.offer(image, STONE, 7, time.time())
+        image[...] = 0                     # o loop reaproveita o buffer: a cópia enfileirada não muda
+        assert not capture.offer(frame(), [('OK', 0.99, (0, 0, 1, 1))], 8, time.time())
+        capture.close()
+
+        names = jpgs(directory)
+        assert capture.saved == 1 and len(names) == 1 and names[0].endswith('_00000007_class.jpg')
+        with open(os.path.join(directory, names[0][:-4] + '.json')) as f:
+            sidecar = json.load(f)
+        assert sidecar['seq'] == 7 and sidecar['width'] == 160 and sidecar['height'] == 120
+        assert sidecar['detections'] == [{'label': 'PEDRA', 'class_id': 2, 'score': 0.8, 'box': [10, 10, 50, 50]}]
+        saved = cv2.imread(os.path.join(directory, names[0]))
+        assert abs(int(saved.mean()) - 100) <= 2
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_quota_evicts_oldest_files():
+    directory = tempfile.mkdtemp()
+    try:
+        capture = DatasetCapture(directory, LABELS, workers=1, max_files=3)
+        t0 = time.time()
+        for seq in range(1, 7):
+            capture.offer(frame(seq * 10), STONE, seq, t0 + seq)
+            capture.queue.join()
+        assert [n.split('_')[1] for n in jpgs(directory)] == ['00000004', '00000005', '00000006']
+        assert len([n for n in os.listdir(directory) if n.endswith('.json')]) == 3
+        stats = capture.stats()
+        assert stats['saved'] == 6 and stats['evicted'] == 3 and stats['files'] == 3
+        total = sum(os.path.getsize(os.path.join(directory, n)) for n in os.listdir(directory))
+        assert stats['bytes'] == total
+        capture.close()
+
+        # Reinício: os arquivos existentes contam para a cota por bytes
+        capture = DatasetCapture(directory, LABELS, workers=1, max_bytes=total)
+        assert capture.stats()['files'] == 3
+        capture.offer(frame(70), STONE, 7, t0 + 7)
+        capture.close()
+        names = jpgs(directory)
+        assert names[-1].split('_')[1] == '00000007' and '00000004' not in ' '.join(names)
+        assert capture.evicted >= 1 and capture.stats()['bytes'] <= total
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_full_queue_drops_without_blocking():
+    directory = tempfile.mkdtemp()
+    try:
+        capture = DatasetCapture(directory, LABELS, workers=1, queue_size=2)
+        release = threading.Event()
+        save = capture._save
+        # Disco lento: o worker fica preso no primeiro frame
+        capture._save = lambda *item: release.wait(5) and save(*item)
+
+        started = time.perf_counter()
+        accepted = [capture.offer(frame(), STONE, seq, time.time()) for seq in range(1, 11)]
+        elapsed = time.perf_counter() - started
+        time.sleep(0.05)
+        assert elapsed < 0.5
+        # 1 no worker + 2 na fila; os demais são descartados e contados
+        assert sum(accepted) <= 3 and capture.dropped == 10 - sum(accepted) and capture.dropped >= 7
+        release.set()
+        capture.close()
+        assert capture.saved == sum(accepted) and capture.stats()['dropped'] == capture.dropped
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    tests = [
+        test_selection_and_sidecar,
+        test_quota_evicts_oldest_files,
+        test_full_queue_drops_without_blocking,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Teste dos decodificadores de saída (YOLO / SSD) com os modelos do repositório
+"""
+
+import os
+import sys
+import logging
+
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+from decoders import YoloDecoder, SsdDecoder, create_decoder, supressao_nao_maxima
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+models_dir = os.path.join(base_dir, 'data', 'models')
+
+EXPECTED_FORMATS = {
+    'best_int8_potato.tflite': 'yolo',
+    'best_int8.tflite': 'yolo',
+    'best_integer_quant.tflite': 'yolo',
+    'best_full_integer_quant.tflite': 'yolo',
+    'lite-model_ssd_mobilenet_v1_1_metadata_2.tflite': 'ssd',
+}
+
+
+def load_interpreter(model_name):
+    try:
+        import tflite_runtime.interpreter as tflite
+    except ImportError:
+        import tensorflow as tf
+        tflite = tf.lite
+    interpreter = tflite.Interpreter(model_path=os.path.join(models_dir, model_name))
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+def run_zeros(interpreter):
+    detail = interpreter.get_input_details()[0]
+    interpreter.set_tensor(detail['index'], np.zeros(detail['shape'], dtype=detail['dtype']))
+    interpreter.invoke()
+
+
+def check_result(result, frame_w, frame_h):
+    boxes, scores, class_ids = result
+    assert boxes.ndim == 2 and boxes.shape[1] == 4
+    assert len(boxes) == len(scores) == len(class_ids)
+    assert boxes.dtype == np.int32 and class_ids.dtype == np.int32
+
+
+def test_bundled_models_format_detection():
+    """Cada modelo do repositório deve ser reconhecido pelo formato esperado"""
+    for model_name, expected in EXPECTED_FORMATS.items():
+        interpreter = load_interpreter(model_name)
+        decoder = create_decoder(interpreter)
+        assert decoder.format_name == expected, f"{model_name}: {decoder.format_name} != {expected}"
+
+        run_zeros(interpreter)
+        check_result(decoder.decode(interpreter, 640, 480, 0.5, 0.45), 640, 480)
+        logger.info(f"✓ {model_name}: {decoder.format_name}")
+
+
+def test_yolo_quantized_threshold_matches_float():
+    """O limiar aplicado no tensor quantizado deve equivaler ao limiar em float"""
+    interpreter = load_interpreter('best_full_integer_quant.tflite')
+    decoder = create_decoder(interpreter)
+    assert isinstance(decoder, YoloDecoder) and decoder.quantized
+    assert decoder.transposed and decoder.num_classes == 3
+
+    raw = np.random.RandomState(0).randint(-128, 128, size=(3, 2100)).astype(np.int8)
+    best_raw = raw.max(axis=0)
+    best_float = (best_raw.astype(np.float32) - decoder.zero_point) * decoder.scale
+
+    for threshold in (0.25, 0.5, 0.75):
+        selected_raw = best_raw > decoder._raw_threshold(threshold)
+        assert np.array_equal(selected_raw, best_float > threshold), threshold
+
+
+def test_yolo_decodes_synthetic_box():
+    """Uma âncora sintética deve virar a caixa esperada em pixels"""
+    detail = {'index': 0, 'shape': np.array([1, 7, 10]), 'dtype': np.float32,
+              'quantization': (0.0, 0), 'name': 'Identity'}
+    decoder = YoloDecoder([detail])
+    output = np.zeros((1, 7, 10), dtype=np.float32)
+    output[0, :4, 3] = [0.5, 0.5, 0.25, 0.5]
+    output[0, 4 + 2, 3] = 0.9
+
+    class FakeInterpreter:
+        def tensor(self, index):
+            return lambda: output
+
+    boxes, scores, class_ids = decoder.decode(FakeInterpreter(), 640, 480, 0.5, 0.45)
+    assert boxes.tolist() == [[240, 120, 400, 360]]
+    assert class_ids.tolist() == [2]
+    assert abs(scores[0] - 0.9) < 1e-6
+
+
+def reference_yolo_decode(decoder, output, frame_w, frame_h, conf_threshold, iou_threshold):
+    """Decodificação direta (com alocações por frame), usada como referência"""
+    rows = output[0] if decoder.transposed else output[0].T
+    class_scores = rows[4:]
+    best = class_scores.max(axis=0)
+    candidates = np.flatnonzero(best > decoder._raw_threshold(conf_threshold))
+
+    def dequantize(values):
+        return (values.astype(np.float32) - decoder.zero_point) * decoder.scale
+
+    class_ids = class_scores[:, candidates].argmax(axis=0).astype(np.int32)
+    scores = dequantize(best[candidates])
+    cx, cy, w, h = dequantize(rows[:4, candidates])
+    boxes = np.empty((candidates.size, 4), dtype=np.int32)
+    boxes[:, 0] = (cx - w / 2) * frame_w
+    boxes[:, 1] = (cy - h / 2) * frame_h
+    boxes[:, 2] = (cx + w / 2) * frame_w
+    boxes[:, 3] = (cy + h / 2) * frame_h
+    keep = supressao_nao_maxima(boxes, scores, iou_threshold)
+    return (boxes, scores, class_ids), (boxes[keep], scores[keep], class_ids[keep])
+
+
+def test_yolo_preallocated_decode_matches_reference():
+    """Os buffers reaproveitados dão o mesmo resultado da decodificação direta, frame após frame"""
+    rng = np.random.RandomState(3)
+    for quantized, transposed in ((True, True), (True, False), (False, True), (False, False)):
+        shape = (1, 7, 300) if transposed else (1, 300, 7)
+        if quantized:
+            detail = {'index': 0, 'shape': np.array(shape), 'dtype': np.int8, 'quantization': (0.004, -128)}
+        else:
+            detail = {'index': 0, 'shape': np.array(shape), 'dtype': np.float32, 'quantization': (0.0, 0)}
+        decoder = YoloDecoder([detail])
+        for _ in range(5):
+            if quantized:
+                output = rng.randint(-128, 128, size=shape).astype(np.int8)
+            else:
+                output = rng.rand(*shape).astype(np.float32)
+
+            class FakeInterpreter:
+                def tensor(self, index):
+                    return lambda: output
+
+            expected_candidates, expected = reference_yolo_decode(decoder, output, 640, 480, 0.5, 0.45)
+            decoded = decoder.decode(FakeInterpreter(), 640, 480, 0.5, 0.45)
+            candidates = decoder.candidates(FakeInterpreter(), 640, 480, 0.5)
+            assert len(expected[0]) > 0
+            for want, got in zip(expected + expected_candidates, decoded + candidates):
+                assert np.array_equal(want, got) and want.dtype == got.dtype
+            # Os resultados não são views dos buffers internos
+            assert not np.shares_memory(decoded[0], decoder._scratch['boxes'])
+            assert not np.shares_memory(candidates[0], decoder._scratch['boxes'])
+
+
+def test_ssd_skips_nms_and_converts_boxes():
+    """O SSD não passa por NMS: caixas sobrepostas permanecem, coordenadas (y, x) viram (x, y)"""
+    interpreter = load_interpreter('lite-model_ssd_mobilenet_v1_1_metadata_2.tflite')
+    decoder = create_decoder(interpreter)
+    assert isinstance(decoder, SsdDecoder)
+
+    tensors = {
+        decoder.boxes_index: np.array([[[0.1, 0.2, 0.5, 0.6], [0.1, 0.2, 0.5, 0.6], [0.0, 0.0, 1.0, 1.0]]], np.float32),
+        decoder.classes_index: np.array([[1, 1, 3]], np.float32),
+        decoder.scores_index: np.array([[0.9, 0.8, 0.3]], np.float32),
+        decoder.count_index: np.array([3], np.float32),
+    }
+
+    class FakeInterpreter:
+        def get_tensor(self, index):
+            return tensors[index]
+
+    boxes, scores, class_ids = decoder.decode(FakeInterpreter(), 640, 480, 0.5, 0.45)
+    assert boxes.tolist() == [[128, 48, 384, 240], [128, 48, 384, 240]]
+    assert class_ids.tolist() == [1, 1]
+
+
+def main():
+    tests = [
+        test_bundled_models_format_detection,
+        test_yolo_quantized_threshold_matches_float,
+        test_yolo_decodes_synthetic_box,
+        test_yolo_preallocated_decode_matches_reference,
+        test_ssd_skips_nms_and_converts_boxes,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
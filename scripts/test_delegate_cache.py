@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Teste do cache persistente de delegates: chave, pending -> failed, nova tentativa e limpeza de grafos
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+import logging
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+from delegate_cache import DelegateCache, STATUS_FAILED, STATUS_PENDING
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def make_model(directory, content=b'modelo de teste'):
+    path = os.path.join(directory, 'modelo.tflite')
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+def test_key_is_model_sha256_and_runtime_version():
+    cache_dir = tempfile.mkdtemp()
+    try:
+        model = make_model(cache_dir)
+        cache = DelegateCache(os.path.join(cache_dir, 'cache'))
+        key = cache.key(model, 'libinexistente.so', '2.14.0')
+        digest, library = key.split('|', 1)
+        assert digest == hashlib.sha256(b'modelo de teste').hexdigest()
+        assert library == 'libinexistente.so:missing:2.14.0'
+        # Outra versão do runtime ou outro modelo: outra entrada
+        assert cache.key(model, 'libinexistente.so', '2.15.0') != key
+        time.sleep(0.01)
+        make_model(cache_dir, b'modelo retreinado')
+        assert cache.key(model, 'libinexistente.so', '2.14.0').split('|')[0] != digest
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def test_pending_becomes_failed_and_survives_restart():
+    """Crash durante a carga (pending) e falha registrada valem para o próximo boot"""
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = DelegateCache(cache_dir)
+        cache.mark_pending('k')
+        # "Reinício" antes do registro do resultado: pending conta como falha
+        cache = DelegateCache(cache_dir)
+        assert cache.lookup('k')['status'] == STATUS_PENDING and cache.is_known_bad('k')
+
+        cache.mark_pending('k')
+        cache.record_failure('k', RuntimeError('vx falhou'))
+        cache = DelegateCache(cache_dir)
+        entry = cache.lookup('k')
+        assert entry['status'] == STATUS_FAILED and entry['detail'] == 'vx falhou' and entry['attempts'] == 2
+        assert cache.is_known_bad('k')
+
+        cache.mark_pending('k')
+        cache.record_success('k', 'ok')
+        assert cache.is_known_good('k') and not cache.is_known_bad('k')
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def test_failure_is_retried_after_boots_or_ttl():
+    """Falha não desliga o delegate para sempre; prazos dobram a cada falha repetida"""
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = DelegateCache(cache_dir, retry_after_boots=2, retry_after_s=0)
+        cache.mark_pending('k')
+        cache.record_failure('k', 'transitória')
+        assert cache.is_known_bad('k') and cache.is_known_bad('k')
+        assert not DelegateCache(cache_dir, retry_after_boots=2, retry_after_s=0).is_known_bad('k')
+
+        # Segunda falha: espera 4 boots
+        cache.mark_pending('k')
+        cache = DelegateCache(cache_dir, retry_after_boots=2, retry_after_s=0)
+        assert [cache.is_known_bad('k') for _ in range(5)] == [True] * 4 + [False]
+
+        cache = DelegateCache(cache_dir, retry_after_boots=0, retry_after_s=3600)
+        entry = cache.lookup('k')
+        assert not cache.retry_due(entry, now=entry['timestamp'] + 7000)
+        assert cache.retry_due(entry, now=entry['timestamp'] + 7200)
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def test_prune_graphs_keeps_current_and_newest():
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = DelegateCache(cache_dir, max_graph_files=3)
+        now = time.time()
+        for i in range(5):
+            path = os.path.join(cache_dir, f'vx_{i:016d}.nb')
+            open(path, 'wb').close()
+            os.utime(path, (now - 100 + i, now - 100 + i))
+        other = os.path.join(cache_dir, 'outro.bin')
+        open(other, 'wb').close()
+
+        current = os.path.join(cache_dir, f'vx_{0:016d}.nb')   # o mais antigo, mas em uso
+        cache.prune_graphs(keep=current)
+        remaining = sorted(n for n in os.listdir(cache_dir) if n.endswith('.nb'))
+        assert remaining == [f'vx_{i:016d}.nb' for i in (0, 3, 4)], remaining
+        assert os.path.exists(other)
+
+        cache.clear()
+        assert not [n for n in os.listdir(cache_dir) if n.endswith('.nb')] and cache.lookup('k') is None
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def main():
+    tests = [
+        test_key_is_model_sha256_and_runtime_version,
+        test_pending_becomes_failed_and_survives_restart,
+        test_failure_is_retried_after_boots_or_ttl,
+        test_prune_graphs_keeps_current_and_newest,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Teste do log binário de detecções: consulta por tempo/classe, volta do anel e reabertura
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import logging
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+from detection_log import DetectionLog
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LABELS = ['OK', 'NOK', 'PEDRA']
+
+
+def write_frames(log, count, first_seq=1, t0=1000.0):
+    """Um registro por frame; a classe alterna OK, NOK, PEDRA"""
+    for seq in range(first_seq, first_seq + count):
+        log.append(t0 + seq, seq, [(seq % 3, 0.9, (seq, 0, seq + 10, 10))], seq % 3)
+
+
+def test_query_by_time_and_class():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'detections.bin')
+        log = DetectionLog(path, capacity=64, index_stride=8, labels=LABELS)
+        write_frames(log, 40)
+        log.append(2000.0, 41, [], 0)              # frame sem detecção não grava nada
+        assert log.write_count == 40
+
+        rows = log.query(1010, 1019)
+        assert [int(r['seq']) for r in rows] == list(range(10, 20))
+        rows = log.query(class_id=2)
+        assert [int(r['seq']) for r in rows] == list(range(2, 41, 3))
+        assert all(int(r['plc_value']) == 2 for r in rows) and list(rows[0]['box']) == [2, 0, 12, 10]
+        assert len(log.query(1100, 1200)) == 0
+        log.close()
+
+        # Reaberto (como a consulta de linha de comando): mesmos dados e labels
+        reader = DetectionLog(path, readonly=True)
+        assert reader.labels == LABELS and reader.write_count == 40
+        assert len(reader.query(class_id=LABELS.index('PEDRA'))) == 13
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_ring_wraps_and_keeps_newest_capacity_records():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'detections.bin')
+        log = DetectionLog(path, capacity=16, index_stride=4, labels=LABELS)
+        # 16 de capacidade, 22 gravados: sobram 7..22, o bloco mais antigo (4..7) já em parte sobrescrito
+        write_frames(log, 22)
+        rows = log.query()
+        assert [int(r['seq']) for r in rows] == list(range(7, 23)), [int(r['seq']) for r in rows]
+        assert [int(r['seq']) for r in log.query(1000, 1008)] == [7, 8]
+        assert [int(r['seq']) for r in log.query(class_id=1)] == [7, 10, 13, 16, 19, 22]
+        log.close()
+
+        # Reabrir continua escrevendo de onde parou
+        log = DetectionLog(path, capacity=16, index_stride=4, labels=LABELS)
+        write_frames(log, 10, first_seq=23)
+        assert log.write_count == 32
+        assert [int(r['seq']) for r in log.query()] == list(range(17, 33))
+        log.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_incompatible_file_is_moved_aside():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'detections.bin')
+        log = DetectionLog(path, capacity=16, index_stride=4)
+        write_frames(log, 5)
+        log.close()
+        log = DetectionLog(path, capacity=32, index_stride=4)
+        assert log.write_count == 0 and os.path.exists(path + '.old')
+        log.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    tests = [
+        test_query_by_time_and_class,
+        test_ring_wraps_and_keeps_newest_capacity_records,
+        test_incompatible_file_is_moved_aside,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
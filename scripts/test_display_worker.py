@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Teste da thread de exibição: taxa limitada, descarte de frames com a thread ocupada e cópia do frame publicado
+"""
+
+import os
+import sys
+import time
+import logging
+
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+import display
+from display import DisplayWorker
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HIGHGUI = ('namedWindow', 'setWindowProperty', 'resizeWindow', 'moveWindow', 'getWindowImageRect',
+           'imshow', 'waitKey', 'destroyWindow')
+
+
+class FakeHighGui:
+    """Substitui as chamadas HighGUI do cv2 (sem display no ambiente de teste)"""
+
+    def __init__(self, show_s=0.0):
+        self.show_s = show_s
+        self.shown = 0
+        self._saved = {}
+
+    def __enter__(self):
+        self._saved = {name: getattr(display.cv2, name) for name in HIGHGUI}
+        for name in HIGHGUI:
+            setattr(display.cv2, name, lambda *args, **kwargs: None)
+        display.cv2.getWindowImageRect = lambda name: (0, 0, 64, 48)
+        display.cv2.waitKey = lambda delay: -1
+        display.cv2.imshow = self._imshow
+        return self
+
+    def __exit__(self, *exc):
+        for name, fn in self._saved.items():
+            setattr(display.cv2, name, fn)
+
+    def _imshow(self, name, image):
+        # Compositor lento: o imshow segura a thread de exibição
+        time.sleep(self.show_s)
+        self.shown += 1
+
+
+class RecordingWorker(DisplayWorker):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rendered_ids = []
+
+    def render(self, frame, detections, info_text):
+        self.rendered_ids.append(int(frame[0, 0, 0]))
+        return super().render(frame, detections, info_text)
+
+
+def frame_with_id(i):
+    return np.full((48, 64, 3), i % 256, dtype=np.uint8)
+
+
+def test_refresh_rate_is_capped():
+    """Inferência a ~200 fps com a janela a 20 Hz: no máximo ~20 renderizações por segundo"""
+    with FakeHighGui() as gui:
+        worker = RecordingWorker('teste', {}, refresh_hz=20, fullscreen=False)
+        worker.start()
+        try:
+            start = time.monotonic()
+            i = 0
+            while time.monotonic() - start < 1.0:
+                worker.update(frame_with_id(i), [('OK', 0.9, (1, 1, 10, 10))], 'info')
+                i += 1
+                time.sleep(0.005)
+            elapsed = time.monotonic() - start
+        finally:
+            worker.stop()
+    assert worker.frames_received == i
+    assert 5 <= worker.frames_rendered <= 20 * elapsed + 2, (worker.frames_rendered, elapsed)
+    assert gui.shown == worker.frames_rendered
+
+
+def test_busy_worker_drops_frames_without_blocking():
+    """Com o imshow lento, `update` não espera e a thread sempre pega o frame mais recente"""
+    with FakeHighGui(show_s=0.1):
+        worker = RecordingWorker('teste', {}, refresh_hz=0, fullscreen=False)
+        worker.start()
+        try:
+            slowest = 0.0
+            for i in range(50):
+                started = time.perf_counter()
+                worker.update(frame_with_id(i), [])
+                slowest = max(slowest, time.perf_counter() - started)
+                time.sleep(0.01)
+            deadline = time.monotonic() + 2.0
+            while time.monotonic() < deadline and (not worker.rendered_ids or worker.rendered_ids[-1] != 49):
+                time.sleep(0.02)
+        finally:
+            worker.stop()
+    assert worker.frames_received == 50
+    assert worker.frames_rendered < 20, worker.frames_rendered
+    # Nenhum frame é exibido fora de ordem, e o último publicado é o último exibido
+    assert worker.rendered_ids == sorted(worker.rendered_ids) and worker.rendered_ids[-1] == 49
+    assert slowest < 0.05, slowest
+
+
+def test_update_keeps_its_own_copy():
+    """O frame do loop pode ser um buffer da câmera reaproveitado: a thread exibe a cópia publicada"""
+    worker = DisplayWorker('teste', {}, refresh_hz=0, fullscreen=False)
+    camera_buffer = frame_with_id(7)
+    worker.update(camera_buffer, [])
+    camera_buffer[:] = 99                     # câmera reescreveu o buffer
+    first = worker._latest[0]
+    assert first[0, 0, 0] == 7 and not np.shares_memory(first, camera_buffer)
+
+    # Frame substituído antes de ser exibido: o buffer da cópia é reaproveitado
+    worker.update(camera_buffer, [])
+    worker.update(frame_with_id(8), [])
+    assert worker._latest[0] is first and first[0, 0, 0] == 8
+
+
+def main():
+    tests = [
+        test_refresh_rate_is_capped,
+        test_busy_worker_drops_frames_without_blocking,
+        test_update_keeps_its_own_copy,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
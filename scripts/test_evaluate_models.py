@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Teste das métricas da avaliação offline (AP, precisão e recall) e da conferência das classes
+"""
+
+import os
+import sys
+import types
+import logging
+
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+from evaluate_models import (average_precision, check_model_labels, compute_metrics, label_mismatch,
+                             load_ground_truth, match_detections)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _result(boxes, scores, class_ids, gt_boxes, gt_classes):
+    return {
+        'boxes': np.array(boxes, dtype=np.float32).reshape(-1, 4),
+        'scores': np.array(scores, dtype=np.float32),
+        'class_ids': np.array(class_ids, dtype=np.int32),
+        'gt_boxes': np.array(gt_boxes, dtype=np.float32).reshape(-1, 4),
+        'gt_classes': np.array(gt_classes, dtype=np.int32),
+    }
+
+
+def test_perfect_detections_score_one():
+    """Detecções idênticas à verdade: AP, precisão e recall iguais a 1"""
+    results = [_result([[10, 10, 50, 50]], [0.9], [0], [[10, 10, 50, 50]], [0]),
+               _result([[0, 0, 20, 40]], [0.8], [1], [[0, 0, 20, 40]], [1])]
+    metrics = compute_metrics(results, 2, conf_threshold=0.5)
+    assert metrics['map50'] == 1.0 and metrics['map50_95'] == 1.0
+    for m in metrics['per_class'].values():
+        assert m['precision'] == 1.0 and m['recall'] == 1.0
+
+
+def test_false_positive_and_duplicate():
+    """Duplicata conta como falso positivo; caixa sem verdade não gera recall"""
+    gt = [[10, 10, 50, 50]]
+    tp = match_detections(np.array([[10, 10, 50, 50], [11, 11, 50, 50]], np.float32),
+                          np.array([0.9, 0.8], np.float32), np.array(gt, np.float32), 0.5)
+    assert tp.tolist() == [True, False]
+
+    # Falso positivo com score maior que o verdadeiro: AP = 0.5 (precisão 1/2 no recall 1)
+    assert abs(average_precision(np.array([0.9, 0.8]), np.array([False, True]), 1) - 0.5) < 1e-9
+    assert average_precision(np.array([]), np.array([], dtype=bool), 1) == 0.0
+    assert np.isnan(average_precision(np.array([0.9]), np.array([False]), 0))
+
+
+def test_operating_threshold_filters_precision_recall():
+    """Detecções abaixo do limiar de operação contam no AP mas não em precisão/recall"""
+    results = [_result([[10, 10, 50, 50]], [0.3], [0], [[10, 10, 50, 50]], [0])]
+    m = compute_metrics(results, 1, conf_threshold=0.5)['per_class'][0]
+    assert m['recall'] == 0.0 and m['detections'] == 0
+    assert m['ap50'] == 1.0
+
+    # Score igual ao limiar não é detecção no VisionSystem (score > limiar)
+    results = [_result([[10, 10, 50, 50]], [0.5], [0], [[10, 10, 50, 50]], [0])]
+    m = compute_metrics(results, 1, conf_threshold=0.5)['per_class'][0]
+    assert m['detections'] == 0 and m['recall'] == 0.0
+
+
+def test_yolo_labels_to_pixels():
+    """Rótulos YOLO normalizados viram caixas em pixels"""
+    import tempfile
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+        f.write("2 0.5 0.5 0.25 0.5\n")
+    try:
+        boxes, class_ids = load_ground_truth(f.name, 640, 480)
+    finally:
+        os.unlink(f.name)
+    assert class_ids.tolist() == [2]
+    assert boxes.tolist() == [[240.0, 120.0, 400.0, 360.0]]
+
+
+def test_models_with_other_classes_are_flagged():
+    """Modelo com outras classes (ex.: SSD COCO) não é comparado com rótulos de batata"""
+    potato = ['OK', 'NOK', 'PEDRA']
+    assert label_mismatch(types.SimpleNamespace(format_name='yolo', num_classes=3), potato) is None
+    assert '80 classes' in label_mismatch(types.SimpleNamespace(format_name='yolo', num_classes=80), potato)
+    assert label_mismatch(types.SimpleNamespace(format_name='ssd'), potato)
+
+    models_dir = os.path.join(os.path.dirname(script_dir), 'data', 'models')
+    assert check_model_labels(os.path.join(models_dir, 'best_int8_potato.tflite'), potato) is None
+    assert check_model_labels(os.path.join(models_dir, 'lite-model_ssd_mobilenet_v1_1_metadata_2.tflite'), potato)
+
+
+def main():
+    tests = [
+        test_perfect_detections_score_one,
+        test_false_positive_and_duplicate,
+        test_operating_threshold_filters_precision_recall,
+        test_yolo_labels_to_pixels,
+        test_models_with_other_classes_are_flagged,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
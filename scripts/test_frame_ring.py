@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Teste do anel de frames em memória compartilhada (produtor e leitores em processos separados)
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+import logging
+
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+from frame_ring import FrameRingReader, FrameRingWriter
+from frame_source import Frame
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SHAPE = (120, 160, 3)
+
+
+def make_frame(seq):
+    # Cada frame é preenchido com seq % 256: um frame rasgado teria valores misturados
+    return Frame(np.full(SHAPE, seq % 256, dtype=np.uint8), float(seq), seq)
+
+
+# Leitor independente (processo e resource_tracker próprios, como um gravador ou preview)
+READER_SCRIPT = """
+import json, sys
+import numpy as np
+sys.path.insert(0, sys.argv[1])
+from frame_ring import FrameRingReader
+reader = FrameRingReader(sys.argv[2])
+consistent, seqs = True, []
+while len(seqs) < int(sys.argv[3]):
+    frame = reader.next(timeout=5.0)
+    if frame is None:
+        break
+    consistent &= bool(np.all(frame.image == frame.seq % 256)) and frame.timestamp == float(frame.seq)
+    seqs.append(frame.seq)
+print(json.dumps({'seqs': seqs, 'consistent': consistent, **reader.stats()}))
+reader.close()
+"""
+
+
+def test_reader_process_receives_consistent_frames():
+    """Leitor em outro processo recebe frames íntegros, em ordem crescente, sem travar o produtor"""
+    name = f'potato-ring-test-{os.getpid()}'
+    writer = FrameRingWriter(name, slots=4)
+    writer.publish(make_frame(1))
+
+    process = subprocess.Popen([sys.executable, '-c', READER_SCRIPT, os.path.join(base_dir, 'src'), name, '50'],
+                               stdout=subprocess.PIPE, text=True)
+    try:
+        seq = 1
+        start = time.monotonic()
+        while process.poll() is None and time.monotonic() - start < 30:
+            seq += 1
+            writer.publish(make_frame(seq))
+            time.sleep(0.002)
+        result = json.loads(process.communicate(timeout=10)[0])
+    finally:
+        if process.poll() is None:
+            process.kill()
+        writer.close()
+
+    assert result['consistent'], result
+    assert len(result['seqs']) == 50, result
+    assert result['seqs'] == sorted(set(result['seqs']))
+    assert writer.published == seq
+
+
+def test_overwrite_is_detected():
+    """Frames que saíram do anel (ou foram sobrescritos durante o uso) não são entregues"""
+    name = f'potato-ring-test-{os.getpid()}-ow'
+    writer = FrameRingWriter(name, slots=3)
+    writer.publish(make_frame(1))
+    reader = FrameRingReader(name)
+    try:
+        view = reader.read(1, copy=False)
+        assert view is not None and reader.is_valid(1)
+
+        for seq in range(2, 8):
+            writer.publish(make_frame(seq))
+        assert not reader.is_valid(1), "view deveria estar invalidada após a volta no anel"
+        assert reader.read(1) is None and reader.read(4) is None
+        assert reader.read(5).seq == 5
+
+        # Leitor sequencial que ficou para trás pula para o mais antigo disponível
+        reader.last_seq = 1
+        frame = reader.next(timeout=0.1)
+        assert frame.seq == 5 and reader.skipped == 3
+        assert reader.next(timeout=0.1, latest=True).seq == 7
+        assert reader.next(timeout=0.05) is None
+    finally:
+        del view
+        reader.close()
+        writer.close()
+
+
+def test_inconsistent_slot_metadata_counts_as_overwritten():
+    """Forma que não bate com o tamanho (produtor no meio da escrita) vira None, não ValueError"""
+    name = f'potato-ring-test-{os.getpid()}-meta'
+    writer = FrameRingWriter(name, slots=2)
+    writer.publish(make_frame(1))
+    reader = FrameRingReader(name)
+    try:
+        # Metadados de um frame maior gravados, `begin`/`end` ainda do frame 1
+        writer.meta[1]['height'] = SHAPE[0] * 2
+        assert reader.read(1) is None and reader.overwritten == 1
+
+        # Produtor já começou o próximo frame do slot: nem chega a usar os metadados
+        writer.meta[1]['height'] = SHAPE[0]
+        writer.meta[1]['begin'] = 3
+        assert reader.read(1) is None and reader.overwritten == 2
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_oversized_frames_are_skipped():
+    """Frames maiores que o slot são ignorados sem erro"""
+    name = f'potato-ring-test-{os.getpid()}-big'
+    writer = FrameRingWriter(name, slots=2)
+    try:
+        assert writer.publish(make_frame(1))
+        big = Frame(np.zeros((SHAPE[0] * 2, SHAPE[1], 3), dtype=np.uint8), 2.0, 2)
+        assert not writer.publish(big)
+        assert writer.stats()['oversized'] == 1
+    finally:
+        writer.close()
+
+
+def main():
+    tests = [
+        test_reader_process_receives_consistent_frames,
+        test_overwrite_is_detected,
+        test_inconsistent_slot_metadata_counts_as_overwritten,
+        test_oversized_frames_are_skipped,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
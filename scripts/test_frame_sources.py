@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Testes de conformidade das fontes de frames (mesmo contrato para todas)
+"""
+
+import glob
+import os
+import sys
+import types
+import weakref
+import logging
+import tempfile
+
+import cv2
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+from frame_source import FRAME_SOURCES, Frame, create_frame_source
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WIDTH, HEIGHT = 160, 120
+FRAMES = 12
+
+
+def _write_images(directory, count=5):
+    rng = np.random.RandomState(0)
+    for i in range(count):
+        cv2.imwrite(os.path.join(directory, f'{i:03d}.png'), rng.randint(0, 256, (HEIGHT, WIDTH, 3)).astype(np.uint8))
+    return directory
+
+
+def _write_video(path, count=5):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter.fourcc(*'MJPG'), 10, (WIDTH, HEIGHT))
+    if not writer.isOpened():
+        return None
+    rng = np.random.RandomState(0)
+    for _ in range(count):
+        writer.write(rng.randint(0, 256, (HEIGHT, WIDTH, 3)).astype(np.uint8))
+    writer.release()
+    return path
+
+
+def source_factories(tmpdir):
+    """Fontes a testar: nome -> fábrica (None quando indisponível neste ambiente)"""
+    video = _write_video(os.path.join(tmpdir, 'video.avi'))
+    images = _write_images(os.makedirs(os.path.join(tmpdir, 'images')) or os.path.join(tmpdir, 'images'))
+    has_v4l2 = bool(glob.glob('/dev/video*')) and os.getenv('TEST_V4L2', '0') == '1'
+    try:
+        import pypylon  # noqa: F401
+        has_pylon = True
+    except ImportError:
+        has_pylon = False
+    return {
+        'synthetic': lambda: create_frame_source('synthetic', width=WIDTH, height=HEIGHT),
+        'file (imagens)': lambda: create_frame_source('file', path=images),
+        'file (vídeo)': (lambda: create_frame_source('file', path=video)) if video else None,
+        'v4l2': (lambda: create_frame_source('v4l2')) if has_v4l2 else None,
+        'basler (emulador)': (lambda: create_frame_source('basler', emulated=True)) if has_pylon else None,
+    }
+
+
+def check_conformance(source):
+    """Contrato: open -> frames BGR com seq crescente e timestamp monotônico -> stats -> close idempotente"""
+    assert source.source_name in FRAME_SOURCES
+    assert not source.is_open
+    assert source.read() is None, "read antes de open deve retornar None"
+
+    assert source.open() is True
+    assert source.is_open
+    assert source.open() is True, "open repetido deve ser inofensivo"
+
+    last_seq, last_ts = 0, 0.0
+    for _ in range(FRAMES):
+        frame = source.read()
+        assert isinstance(frame, Frame), frame
+        assert isinstance(frame.image, np.ndarray) and frame.image.dtype == np.uint8
+        assert frame.image.ndim == 3 and frame.image.shape[2] == 3
+        assert frame.seq == last_seq + 1, (frame.seq, last_seq)
+        assert frame.timestamp >= last_ts
+        last_seq, last_ts = frame.seq, frame.timestamp
+
+    stats = source.stats()
+    for key in ('source', 'open', 'frames', 'failures', 'consecutive_failures', 'fps', 'last_timestamp'):
+        assert key in stats, key
+    assert stats['frames'] == FRAMES and stats['open']
+
+    source.close()
+    assert not source.is_open
+    assert source.read() is None, "read após close deve retornar None"
+    source.close()
+
+    # Reabrir continua a numeração
+    assert source.open() is True
+    frame = source.read()
+    assert frame is not None and frame.seq == FRAMES + 1
+    source.close()
+
+
+def test_sources_conformance():
+    """Cada fonte disponível neste ambiente cumpre o contrato de FrameSource"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tested = 0
+        for name, factory in source_factories(tmpdir).items():
+            if factory is None:
+                logger.info(f"- {name}: indisponível neste ambiente, ignorada")
+                continue
+            check_conformance(factory())
+            tested += 1
+            logger.info(f"✓ {name}")
+        assert tested >= 2
+
+
+def test_file_source_without_loop_closes_at_end():
+    """Sem loop, a fonte de arquivo fecha sozinha no fim (o loop principal termina)"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = create_frame_source('file', path=_write_images(tmpdir, count=3), loop=False)
+        assert source.open()
+        frames = [source.read() for _ in range(3)]
+        assert all(f is not None for f in frames)
+        assert source.read() is None
+        assert not source.is_open
+
+
+def test_unknown_source_and_missing_path():
+    """Nome desconhecido gera ValueError; caminho inexistente faz open retornar False"""
+    try:
+        create_frame_source('nao-existe')
+        raise AssertionError("esperado ValueError")
+    except ValueError:
+        pass
+    assert create_frame_source('file', path='/nao/existe.mp4').open() is False
+
+
+def test_synthetic_source_paces_to_fps():
+    """Fontes sem relógio próprio respeitam o fps configurado"""
+    import time
+    source = create_frame_source('synthetic', width=WIDTH, height=HEIGHT, fps=100)
+    source.open()
+    start = time.monotonic()
+    for _ in range(11):
+        source.read()
+    assert time.monotonic() - start >= 0.09
+
+
+class FakeGrabResult:
+    """Resultado de captura do pylon: view sem cópia de um buffer da câmera"""
+
+    def __init__(self, camera, buffer):
+        self.camera = camera
+        self.buffer = buffer
+        self.released = False
+
+    def IsValid(self):
+        return True
+
+    def GrabSucceeded(self):
+        return True
+
+    def GetNumberOfSkippedImages(self):
+        return 0
+
+    def GetArrayZeroCopy(self):
+        result = self
+
+        class ZeroCopy:
+            # Como o pypylon: __exit__ falha se ainda houver referências à view
+            def __enter__(self):
+                view = result.buffer[:]
+                self.view = weakref.ref(view)
+                return view
+
+            def __exit__(self, *exc):
+                if self.view() is not None:
+                    raise RuntimeError("view ainda referenciada")
+
+        return ZeroCopy()
+
+    def Release(self):
+        assert not self.released
+        self.released = True
+        self.camera.free.append(self.buffer)
+
+
+class FakeInstantCamera:
+    """Câmera BGR8 com o pool de buffers do pylon: buffer devolvido é reescrito na próxima captura"""
+
+    def __init__(self, device):
+        self.PixelFormat = types.SimpleNamespace(Symbolics=['BGR8', 'Mono8'], Value=None)
+        self.MaxNumBuffer = types.SimpleNamespace(Value=0)
+        self.free = []
+        self.results = []
+        self.seq = 0
+
+    def Open(self):
+        pass
+
+    def StartGrabbing(self, strategy):
+        self.free = [np.zeros((HEIGHT, WIDTH, 3), np.uint8) for _ in range(self.MaxNumBuffer.Value)]
+
+    def RetrieveResult(self, timeout_ms, handling):
+        if not self.free:
+            return None
+        self.seq += 1
+        buffer = self.free.pop(0)
+        buffer[:] = self.seq % 256
+        self.results.append(FakeGrabResult(self, buffer))
+        return self.results[-1]
+
+    def StopGrabbing(self):
+        pass
+
+    def Close(self):
+        pass
+
+
+def fake_pypylon():
+    device = types.SimpleNamespace(GetSerialNumber=lambda: '0815', GetModelName=lambda: 'Emulada')
+    factory = types.SimpleNamespace(EnumerateDevices=lambda: [device], CreateDevice=lambda d: d)
+    pylon = types.SimpleNamespace(
+        TlFactory=types.SimpleNamespace(GetInstance=lambda: factory),
+        InstantCamera=FakeInstantCamera,
+        GrabStrategy_LatestImageOnly=1,
+        TimeoutHandling_Return=2,
+    )
+    return types.SimpleNamespace(pylon=pylon)
+
+
+def test_v4l2_frame_timestamp_comes_from_the_driver_buffer():
+    """Timestamp do buffer V4L2 (monotônico) vira o instante de captura; incoerente, vale o retorno do read"""
+    import time
+    from frame_source import V4L2Source
+
+    class FakeCapture:
+        buffer_ms = 0.0
+
+        def read(self):
+            return True, np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+
+        def get(self, prop):
+            assert prop == cv2.CAP_PROP_POS_MSEC
+            return self.buffer_ms
+
+    source = V4L2Source()
+    source.cap = FakeCapture()
+    source.is_open = True
+
+    source.cap.buffer_ms = (time.monotonic() - 0.040) * 1000    # capturado 40ms antes do read voltar
+    before = time.time()
+    frame = source.read()
+    assert abs((before - frame.timestamp) - 0.040) < 0.01
+    assert abs(source.stats()['capture_age_ms'] - 40) < 10
+
+    for bogus in (0.0, (time.monotonic() + 5) * 1000, 1e3):   # sem timestamp, no futuro, relógio diferente
+        source.cap.buffer_ms = bogus
+        before = time.time()
+        frame = source.read()
+        assert 0 <= frame.timestamp - before < 0.01
+
+
+def test_basler_never_releases_a_referenced_buffer():
+    """Buffer com view viva não volta ao pylon (seria reescrito); volta quando a view some"""
+    saved = sys.modules.get('pypylon')
+    sys.modules['pypylon'] = fake_pypylon()
+    try:
+        source = create_frame_source('basler', pixel_formats=['BGR8'], hold_frames=2)
+        assert source.open() and source.pixel_format == 'BGR8'
+        camera = source.camera
+
+        kept = source.read().image          # consumidor que guardou a view
+        assert kept[0, 0, 0] == 1
+        for _ in range(3):
+            assert source.read() is not None
+        first = camera.results[0]
+        assert not first.released and source.late_releases == 1
+        assert source.stats()['lingering_buffers'] == 1
+        # Os outros buffers continuam circulando; o retido não é reescrito
+        assert camera.results[1].released and not camera.results[3].released
+        assert kept[0, 0, 0] == 1
+
+        del kept
+        assert source.read() is not None
+        assert first.released and source.stats()['lingering_buffers'] == 0
+        source.close()
+        assert all(r.released for r in camera.results)
+    finally:
+        if saved is None:
+            sys.modules.pop('pypylon', None)
+        else:
+            sys.modules['pypylon'] = saved
+
+
+def main():
+    tests = [
+        test_sources_conformance,
+        test_file_source_without_loop_closes_at_end,
+        test_unknown_source_and_missing_path,
+        test_synthetic_source_paces_to_fps,
+        test_v4l2_frame_timestamp_comes_from_the_driver_buffer,
+        test_basler_never_releases_a_referenced_buffer,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Teste do logging assíncrono: fila sem bloqueio, limitador de repetições e registros chave=valor
+"""
+
+import io
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+from log_setup import KeyValueFormatter, NonBlockingQueueHandler, RateLimitFilter, log_event
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def make_logger(name, interval=10.0, queue_size=1000):
+    """Logger isolado: fila -> listener -> StringIO"""
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(KeyValueFormatter('%(levelname)s %(message)s'))
+    log_queue = queue.Queue(maxsize=queue_size)
+    handler = NonBlockingQueueHandler(log_queue)
+    rate_limit = RateLimitFilter(interval)
+    handler.addFilter(rate_limit)
+    test_logger = logging.getLogger(name)
+    test_logger.handlers = [handler]
+    test_logger.propagate = False
+    test_logger.setLevel(logging.INFO)
+    listener = logging.handlers.QueueListener(log_queue, output)
+    return test_logger, handler, rate_limit, listener, stream
+
+
+def test_repeated_messages_are_rate_limited():
+    """Falha repetida em todo frame vira uma linha por intervalo, com a contagem suprimida"""
+    test_logger, _, rate_limit, listener, stream = make_logger('test_rate', interval=0.2)
+    listener.start()
+    for seq in range(100):
+        log_event(test_logger, logging.ERROR, 'frame_error', seq=seq, error='ValueError', detail='shape errada')
+    log_event(test_logger, logging.ERROR, 'frame_error', seq=100, error='KeyError', detail='x')
+    time.sleep(0.25)
+    log_event(test_logger, logging.ERROR, 'frame_error', seq=101, error='ValueError', detail='shape errada')
+    test_logger.error("mensagem de texto")
+    test_logger.error("mensagem de texto")
+    rate_limit.flush(test_logger)
+    listener.stop()
+
+    lines = stream.getvalue().splitlines()
+    assert lines[0] == 'ERROR frame_error seq=0 error=ValueError detail="shape errada"', lines
+    assert lines[1] == 'ERROR frame_error seq=100 error=KeyError detail=x', lines
+    assert lines[2].endswith('seq=101 error=ValueError detail="shape errada" (+99 iguais suprimidas)'), lines
+    assert lines[3] == 'ERROR mensagem de texto'
+    assert lines[4] == 'ERROR 1 ocorrências suprimidas de: mensagem de texto', lines
+    assert len(lines) == 5 and rate_limit.suppressed_total == 100
+
+
+def test_full_queue_drops_without_blocking():
+    """Sem listener a fila enche: o chamador não bloqueia e os descartes são informados depois"""
+    test_logger, handler, _, listener, stream = make_logger('test_full', interval=0, queue_size=10)
+    start = time.perf_counter()
+    for i in range(1000):
+        test_logger.info(f"registro {i}")
+    assert time.perf_counter() - start < 1.0
+    assert handler.dropped == 990
+
+    listener.start()
+    time.sleep(0.05)
+    test_logger.info("depois")
+    listener.stop()
+    lines = stream.getvalue().splitlines()
+    assert lines[-2] == 'WARNING ⚠️ Fila de log cheia: 990 registros descartados', lines[-3:]
+    assert lines[-1] == 'INFO depois'
+
+
+def test_formatting_happens_on_listener_thread():
+    """A thread que loga não formata: o listener é quem converte os campos em texto"""
+    formatted_by = []
+
+    class Probe:
+        def __str__(self):
+            formatted_by.append(threading.current_thread().name)
+            return 'probe'
+
+    test_logger, _, _, listener, stream = make_logger('test_thread', interval=0)
+    listener.start()
+    log_event(test_logger, logging.INFO, 'frame', seq=1, value=Probe(), ms=1.5)
+    listener.stop()
+    assert formatted_by and threading.main_thread().name not in formatted_by
+    assert stream.getvalue().strip() == 'INFO frame seq=1 value=probe ms=1.5'
+
+
+def main():
+    tests = [
+        test_repeated_messages_are_rate_limited,
+        test_full_queue_drops_without_blocking,
+        test_formatting_happens_on_listener_thread,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
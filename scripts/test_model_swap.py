@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Teste da troca de modelo a quente: carga em segundo plano, verificação da assinatura e troca sem perder frames
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+import logging
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+os.environ['HEADLESS'] = '1'
+os.environ['DETECTION_LOG_PATH'] = ''
+os.environ['CAPTURE_DIR'] = ''
+
+from decoders import create_decoder
+from frame_source import SyntheticSource
+from model_swap import ModelCandidate, ModelSwapper, check_signature
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+models_dir = os.path.join(base_dir, 'data', 'models')
+YOLO_MODEL = os.path.join(models_dir, 'best_int8_potato.tflite')
+SSD_MODEL = os.path.join(models_dir, 'lite-model_ssd_mobilenet_v1_1_metadata_2.tflite')
+
+
+def load_interpreter(path):
+    try:
+        import tflite_runtime.interpreter as tflite
+    except ImportError:
+        import tensorflow as tf
+        tflite = tf.lite
+    interpreter = tflite.Interpreter(model_path=path)
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+def prepare(path):
+    interpreter = load_interpreter(path)
+    return ModelCandidate(path, [interpreter], create_decoder(interpreter))
+
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return
+        time.sleep(0.02)
+    raise AssertionError("condição não atingida")
+
+
+def test_candidate_ready_only_after_signature_check():
+    current = load_interpreter(YOLO_MODEL)
+    swapper = ModelSwapper(prepare, YOLO_MODEL, create_decoder(current), warmup_invokes=2)
+    try:
+        # Formato de saída diferente (SSD no lugar de YOLO): recusado, o atual continua
+        swapper.request(SSD_MODEL)
+        wait_for(lambda: swapper.state == 'failed')
+        assert swapper.take() is None and 'formato' in swapper.last_error
+
+        other = os.path.join(models_dir, 'best_int8.tflite')
+        swapper.request(other)
+        wait_for(lambda: swapper.state == 'ready')
+        candidate = swapper.take()
+        assert candidate.path == other and candidate.warm_ms > 0
+        assert swapper.take() is None
+        swapper.committed(candidate, 0.5)
+        status = swapper.status()
+        assert status['current'] == other and status['swaps'] == 1 and status['last_swap']['swap_ms'] == 0.5
+
+        try:
+            swapper.request(os.path.join(models_dir, 'inexistente.tflite'))
+            raise AssertionError("arquivo inexistente deveria ser recusado")
+        except ValueError:
+            pass
+    finally:
+        swapper.stop()
+
+
+def test_signature_compares_output_shapes():
+    """Mesmo formato e classes desconhecidas (None == None) não bastam: as formas de saída decidem"""
+    ssd = create_decoder(load_interpreter(SSD_MODEL))
+    check_signature(ssd, create_decoder(load_interpreter(SSD_MODEL)))
+
+    other = types.SimpleNamespace(format_name='ssd', output_shapes=[(1, 25, 4), (1, 25), (1, 25), (1,)])
+    for candidate, message in [(other, 'formas'), (types.SimpleNamespace(format_name='ssd'), 'desconhecidas')]:
+        try:
+            check_signature(ssd, candidate)
+            raise AssertionError("assinatura diferente deveria ser recusada")
+        except ValueError as e:
+            assert message in str(e)
+
+
+def test_model_action_rejects_paths_outside_models_dir():
+    """A API só carrega modelos de data/models, mesmo com `..`, caminho absoluto ou link simbólico"""
+    import main as vision_main
+    requested = []
+    swapper = types.SimpleNamespace(request=lambda path: requested.append(path) or {'state': 'loading'},
+                                    status=lambda: {'state': 'idle'})
+    vision = types.SimpleNamespace(model_swapper=swapper)
+    action = vision_main.VisionSystem._model_action
+
+    assert action(vision, {}) == {'state': 'idle'}
+    action(vision, {'path': 'best_int8.tflite'})
+    action(vision, {'path': os.path.join(models_dir, 'sub', '..', 'best_int8.tflite')})
+    assert requested == [os.path.realpath(os.path.join(models_dir, 'best_int8.tflite'))] * 2
+
+    outside = tempfile.mkdtemp()
+    link = os.path.join(models_dir, 'fora-teste.tflite')
+    try:
+        target = os.path.join(outside, 'modelo.tflite')
+        shutil.copy(YOLO_MODEL, target)
+        os.symlink(target, link)
+        for path in ['../../src/main.py', target, '/etc/passwd', 'fora-teste.tflite']:
+            try:
+                action(vision, {'path': path})
+                raise AssertionError(f"{path} deveria ser recusado")
+            except ValueError as e:
+                assert 'fora de' in str(e)
+        assert len(requested) == 2
+    finally:
+        if os.path.lexists(link):
+            os.remove(link)
+        shutil.rmtree(outside)
+
+
+def test_watcher_loads_file_after_it_settles():
+    """Arquivo publicado no diretório observado (cópia + mv) é carregado depois de estabilizar"""
+    watch_dir = tempfile.mkdtemp()
+    requested = []
+    try:
+        swapper = ModelSwapper(lambda path: requested.append(path) or prepare(path), YOLO_MODEL,
+                               create_decoder(load_interpreter(YOLO_MODEL)), watch_path=watch_dir,
+                               poll_s=3600, settle_s=0.1, warmup_invokes=1)
+        try:
+            assert swapper.poll() is None
+            tmp = os.path.join(watch_dir, 'novo.tflite.tmp')
+            shutil.copy(YOLO_MODEL, tmp)
+            assert swapper.poll() is None            # .tmp não é observado
+            target = os.path.join(watch_dir, 'novo.tflite')
+            os.rename(tmp, target)
+            assert swapper.poll() is None            # acabou de mudar: espera estabilizar
+            time.sleep(0.15)
+            assert swapper.poll() == target
+            wait_for(lambda: swapper.state == 'ready')
+            assert requested == [target] and swapper.poll() is None
+        finally:
+            swapper.stop()
+    finally:
+        shutil.rmtree(watch_dir)
+
+
+class SwapCamera(SyntheticSource):
+    """Fonte sintética que pede a troca logo no início e encerra alguns frames depois dela"""
+
+    def __init__(self, vision, model_path, frames_after_swap=5, max_frames=3000):
+        # Ritmo de câmera: a carga em segundo plano (com nice) usa as folgas entre frames
+        super().__init__(variants=4, fps=2)
+        self.vision = vision
+        self.model_path = model_path
+        self.frames_after_swap = frames_after_swap
+        self.max_frames = max_frames
+        self.swapped_at = None
+        self.open()
+
+    def read(self):
+        swapper = self.vision.model_swapper
+        if self.seq == 2:
+            swapper.request(self.model_path)
+        if self.swapped_at is None and swapper.swaps:
+            self.swapped_at = self.seq
+        if self.seq >= self.max_frames or (self.swapped_at and self.seq - self.swapped_at >= self.frames_after_swap):
+            self.close()
+            return None
+        return super().read()
+
+
+def test_swap_in_loop_with_pipeline_loses_no_frames():
+    """Troca no meio do loop com 2 interpretadores em alternância: todo frame lido é decidido"""
+    import main as vision_main
+    from pipeline import InferencePipeline
+
+    # Sem cliente PLC: o teste não abre conexão nem thread de reconexão
+    saved = vision_main.PLC_ENABLED
+    vision_main.PLC_ENABLED = False
+    try:
+        vision = vision_main.VisionSystem()
+    finally:
+        vision_main.PLC_ENABLED = saved
+    assert vision.plc is None
+    replicas = vision.delegate_chain.replicate(vision.model_path, 1)
+    vision.pipeline = InferencePipeline([vision.interpreter] + replicas)
+    old_interpreter = vision.interpreter
+    vision.model_swapper = ModelSwapper(vision._prepare_model, vision.model_path, vision.decoder, warmup_invokes=1)
+
+    swap_dir = tempfile.mkdtemp()
+    new_model = os.path.join(swap_dir, 'modelo_novo.tflite')
+    shutil.copy(vision.model_path, new_model)
+
+    handled = []
+    handle = vision._handle_detections
+    vision._handle_detections = lambda frame, *args: handled.append(frame.seq) or handle(frame, *args)
+    vision.camera = SwapCamera(vision, new_model)
+    try:
+        vision.process_frame()
+    finally:
+        vision.cleanup()
+        shutil.rmtree(swap_dir)
+
+    camera = vision.camera
+    assert vision.model_swapper.swaps == 1, vision.model_swapper.status()
+    assert vision.model_path == new_model and vision.interpreter is not old_interpreter
+    assert vision.pipeline.depth == 2 and vision.pipeline.slots[0].interpreter is vision.interpreter
+    assert handled == list(range(1, camera.seq + 1)), (handled[:5], camera.seq)
+
+
+def main():
+    tests = [
+        test_candidate_ready_only_after_signature_check,
+        test_signature_compares_output_shapes,
+        test_model_action_rejects_paths_outside_models_dir,
+        test_watcher_loads_file_after_it_settles,
+        test_swap_in_loop_with_pipeline_loses_no_frames,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
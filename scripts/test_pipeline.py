@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Teste do pipeline com interpretadores em alternância (PIPELINE_DEPTH > 1)
+"""
+
+import os
+import sys
+import time
+import logging
+
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+from decoders import create_decoder
+from frame_source import Frame
+from pipeline import InferencePipeline
+from preprocessing import InputWriter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODEL = os.path.join(base_dir, 'data', 'models', 'best_int8_potato.tflite')
+
+
+def load_interpreter():
+    try:
+        import tflite_runtime.interpreter as tflite
+    except ImportError:
+        import tensorflow as tf
+        tflite = tf.lite
+    interpreter = tflite.Interpreter(model_path=MODEL)
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+class SlowInterpreter:
+    """Interpretador real com atraso no invoke (força slots a terminarem fora de ordem)"""
+
+    def __init__(self, interpreter, delay):
+        self._interpreter = interpreter
+        self.delay = delay
+
+    def __getattr__(self, name):
+        return getattr(self._interpreter, name)
+
+    def invoke(self):
+        time.sleep(self.delay)
+        self._interpreter.invoke()
+
+
+def make_frames(count, width=320, height=240):
+    rng = np.random.RandomState(0)
+    return [Frame(rng.randint(0, 256, (height, width, 3)).astype(np.uint8), time.time(), seq + 1)
+            for seq in range(count)]
+
+
+def sequential_results(frames, conf=0.1, iou=0.45):
+    interpreter = load_interpreter()
+    writer = InputWriter(interpreter, interpreter.get_input_details()[0])
+    decoder = create_decoder(interpreter)
+    results = []
+    for frame in frames:
+        writer.write(frame.image)
+        interpreter.invoke()
+        results.append(decoder.decode(interpreter, frame.image.shape[1], frame.image.shape[0], conf, iou))
+    return results
+
+
+def test_results_in_order_and_match_sequential():
+    """Mesmas detecções do modo sequencial, na ordem dos frames, mesmo com slots fora de ordem"""
+    frames = make_frames(8)
+    expected = sequential_results(frames)
+
+    # O primeiro slot é bem mais lento: o segundo termina antes e precisa esperar a vez
+    pipeline = InferencePipeline([SlowInterpreter(load_interpreter(), 0.05), load_interpreter()])
+    results = []
+    try:
+        for frame in frames:
+            pipeline.submit(frame, 0.1, 0.45)
+            results.extend(pipeline.collect(wait=pipeline.in_flight >= pipeline.depth))
+        results.extend(pipeline.drain())
+    finally:
+        pipeline.close()
+
+    assert [r.frame.seq for r in results] == [f.seq for f in frames]
+    for result, (boxes, scores, class_ids) in zip(results, expected):
+        assert result.error is None
+        np.testing.assert_array_equal(result.boxes, boxes)
+        np.testing.assert_allclose(result.scores, scores)
+        np.testing.assert_array_equal(result.class_ids, class_ids)
+    assert pipeline.in_flight == 0
+
+
+def test_errors_are_reported_in_order():
+    """Uma falha no invoke vira resultado com `error`, sem travar os frames seguintes"""
+    class FailingInterpreter(SlowInterpreter):
+        def invoke(self):
+            raise RuntimeError("falha simulada")
+
+    pipeline = InferencePipeline([FailingInterpreter(load_interpreter(), 0), load_interpreter()])
+    try:
+        for frame in make_frames(4):
+            pipeline.submit(frame, 0.1, 0.45)
+        results = pipeline.drain()
+    finally:
+        pipeline.close()
+
+    assert [r.frame.seq for r in results] == [1, 2, 3, 4]
+    errors = [r for r in results if r.error is not None]
+    assert errors and all(isinstance(r.error, RuntimeError) for r in errors)
+    assert all(r.boxes is not None for r in results if r.error is None)
+
+
+def main():
+    tests = [
+        test_results_in_order_and_match_sequential,
+        test_errors_are_reported_in_order,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
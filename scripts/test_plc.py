@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Teste do cliente PLC: escritas serializadas entre threads e conexão em segundo plano
+"""
+
+import os
+import sys
+import threading
+import time
+import logging
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+import plc as plc_module
+from plc import Plc
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeClient:
+    """Cliente snap7 simulado que acusa chamadas simultâneas"""
+
+    connect_delay_s = 0.0
+
+    def __init__(self):
+        self.writes = []
+        self.inside = 0
+        self.overlaps = 0
+        self.connected = False
+
+    def connect(self, address, rack, slot):
+        time.sleep(self.connect_delay_s)
+        self.connected = True
+
+    def get_connected(self):
+        return self.connected
+
+    def disconnect(self):
+        self.connected = False
+
+    def write_area(self, area, db, start, data):
+        self.inside += 1
+        if self.inside > 1:
+            self.overlaps += 1
+        time.sleep(0.001)
+        self.writes.append((start, bytes(data)))
+        self.inside -= 1
+
+
+def test_writes_from_two_threads_are_serialized():
+    plc = Plc()
+    plc.client = FakeClient()
+    plc.client.connected = True
+    plc.connected = True
+
+    def status_writes():
+        for _ in range(50):
+            plc.write_db(3, start=4)
+
+    def reject_writes():
+        for i in range(50):
+            plc.write_reject(1, i)
+
+    threads = [threading.Thread(target=status_writes), threading.Thread(target=reject_writes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(plc.client.writes) == 100 and plc.client.overlaps == 0
+
+
+def test_background_connect_does_not_block():
+    original = plc_module.snap7.client.Client
+    FakeClient.connect_delay_s = 0.3
+    plc_module.snap7.client.Client = FakeClient
+    plc = Plc()
+    try:
+        start = time.monotonic()
+        plc.connect_in_background()
+        assert time.monotonic() - start < 0.1 and not plc.connected
+        # Escritas durante a conexão voltam na hora, sem esperar o connect
+        assert plc.write_db(3, start=4) is False
+
+        deadline = time.monotonic() + 5.0
+        while not plc.connected and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert plc.connected and plc.write_db(3, start=4)
+        assert plc.client.writes == [(4, b'\x00\x03')]
+    finally:
+        plc.disconnect()
+        plc_module.snap7.client.Client = original
+        FakeClient.connect_delay_s = 0.0
+
+
+def main():
+    tests = [
+        test_writes_from_two_threads_are_serialized,
+        test_background_connect_does_not_block,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
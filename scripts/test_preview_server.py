@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Teste do preview MJPEG: codificação só com clientes conectados
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.request
+import logging
+
+import cv2
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+from preview_server import PreviewServer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def frame():
+    return np.random.randint(0, 256, size=(480, 640, 3), dtype=np.uint8)
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("condição não atingida")
+
+
+def test_no_encoding_without_clients():
+    preview = PreviewServer(0, {}, max_fps=50, max_width=320)
+    for _ in range(20):
+        preview.update(frame(), [])
+    # Sem clientes o frame nem é guardado e não existe thread de codificação
+    assert preview._latest is None and preview._encoder_thread is None and preview.frames_encoded == 0
+
+    preview._client_connected()
+    try:
+        preview.update(frame(), [('OK', 0.9, (10, 10, 100, 100))])
+        seq, jpeg = preview.wait_jpeg(0)
+        assert jpeg is not None and jpeg[:2] == b'\xff\xd8' and preview.frames_encoded == 1
+    finally:
+        preview._client_disconnected()
+
+    # Último cliente saiu: a thread termina e novos frames são ignorados
+    wait_for(lambda: preview._encoder_thread is None)
+    encoded = preview.frames_encoded
+    for _ in range(10):
+        preview.update(frame(), [])
+    time.sleep(0.05)
+    assert preview.frames_encoded == encoded and preview._latest is None
+    preview.stop()
+
+
+def test_snapshot_over_http_is_downscaled_and_rate_limited():
+    preview = PreviewServer(0, {}, max_fps=5, max_width=320, host='127.0.0.1')
+    assert preview.start()
+    port = preview.httpd.server_address[1]
+    stop = threading.Event()
+
+    def feed():
+        while not stop.is_set():
+            preview.update(frame(), [])
+            time.sleep(0.01)
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    try:
+        started = time.monotonic()
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/snapshot.jpg', timeout=5) as response:
+            assert response.headers['Content-Type'] == 'image/jpeg'
+            jpeg = response.read()
+        image = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        assert image.shape == (240, 320, 3)
+
+        # Cliente saiu: nada mais é codificado, mesmo com frames chegando
+        wait_for(lambda: preview.clients == 0 and preview._encoder_thread is None)
+        encoded = preview.frames_encoded
+        assert encoded <= 5 * (time.monotonic() - started) + 1
+        time.sleep(0.3)
+        assert preview.frames_encoded == encoded
+    finally:
+        stop.set()
+        feeder.join()
+        preview.stop()
+
+
+def test_stalled_stream_notices_disconnected_client():
+    """Sem frames chegando, o stream ainda escreve no socket e um cliente que saiu é liberado"""
+    preview = PreviewServer(0, {}, max_fps=5, max_width=320, host='127.0.0.1', keepalive_s=0.1)
+    assert preview.start()
+    port = preview.httpd.server_address[1]
+    try:
+        client = socket.create_connection(('127.0.0.1', port), timeout=5)
+        client.sendall(b'GET /stream.mjpg HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        assert client.recv(4096).startswith(b'HTTP/1.0 200')
+        wait_for(lambda: preview.clients == 1 and preview._encoder_thread is not None)
+        client.close()
+
+        # Nenhum update(): só o keepalive revela a desconexão e a codificação para
+        wait_for(lambda: preview.clients == 0 and preview._encoder_thread is None)
+    finally:
+        preview.stop()
+
+
+def main():
+    tests = [
+        test_no_encoding_without_clients,
+        test_snapshot_over_http_is_downscaled_and_rate_limited,
+        test_stalled_stream_notices_disconnected_client,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Teste do perfilamento sob demanda: arquivos gerados e desarme quando não é possível iniciar
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import logging
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+from profiler import FrameProfiler
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def busy_frame():
+    return sum(i * i for i in range(2000))
+
+
+def test_profiles_requested_frames_and_disarms():
+    directory = tempfile.mkdtemp()
+    try:
+        profiler = FrameProfiler(os.path.join(directory, 'profiles'), sample_hz=500)
+        assert profiler.request(3) and not profiler.request(5)
+        frames = 0
+        while profiler.armed:
+            profiler.tick()
+            busy_frame()
+            frames += 1
+        assert frames == 4           # início + 3 frames perfilados
+        pstats_path, collapsed_path = profiler.last_outputs
+        assert os.path.getsize(pstats_path) > 0 and os.path.exists(collapsed_path)
+        assert not profiler.status()['active']
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_start_failure_disarms_instead_of_raising_every_frame():
+    directory = tempfile.mkdtemp()
+    try:
+        # Diretório de saída impossível: um arquivo ocupa o caminho
+        blocker = os.path.join(directory, 'ocupado')
+        open(blocker, 'w').close()
+        profiler = FrameProfiler(os.path.join(blocker, 'profiles'))
+        profiler.request(10)
+        profiler.tick()
+        assert not profiler.armed and not profiler.status()['active'] and profiler.last_outputs is None
+
+        # Um novo pedido pode ser feito depois de corrigir o problema
+        profiler.output_dir = os.path.join(directory, 'profiles')
+        assert profiler.request(1)
+        profiler.tick()
+        profiler.tick()
+        assert not profiler.armed and profiler.last_outputs
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    tests = [
+        test_profiles_requested_frames_and_disarms,
+        test_start_failure_disarms_instead_of_raising_every_frame,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Teste do modo tempo real: lista de CPUs, coleta de lixo nas folgas e relatório de latência
+"""
+
+import gc
+import os
+import sys
+import threading
+import logging
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+from realtime import (IdleGc, LatencyReport, apply_thread_policy, housekeeping_cpus, parse_cpu_list,
+                      release_thread, set_housekeeping_cpus)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def test_parse_cpu_list():
+    assert parse_cpu_list('') == set()
+    assert parse_cpu_list('2,3') == {2, 3}
+    assert parse_cpu_list('0-2, 5') == {0, 1, 2, 5}
+
+
+def test_thread_policy_without_dedicated_cpus_never_uses_fifo():
+    """Sem CPUs dedicadas a prioridade FIFO não é pedida (no máximo nice)"""
+    applied = apply_thread_policy('teste', cpus=None, priority=10, nice=0)
+    assert not any('SCHED_FIFO' in item for item in applied)
+    assert os.sched_getscheduler(0) != os.SCHED_FIFO
+
+
+def test_idle_gc_collects_only_in_slack_or_when_forced():
+    idle_gc = IdleGc(gen1_every=0, force_factor=3)
+    idle_gc.freeze()
+    try:
+        assert not gc.isenabled()
+        garbage = []
+        for _ in range(idle_gc.threshold + 10):
+            garbage.append([])
+
+        # Sem folga: nada é coletado até o limite forçado
+        idle_gc.idle(0.0)
+        assert idle_gc.collections == [0, 0, 0]
+
+        # Com folga: coleta a geração 0
+        idle_gc.idle(1.0)
+        assert idle_gc.collections[0] == 1 and idle_gc.forced == 0
+
+        for _ in range(idle_gc.threshold * 4):
+            garbage.append([])
+        idle_gc.idle(0.0)
+        assert idle_gc.forced == 1
+        assert idle_gc.stats()['max_pause_ms'] >= 0
+    finally:
+        idle_gc.unfreeze()
+    assert gc.isenabled() and gc.get_freeze_count() == 0
+
+
+def test_latency_report_percentiles():
+    report = LatencyReport('teste', report_interval=0.0)
+    assert not report.due() and report.summary() is None
+    for ms in [10] * 98 + [50, 60]:
+        report.record(ms / 1000)
+    assert report.due()
+    summary = report.summary()
+    assert abs(summary['p50_ms'] - 10) < 1e-6
+    assert summary['max_ms'] == 60 and summary['jitter_p99_ms'] > 30
+    report.report()
+    assert report.last['frames'] == 100 and not report.samples
+
+
+def test_spawned_threads_leave_the_realtime_cpus():
+    """Thread criada por uma thread fixada herda a afinidade; release_thread a devolve às CPUs de manutenção"""
+    available = os.sched_getaffinity(0)
+    assert housekeeping_cpus(available) == available           # nada sobra: usa todas
+    if len(available) < 2:
+        # Uma CPU só: a herança da afinidade não é observável, mas a política é reaplicada
+        set_housekeeping_cpus(available)
+        try:
+            assert release_thread('teste') and os.sched_getscheduler(0) == os.SCHED_OTHER
+        finally:
+            set_housekeeping_cpus(None)
+        return
+    dedicated = {min(available)}
+    housekeeping = housekeeping_cpus(dedicated)
+    assert housekeeping == available - dedicated
+
+    def spawned(result):
+        result['inherited'] = os.sched_getaffinity(0)
+        result['released'] = release_thread('teste')
+        result['after'] = os.sched_getaffinity(0)
+        result['policy'] = os.sched_getscheduler(0)
+
+    def pinned_parent(result):
+        os.sched_setaffinity(0, dedicated)
+        child = threading.Thread(target=spawned, args=(result,))
+        child.start()
+        child.join()
+
+    assert release_thread('desligado') is False                # sem modo tempo real: não faz nada
+    set_housekeeping_cpus(housekeeping)
+    try:
+        result = {}
+        parent = threading.Thread(target=pinned_parent, args=(result,))
+        parent.start()
+        parent.join()
+    finally:
+        set_housekeeping_cpus(None)
+    assert result['inherited'] == dedicated
+    assert result['released'] and result['after'] == housekeeping and result['policy'] == os.SCHED_OTHER
+
+
+def test_realtime_mode_accepts_truthy_values():
+    import subprocess
+    code = "import os, sys; sys.path.insert(0, 'src'); os.environ['HEADLESS'] = '1'; import main; print(main.REALTIME_MODE)"
+    for value, expected in (('true', 'True'), ('1', 'True'), ('On', 'True'), ('0', 'False'), ('false', 'False')):
+        env = dict(os.environ, REALTIME_MODE=value)
+        out = subprocess.run([sys.executable, '-c', code], cwd=base_dir, env=env, capture_output=True, text=True)
+        assert out.stdout.strip().splitlines()[-1] == expected, (value, out.stdout, out.stderr[-500:])
+
+
+def main():
+    tests = [
+        test_parse_cpu_list,
+        test_thread_policy_without_dedicated_cpus_never_uses_fifo,
+        test_idle_gc_collects_only_in_slack_or_when_forced,
+        test_latency_report_percentiles,
+        test_spawned_threads_leave_the_realtime_cpus,
+        test_realtime_mode_accepts_truthy_values,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
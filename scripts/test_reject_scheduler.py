@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Teste do agendamento de rejeição compensado pela latência
+"""
+
+import os
+import sys
+import time
+import logging
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+from reject_scheduler import RejectScheduler
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class RecordingPlc:
+    def __init__(self, ok=True):
+        self.writes = []
+        self.ok = ok
+
+    def send(self, value, delay_ms):
+        self.writes.append((time.monotonic(), value, delay_ms))
+        return self.ok
+
+
+def test_fires_at_arrival_regardless_of_frame_age():
+    """Frames com idades diferentes disparam no instante de chegada, não no da decisão"""
+    plc = RecordingPlc()
+    # 1000 mm/s e 200 mm até o ejetor: 200ms de percurso, 20ms de atuação
+    scheduler = RejectScheduler(plc.send, 1000, 200, actuation_ms=20, pulse_ms=10, merge_ms=5)
+    try:
+        now_wall, now_mono = time.time(), time.monotonic()
+        expected = []
+        for age in (0.01, 0.05, 0.12):
+            # Inferência lenta ou rápida: a idade do frame não muda o instante de disparo
+            fire_at = scheduler.submit(now_wall - age, 2, stages={'inference': age})
+            expected.append(now_mono - age + 0.2 - 0.02)
+            assert abs(fire_at - expected[-1]) < 0.005
+        time.sleep(0.35)
+    finally:
+        scheduler.close()
+
+    fires = [w for w in plc.writes if w[1] == 2]
+    assert len(fires) == 3
+    for (when, _, _), target in zip(sorted(fires), sorted(expected)):
+        assert abs(when - target) < 0.02, (when - target)
+    # Cada disparo volta a OK depois do pulso
+    assert plc.writes[-1][1] == 0
+    assert scheduler.stats()['stage_p50_ms']['inference'] > 0
+
+
+def test_position_in_frame_and_merge():
+    """Objeto mais adiantado no frame chega antes; o mesmo objeto em frames seguidos é fundido"""
+    plc = RecordingPlc()
+    scheduler = RejectScheduler(plc.send, 1000, 500, mm_per_px=1.0, belt_direction='down', merge_ms=30)
+    try:
+        center = scheduler.travel_s((320, 240, 640, 480))
+        ahead = scheduler.travel_s((320, 440, 640, 480))
+        assert abs(center - 0.5) < 1e-9 and abs(ahead - 0.3) < 1e-9
+
+        # Mesmo objeto: 33ms depois ele andou 33mm (33px), chegada igual
+        t = time.time()
+        assert scheduler.submit(t - 0.033, 1, (320, 240, 640, 480)) is not None
+        assert scheduler.submit(t, 1, (320, 273, 640, 480)) is None
+        assert scheduler.merged == 1 and scheduler.scheduled == 1
+    finally:
+        scheduler.close()
+
+
+def test_object_in_view_for_many_frames_is_one_rejection():
+    """Sem mm_per_px o instante avança 33ms por frame: a fusão compara com as detecções já fundidas também"""
+    plc = RecordingPlc()
+    scheduler = RejectScheduler(plc.send, 1000, 500, merge_ms=40)
+    try:
+        t = time.time() - 0.4
+        fired = [scheduler.submit(t + i * 0.033, 1) for i in range(6)]
+        assert fired[0] is not None and fired[1:] == [None] * 5
+        assert scheduler.scheduled == 1 and scheduler.merged == 5
+        # Outro objeto bem depois, ou de outra classe, é agendado
+        assert scheduler.submit(t + 0.3, 1) is not None
+        assert scheduler.submit(t + 0.3, 2) is not None
+    finally:
+        scheduler.close()
+
+
+def test_late_decision_and_telegram_mode():
+    """Decisão após o prazo dispara na hora e conta como atrasada; telegrama leva os ms restantes"""
+    plc = RecordingPlc()
+    scheduler = RejectScheduler(plc.send, 1000, 100, mode='telegram')
+    try:
+        scheduler.submit(time.time() - 0.3, 2)       # chegou ao ejetor há 200ms
+        scheduler.submit(time.time(), 1)             # chega em 100ms
+        time.sleep(0.05)
+    finally:
+        scheduler.close()
+
+    assert scheduler.late == 1
+    delays = {value: delay for _, value, delay in plc.writes}
+    assert delays[2] == 0 and 80 <= delays[1] <= 100, delays
+    assert scheduler.stats()['position_error_p99_mm'] > 150
+
+
+def test_failed_writes_are_counted():
+    plc = RecordingPlc(ok=False)
+    scheduler = RejectScheduler(plc.send, 1000, 10)
+    try:
+        scheduler.submit(time.time(), 1)
+        time.sleep(0.05)
+    finally:
+        scheduler.close()
+    assert scheduler.failed == 1 and scheduler.dispatched == 0
+
+
+def main():
+    tests = [
+        test_fires_at_arrival_regardless_of_frame_age,
+        test_position_in_frame_and_merge,
+        test_object_in_view_for_many_frames_is_one_rejection,
+        test_late_decision_and_telegram_mode,
+        test_failed_writes_are_counted,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
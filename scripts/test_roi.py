@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Teste da ROI: configuração, máscara do polígono, faixas com sobreposição e caixas de volta ao frame inteiro
+"""
+
+import os
+import sys
+import types
+import logging
+
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+os.environ['HEADLESS'] = '1'
+
+from roi import RegionOfInterest, parse_roi
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def test_parse_roi():
+    assert parse_roi('') is None and parse_roi('  ') is None
+    assert parse_roi('0.1,0.2,0.9,0.8') == [(0.1, 0.2), (0.9, 0.2), (0.9, 0.8), (0.1, 0.8)]
+    assert parse_roi('10,0;600,0;320,480') == [(10.0, 0.0), (600.0, 0.0), (320.0, 480.0)]
+    for bad in ('1,2,3', '0,0;1,1', '0,0;1,1;2'):
+        try:
+            parse_roi(bad)
+            raise AssertionError(f"{bad!r} deveria ser recusado")
+        except ValueError:
+            pass
+
+
+def test_inside_mask_follows_polygon():
+    # Triângulo normalizado com a ponta para baixo
+    roi = RegionOfInterest(parse_roi('0,0;1,0;0.5,1'))
+    roi.prepare(200, 100)
+    assert roi.regions == [(0, 0, 200, 100)]
+    boxes = np.array([
+        [90, 10, 110, 30],      # centro (100, 20): dentro
+        [0, 80, 20, 100],       # centro (10, 90): canto fora do triângulo
+        [180, 0, 200, 10],      # centro (190, 5): dentro, junto à borda de cima
+        [0, -40, 200, 20],      # centro (100, -10) acima do frame é limitado à borda
+    ], dtype=np.int32)
+    assert roi.inside(boxes).tolist() == [True, False, True, True]
+    assert roi.inside(np.empty((0, 4), dtype=np.int32)).shape == (0,)
+
+    try:
+        RegionOfInterest(parse_roi('0.5,0.5,0.5,0.9')).prepare(200, 100)
+        raise AssertionError("ROI vazia deveria ser recusada")
+    except ValueError:
+        pass
+
+
+def test_lanes_overlap_at_the_seams():
+    roi = RegionOfInterest(parse_roi('50,20,450,120'), lanes=2, lane_overlap=0.1)
+    roi.prepare(500, 200)
+    assert roi.regions == [(50, 20, 270, 120), (230, 20, 450, 120)]
+    frame = np.zeros((200, 500, 3), dtype=np.uint8)
+    crops = list(roi.crops(frame))
+    assert [offset for _, offset in crops] == [(50, 20), (230, 20)]
+    assert crops[0][0].shape == (100, 220, 3) and np.shares_memory(crops[0][0], frame)
+
+    roi = RegionOfInterest(parse_roi('0,0,1,1'), lanes=3, lane_axis='y')
+    roi.prepare(90, 90)
+    assert roi.regions == [(0, 0, 90, 30), (0, 30, 90, 60), (0, 60, 90, 90)]
+
+
+def test_objects_on_the_seam_are_merged():
+    roi = RegionOfInterest(parse_roi('0,0,400,100'), lanes=2, lane_overlap=0.1)
+    roi.prepare(400, 100)       # faixas 0-220 e 180-400
+    boxes = np.array([
+        [190, 30, 220, 70],     # faixa 0: batata cortada na borda do recorte
+        [190, 30, 250, 70],     # faixa 1: a mesma batata inteira
+        [20, 30, 60, 70],       # faixa 0: outra batata
+        [300, 30, 340, 70],     # faixa 1: outra batata
+        [30, 30, 70, 70],       # faixa 0: vizinha da outra, mesma faixa (fica para o NMS)
+        [185, 0, 215, 25],      # faixa 0: na sobreposição, sem correspondente na faixa 1
+    ], dtype=np.int32)
+    scores = np.array([0.6, 0.9, 0.8, 0.8, 0.7, 0.5], dtype=np.float32)
+    class_ids = np.array([1, 1, 0, 0, 0, 2])
+    lanes = np.array([0, 1, 0, 1, 0, 0])
+    merged, merged_scores, merged_ids = roi.merge_lanes(boxes, scores, class_ids, lanes)
+    assert merged.tolist() == [[190, 30, 250, 70], [20, 30, 60, 70], [300, 30, 340, 70],
+                               [30, 30, 70, 70], [185, 0, 215, 25]]
+    assert merged_scores[0] == np.float32(0.9) and merged_ids.tolist() == [1, 0, 0, 0, 2]
+
+    # Sem sobreposição: as duas metades se tocam na costura e viram uma caixa
+    roi = RegionOfInterest(parse_roi('0,0,400,100'), lanes=2)
+    roi.prepare(400, 100)
+    halves = np.array([[170, 30, 200, 70], [200, 32, 230, 68]], dtype=np.int32)
+    merged, _, _ = roi.merge_lanes(halves, np.array([0.7, 0.8]), np.array([0, 0]), np.array([0, 1]))
+    assert merged.tolist() == [[170, 30, 230, 70]]
+    # Classes diferentes continuam separadas
+    merged, _, _ = roi.merge_lanes(halves, np.array([0.7, 0.8]), np.array([0, 1]), np.array([0, 1]))
+    assert len(merged) == 2
+
+
+class ScriptedDecoder:
+    """Devolve, a cada recorte, as caixas roteirizadas em coordenadas do recorte"""
+    needs_nms = True
+
+    def __init__(self, per_crop):
+        self.per_crop = list(per_crop)
+        self.sizes = []
+
+    def candidates(self, interpreter, width, height, threshold):
+        self.sizes.append((width, height))
+        boxes, scores, class_ids = self.per_crop.pop(0)
+        return (np.array(boxes, dtype=np.int32).reshape(-1, 4), np.array(scores, dtype=np.float32),
+                np.array(class_ids, dtype=np.int32))
+
+
+def test_detect_roi_maps_boxes_to_full_frame():
+    from main import VisionSystem
+
+    roi = RegionOfInterest(parse_roi('50,20,450,120'), lanes=2, lane_overlap=0.1)
+    decoder = ScriptedDecoder([
+        ([(10, 10, 40, 50), (200, 20, 220, 60)], [0.9, 0.6], [0, 1]),   # faixa 0 (origem 50, 20)
+        ([(20, 20, 60, 60)], [0.8], [1]),                                 # faixa 1 (origem 230, 20)
+    ])
+    crops = []
+    vision = types.SimpleNamespace(roi=roi, decoder=decoder, interpreter=None, CONFIDENCE_THRESHOLD=0.5,
+                                   IOU_THRESHOLD=0.45, _run_inference=lambda crop: crops.append(crop.shape) or 0.01)
+    boxes, scores, class_ids, inference_time = VisionSystem._detect_roi(vision, np.zeros((200, 500, 3), np.uint8))
+
+    assert crops == [(100, 220, 3), (100, 220, 3)] and decoder.sizes == [(220, 100), (220, 100)]
+    assert abs(inference_time - 0.02) < 1e-9
+    found = sorted(zip(boxes.tolist(), class_ids.tolist()))
+    assert found == [([60, 30, 90, 70], 0), ([250, 40, 290, 80], 1)], found
+
+
+def main():
+    tests = [
+        test_parse_roi,
+        test_inside_mask_follows_polygon,
+        test_lanes_overlap_at_the_seams,
+        test_objects_on_the_seam_are_merged,
+        test_detect_roi_maps_boxes_to_full_frame,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Teste de regressão: o loop de frames em regime permanente não deve alocar
+memória significativa por frame (medido com tracemalloc)
+"""
+
+import os
+import sys
+import logging
+import tracemalloc
+
+import cv2
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+os.environ['HEADLESS'] = '1'
+os.environ['DETECTION_LOG_PATH'] = ''
+os.environ['CAPTURE_DIR'] = ''
+
+from frame_source import SyntheticSource
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+models_dir = os.path.join(base_dir, 'data', 'models')
+
+WARMUP_FRAMES = 10
+MEASURED_FRAMES = 50
+# Pico de memória Python/numpy por frame; um frame 640x480 sozinho tem ~900 KB
+MAX_BYTES_PER_FRAME = 64 * 1024
+# tracemalloc também conta alocações de outras threads do processo: o limite vale para a
+# mediana, e um frame isolado pode chegar a esta margem (ainda bem abaixo de um frame copiado)
+MAX_WORST_BYTES_PER_FRAME = 4 * MAX_BYTES_PER_FRAME
+MAX_GROWTH_BYTES = 16 * 1024
+
+
+class MeasuringCamera(SyntheticSource):
+    """Fonte sintética que mede o pico de alocação entre leituras e para após `frames`"""
+
+    def __init__(self, frames):
+        super().__init__(variants=1)
+        self.remaining = frames
+        self.reads = 0
+        self.peaks = []
+        self.currents = []
+        self._baseline = 0
+        self.open()
+
+    def read(self):
+        if self.reads > WARMUP_FRAMES:
+            current, peak = tracemalloc.get_traced_memory()
+            self.peaks.append(peak - self._baseline)
+            self.currents.append(current)
+        self.reads += 1
+        self.remaining -= 1
+        if self.remaining <= 0:
+            self.close()
+        self._baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        return super().read()
+
+
+def load_interpreter(model_name):
+    try:
+        import tflite_runtime.interpreter as tflite
+    except ImportError:
+        import tensorflow as tf
+        tflite = tf.lite
+    interpreter = tflite.Interpreter(model_path=os.path.join(models_dir, model_name))
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+def test_frame_loop_allocations_bounded():
+    """Depois do aquecimento, cada frame de `process_frame` aloca menos que o limite"""
+    import main as vision_main
+
+    # Sem cliente PLC: nenhuma thread de reconexão alocando durante a medição
+    saved = vision_main.PLC_ENABLED
+    vision_main.PLC_ENABLED = False
+    try:
+        vision = vision_main.VisionSystem()
+    finally:
+        vision_main.PLC_ENABLED = saved
+    assert vision.plc is None
+    vision.camera = MeasuringCamera(WARMUP_FRAMES + MEASURED_FRAMES + 2)
+
+    tracemalloc.start()
+    try:
+        vision.process_frame()
+    finally:
+        tracemalloc.stop()
+        vision.cleanup()
+
+    camera = vision.camera
+    assert len(camera.peaks) >= MEASURED_FRAMES, camera.peaks
+    median = int(np.median(camera.peaks))
+    worst = max(camera.peaks)
+    growth = camera.currents[-1] - camera.currents[0]
+    logger.info(f"pico por frame: mediana {median} bytes, máximo {worst} bytes | "
+                f"crescimento em {len(camera.currents)} frames: {growth} bytes")
+    assert median < MAX_BYTES_PER_FRAME, f"mediana de {median} bytes por frame"
+    assert worst < MAX_WORST_BYTES_PER_FRAME, f"pico de {worst} bytes por frame"
+    assert growth < MAX_GROWTH_BYTES, f"crescimento de {growth} bytes"
+
+
+def reference_input(image, input_details):
+    """Pré-processamento de referência, com alocação (resize, RGB e tipo/escala), para conferir o InputWriter.
+
+    - uint8: pixels crus (a quantização do modelo já espera 0..255)
+    - int8: pixels normalizados e quantizados com (scale, zero_point) da entrada
+    - float: pixels normalizados em 0..1
+    """
+    _, height, width, _ = input_details['shape']
+    img_resized = cv2.resize(image, (int(width), int(height)))
+    input_data = cv2.cvtColor(img_resized, cv2.COLOR_BGR2RGB)
+    dtype = input_details['dtype']
+
+    if dtype == np.uint8:
+        return np.expand_dims(input_data, axis=0)
+    if dtype == np.int8:
+        scale, zero_point = input_details['quantization']
+        quantized = np.round(input_data.astype(np.float32) / 255.0 / scale + zero_point)
+        return np.expand_dims(np.clip(quantized, -128, 127).astype(np.int8), axis=0)
+    return np.expand_dims(input_data, axis=0).astype(np.float32) / 255.0
+
+
+def test_input_writer_and_yolo_decoder_allocations_bounded():
+    """Pré-processamento + invoke + decodificação YOLO (com NMS) não alocam buffers do tamanho do modelo"""
+    from preprocessing import InputWriter
+    from decoders import create_decoder
+
+    interpreter = load_interpreter('best_int8_potato.tflite')
+    detail = interpreter.get_input_details()[0]
+    writer = InputWriter(interpreter, detail)
+    decoder = create_decoder(interpreter)
+    frame = np.random.RandomState(1).randint(0, 256, size=(480, 640, 3)).astype(np.uint8)
+
+    # O tensor escrito pelo InputWriter é o mesmo que o pré-processamento de referência produziria
+    writer.write(frame)
+    assert np.array_equal(interpreter.get_tensor(detail['index']), reference_input(frame, detail))
+
+    for _ in range(WARMUP_FRAMES):
+        writer.write(frame)
+        interpreter.invoke()
+        decoder.decode(interpreter, 640, 480, 0.5, 0.45)
+
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(MEASURED_FRAMES):
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            writer.write(frame)
+            interpreter.invoke()
+            decoder.decode(interpreter, 640, 480, 0.5, 0.45)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    logger.info(f"pico por frame (InputWriter + YOLO): {max(peaks)} bytes")
+    assert max(peaks) < MAX_BYTES_PER_FRAME, f"pico de {max(peaks)} bytes por frame"
+
+
+def main():
+    tests = [
+        test_frame_loop_allocations_bounded,
+        test_input_writer_and_yolo_decoder_allocations_bounded,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Teste do aquecimento do interpretador: para quando a latência estabiliza, com limite de invokes
+"""
+
+import os
+import sys
+import types
+import logging
+
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(base_dir, 'src'))
+
+os.environ['HEADLESS'] = '1'
+
+import main as vision_main
+from main import VisionSystem, latencia_estabilizada
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ScriptedInterpreter:
+    """Interpretador falso: cada invoke avança o relógio falso pela próxima latência do roteiro"""
+
+    def __init__(self, clock, latencies_ms):
+        self.clock = clock
+        self.latencies_ms = list(latencies_ms)
+        self.invokes = 0
+        self.inputs = []
+
+    def set_tensor(self, index, value):
+        self.inputs.append(value)
+
+    def invoke(self):
+        ms = self.latencies_ms[min(self.invokes, len(self.latencies_ms) - 1)]
+        self.invokes += 1
+        self.clock.now += ms / 1000
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+
+def run_warm_up(latencies_ms, **settings):
+    """Executa VisionSystem.warm_up sobre um interpretador com latências roteirizadas"""
+    clock = FakeClock()
+    interpreter = ScriptedInterpreter(clock, latencies_ms)
+    vision = types.SimpleNamespace(
+        interpreter=interpreter,
+        input_details={'index': 0, 'shape': (1, 8, 8, 3), 'dtype': np.uint8},
+        warmup_stats=None,
+    )
+    saved = {name: getattr(vision_main, name) for name in settings}
+    saved_time = vision_main.time
+    try:
+        for name, value in settings.items():
+            setattr(vision_main, name, value)
+        vision_main.time = clock
+        stats = VisionSystem.warm_up(vision)
+    finally:
+        vision_main.time = saved_time
+        for name, value in saved.items():
+            setattr(vision_main, name, value)
+    return stats, interpreter
+
+
+def test_stability_criterion():
+    assert not latencia_estabilizada([10, 10], 5, 0.15)            # janela incompleta
+    assert latencia_estabilizada([50, 10, 10.5, 10, 11, 10], 5, 0.15)
+    assert not latencia_estabilizada([10, 10, 10, 10, 14], 5, 0.15)
+    assert not latencia_estabilizada([10] * 10, 0, 0.15)
+
+
+def test_stops_once_latency_settles():
+    """Primeiro invoke (compilação) fica fora da janela; para no primeiro ponto estável"""
+    stats, interpreter = run_warm_up([400, 30, 20, 12, 10, 10, 10, 10, 10, 10, 10],
+                                     WARMUP_MIN_ITERATIONS=5, WARMUP_MAX_ITERATIONS=50,
+                                     WARMUP_WINDOW=5, WARMUP_TOLERANCE=0.15)
+    # Janela [12, 10, 10, 10, 10] varia 20%: só a seguinte [10 x 5] é estável
+    assert stats['stable'] and stats['iterations'] == 9 == interpreter.invokes, stats
+    assert abs(stats['first_ms'] - 400) < 1e-6 and abs(stats['steady_ms'] - 10) < 1e-6
+    # Entrada sintética no formato do modelo
+    assert interpreter.inputs[0].shape == (1, 8, 8, 3) and interpreter.inputs[0].dtype == np.uint8
+
+
+def test_min_iterations_before_exit():
+    stats, _ = run_warm_up([100, 10], WARMUP_MIN_ITERATIONS=8, WARMUP_MAX_ITERATIONS=50,
+                           WARMUP_WINDOW=3, WARMUP_TOLERANCE=0.15)
+    assert stats['stable'] and stats['iterations'] == 9
+
+
+def test_gives_up_after_max_iterations():
+    """Latência que nunca estabiliza: para no limite e segue sem marcar como estável"""
+    stats, interpreter = run_warm_up([100, 5, 20] * 20, WARMUP_MIN_ITERATIONS=5, WARMUP_MAX_ITERATIONS=12,
+                                     WARMUP_WINDOW=5, WARMUP_TOLERANCE=0.15)
+    assert not stats['stable'] and stats['iterations'] == 12 == interpreter.invokes
+
+
+def main():
+    tests = [
+        test_stability_criterion,
+        test_stops_once_latency_settles,
+        test_min_iterations_before_exit,
+        test_gives_up_after_max_iterations,
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            logger.error(f"❌ {test.__name__}: {e!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+import collections
+import logging
+import threading
+import time
+
+from frame_source import Frame
+from realtime import release_thread
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureWatchdog:
+    """Envolve a fonte de frames e recupera a captura quando ela trava ou falha.
+
+    Mesmo contrato de FrameSource (`read`, `stats`, `close`, `is_open`,
+    `index`). A captura é considerada travada quando:
+    - `max_failures` leituras seguidas falham;
+    - nenhum frame chega há `stall_timeout_s` segundos;
+    - `stuck_frames` frames seguidos são idênticos (driver devolvendo o
+      mesmo buffer; 0 desabilita, já que arquivo/sintético podem repetir).
+
+    Travada, a fonte é fechada e reaberta por `open_source()` em uma thread,
+    com espera exponencial entre tentativas (`backoff_s` até
+    `max_backoff_s`). Enquanto isso `read` espera até `poll_s` e devolve None
+    (sem loop ocupado) e `degraded` fica True. A numeração dos frames continua
+    a mesma depois da troca de fonte.
+
+    Uma fonte que se fecha sozinha (ex.: arquivo sem loop) encerra a captura
+    normalmente, sem reabertura.
+    """
+
+    def __init__(self, source, open_source, stall_timeout_s=2.0, max_failures=10, stuck_frames=0,
+                 backoff_s=0.5, max_backoff_s=10.0, poll_s=0.5, retry_s=0.01):
+        self.source = source
+        self.open_source = open_source
+        self.stall_timeout_s = stall_timeout_s
+        self.max_failures = max_failures
+        self.stuck_frames = stuck_frames
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.poll_s = poll_s
+        self.retry_s = retry_s
+
+        self.index = source.index
+        self.source_name = getattr(source, 'source_name', None)
+        self.is_open = True
+        self.seq = 0
+        self.degraded = False
+        self.last_reason = ''
+        self.stalls = 0
+        self.recoveries = 0
+        self.reopen_attempts = 0
+        self.downtimes = collections.deque(maxlen=1000)
+
+        self._failures = 0
+        self._last_frame_at = time.monotonic()
+        self._fingerprint = None
+        self._identical = 0
+        self._degraded_at = 0.0
+        self._pending = None
+        self._recovered = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def read(self):
+        if not self.is_open:
+            return None
+        if self.degraded and not self._adopt_recovered():
+            return None
+
+        frame = self.source.read()
+        now = time.monotonic()
+        if frame is None:
+            if not self.source.is_open:
+                # Fim da fonte (não é falha): encerra como antes
+                self.is_open = False
+                return None
+            self._failures += 1
+            if self._failures >= self.max_failures:
+                self._degrade(f"{self._failures} leituras seguidas falharam")
+            elif now - self._last_frame_at > self.stall_timeout_s:
+                self._degrade(f"nenhum frame há {now - self._last_frame_at:.1f}s")
+            else:
+                # Falha isolada: pausa curta e crescente em vez de repetir na hora
+                time.sleep(min(self.retry_s * self._failures, self.poll_s))
+            return None
+
+        if self.stuck_frames and self._is_stuck(frame.image):
+            self._degrade(f"{self._identical} frames idênticos seguidos")
+            return None
+
+        self._failures = 0
+        self._last_frame_at = now
+        self.seq += 1
+        return Frame(frame.image, frame.timestamp, self.seq)
+
+    def _is_stuck(self, image):
+        # Amostra esparsa dos pixels: sensor real sempre tem ruído entre frames
+        fingerprint = image[::16, ::16].tobytes()
+        if fingerprint == self._fingerprint:
+            self._identical += 1
+        else:
+            self._fingerprint = fingerprint
+            self._identical = 1
+        return self._identical >= self.stuck_frames
+
+    def _degrade(self, reason):
+        self.degraded = True
+        self.last_reason = reason
+        self.stalls += 1
+        self._degraded_at = time.monotonic()
+        self._failures = 0
+        self._fingerprint = None
+        self._identical = 0
+        logger.warning(f"📷 Câmera degradada: {reason} - reabrindo em segundo plano")
+        failed, self.source = self.source, None
+        self._recovered.clear()
+        self._thread = threading.Thread(target=self._reopen, args=(failed,), name='camera-reopen', daemon=True)
+        self._thread.start()
+
+    def _reopen(self, failed):
+        # Criada pelo loop de captura: não herda a prioridade nem os núcleos dele
+        release_thread('reabertura da câmera')
+        try:
+            failed.close()
+        except Exception as e:
+            logger.warning(f"Erro ao fechar a fonte travada: {e}")
+
+        delay = self.backoff_s
+        while not self._stop.is_set():
+            self.reopen_attempts += 1
+            try:
+                source = self.open_source()
+            except Exception as e:
+                logger.warning(f"📷 Reabertura da câmera falhou: {e}")
+                source = None
+            if source is not None and source.is_open:
+                self._pending = source
+                self._recovered.set()
+                return
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.max_backoff_s)
+
+    def _adopt_recovered(self):
+        """Troca para a fonte reaberta, se já estiver pronta (espera até `poll_s`)"""
+        if not self._recovered.wait(self.poll_s):
+            return False
+        self.source, self._pending = self._pending, None
+        self._recovered.clear()
+        self.index = self.source.index
+        self.degraded = False
+        downtime = time.monotonic() - self._degraded_at
+        self.downtimes.append(downtime)
+        self.recoveries += 1
+        self._last_frame_at = time.monotonic()
+        logger.info(f"📷 Câmera recuperada em {downtime:.1f}s (índice {self.index})")
+        return True
+
+    def degraded_for(self):
+        """Segundos desde que a captura foi considerada travada (0 se saudável)"""
+        return time.monotonic() - self._degraded_at if self.degraded else 0.0
+
+    def stats(self):
+        stats = self.source.stats() if self.source is not None else {'open': False}
+        downtimes = list(self.downtimes)
+        stats.update({
+            'frames': self.seq,
+            'degraded': self.degraded,
+            'stalls': self.stalls,
+            'recoveries': self.recoveries,
+            'reopen_attempts': self.reopen_attempts,
+            'mttr_s': sum(downtimes) / len(downtimes) if downtimes else None,
+            'max_downtime_s': max(downtimes) if downtimes else None,
+            'last_reason': self.last_reason,
+        })
+        return stats
+
+    def close(self):
+        self.is_open = False
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        for source in (self.source, self._pending):
+            if source is not None:
+                source.close()
+        self.source = self._pending = None
@@ -0,0 +1,118 @@
+import logging
+import time
+
+import numpy as np
+
+from decoders import create_decoder
+from preprocessing import InputWriter
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceCascade:
+    """Primeiro estágio barato que decide se o detector completo precisa rodar.
+
+    O modelo do estágio 1 pode ser um classificador (saída [1, C]) ou um
+    detector reconhecido pelos decodificadores. O detector completo só roda
+    quando o estágio 1 aponta uma classe de gatilho (NOK/PEDRA) acima de
+    `threshold`, ou quando passam `min_interval` frames sem rodá-lo
+    (amostragem mínima, para que uma falha do estágio 1 não passe despercebida).
+    """
+
+    def __init__(self, tflite_module, model_path, labels, trigger_classes=('NOK', 'PEDRA'),
+                 threshold=0.25, min_interval=10, num_threads=None, report_interval=60.0):
+        self.interpreter = tflite_module.Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.input_writer = InputWriter(self.interpreter, self.input_details)
+        self.labels = list(labels)
+        self.trigger_ids = {i for i, label in enumerate(self.labels) if label in set(trigger_classes)}
+        self.threshold = threshold
+        self.min_interval = min_interval
+        self.report_interval = report_interval
+
+        outputs = self.interpreter.get_output_details()
+        if len(outputs) == 1 and len(outputs[0]['shape']) == 2:
+            self.decoder = None
+            self.output_details = outputs[0]
+            self.kind = 'classificador'
+        else:
+            self.decoder = create_decoder(self.interpreter)
+            self.kind = f'detector {self.decoder.format_name}'
+
+        self._frames_since_full = 0
+        self._last_report = time.monotonic()
+        self.reset_stats()
+
+        logger.info(f"🪜 Cascata habilitada: estágio 1 = {model_path} ({self.kind}), "
+                    f"gatilho={sorted(trigger_classes)} > {threshold}, amostragem mínima 1/{min_interval}")
+
+    def reset_stats(self):
+        self.frames = 0
+        self.triggered = 0
+        self.sampled = 0
+        self.stage1_time = 0.0
+        self.stage2_time = 0.0
+
+    def _trigger_score(self):
+        """Maior score entre as classes de gatilho na saída do estágio 1"""
+        if self.decoder is None:
+            scores = self.interpreter.get_tensor(self.output_details['index'])[0].astype(np.float32)
+            scale, zero_point = self.output_details['quantization']
+            if scale:
+                scores = (scores - zero_point) * scale
+            ids = [i for i in self.trigger_ids if i < len(scores)]
+            return float(scores[ids].max()) if ids else 0.0
+
+        _, scores, class_ids = self.decoder.candidates(self.interpreter, 1, 1, self.threshold)
+        hits = [s for s, c in zip(scores, class_ids) if c in self.trigger_ids]
+        return float(max(hits)) if hits else 0.0
+
+    def screen(self, frame):
+        """Roda o estágio 1; retorna True se o detector completo deve rodar neste frame"""
+        self.maybe_report()
+        start_time = time.perf_counter()
+        self.input_writer.write(frame)
+        self.interpreter.invoke()
+        score = self._trigger_score()
+        self.stage1_time += time.perf_counter() - start_time
+        self.frames += 1
+
+        self._frames_since_full += 1
+        if score > self.threshold:
+            self.triggered += 1
+            self._frames_since_full = 0
+            return True
+        if self.min_interval and self._frames_since_full >= self.min_interval:
+            self.sampled += 1
+            self._frames_since_full = 0
+            return True
+        return False
+
+    def record_stage2(self, elapsed):
+        """Contabiliza o custo do detector completo (chamado quando ele rodou)"""
+        self.stage2_time += elapsed
+
+    def stats(self):
+        frames = max(self.frames, 1)
+        full_runs = self.triggered + self.sampled
+        return {
+            'frames': self.frames,
+            'stage1_hit_rate': self.triggered / frames,
+            'stage2_rate': full_runs / frames,
+            'stage1_ms': self.stage1_time / frames * 1000,
+            'stage2_ms': self.stage2_time / max(full_runs, 1) * 1000,
+            'avg_cost_ms': (self.stage1_time + self.stage2_time) / frames * 1000,
+        }
+
+    def maybe_report(self):
+        """Loga estatísticas por estágio a cada `report_interval` segundos"""
+        now = time.monotonic()
+        if now - self._last_report < self.report_interval or not self.frames:
+            return
+        self._last_report = now
+        st = self.stats()
+        logger.info(f"🪜 Cascata: {st['frames']} frames | gatilho estágio 1 {st['stage1_hit_rate']:.1%} | "
+                    f"detector completo {st['stage2_rate']:.1%} | estágio 1 {st['stage1_ms']:.1f}ms, "
+                    f"estágio 2 {st['stage2_ms']:.1f}ms | custo médio {st['avg_cost_ms']:.1f}ms/frame")
+        self.reset_stats()
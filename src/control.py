@@ -0,0 +1,191 @@
+import json
+import logging
+import threading
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from realtime import release_thread
+
+logger = logging.getLogger(__name__)
+
+
+class RuntimeSettings:
+    """Parâmetros de desempenho ajustáveis com a aplicação rodando.
+
+    `spec` mapeia nome -> (tipo, mínimo, máximo). `update` valida o lote
+    inteiro antes de aceitar (tudo ou nada) e apenas o deixa pendente; o loop
+    de inferência chama `apply_pending` na fronteira entre frames, de modo que
+    um frame nunca vê metade de uma alteração.
+    """
+
+    def __init__(self, spec, initial):
+        self.spec = dict(spec)
+        self._values = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.version = 0
+        for name, value in initial.items():
+            self._values[name] = self._validate(name, value)
+
+    def _validate(self, name, value):
+        if name not in self.spec:
+            raise KeyError(f"parâmetro desconhecido: {name}")
+        kind, minimum, maximum = self.spec[name]
+        if kind is bool:
+            if isinstance(value, str):
+                value = value.lower() in ('1', 'true', 'yes', 'on')
+            return bool(value)
+        try:
+            value = kind(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name}: valor inválido {value!r}")
+        if minimum is not None and value < minimum:
+            raise ValueError(f"{name}: {value} < mínimo {minimum}")
+        if maximum is not None and value > maximum:
+            raise ValueError(f"{name}: {value} > máximo {maximum}")
+        return value
+
+    def get(self, name):
+        return self._values[name]
+
+    def snapshot(self):
+        with self._lock:
+            return {'values': dict(self._values), 'pending': dict(self._pending), 'version': self.version}
+
+    def update(self, changes):
+        """Valida e agenda alterações; lança KeyError/ValueError sem aplicar nada se algo for inválido"""
+        validated = {name: self._validate(name, value) for name, value in changes.items()}
+        with self._lock:
+            self._pending.update(validated)
+        return validated
+
+    def apply_pending(self):
+        """Aplica as alterações pendentes; retorna {nome: (antigo, novo)} ou {} (caminho rápido)"""
+        if not self._pending:
+            return {}
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            applied = {}
+            for name, value in pending.items():
+                old = self._values.get(name)
+                if old != value:
+                    self._values[name] = value
+                    applied[name] = (old, value)
+            if applied:
+                self.version += 1
+        for name, (old, value) in applied.items():
+            logger.info(f"🎛️  {name}: {old} -> {value}")
+        return applied
+
+
+class ControlServer:
+    """API HTTP local para ler e alterar `RuntimeSettings`.
+
+        GET  /settings                   -> valores atuais e pendentes
+        POST /settings {"nome": valor}   -> agenda alteração (aplicada no próximo frame)
+        POST /<ação>?param=valor         -> ações registradas em `actions` (ex.: /profile?frames=100)
+
+    Erros voltam como JSON `{"error": ...}`: 400 para parâmetro inválido
+    (KeyError/ValueError), 409 quando a ação não pode ser feita agora
+    (RuntimeError, ex.: componente ocupado) e 500 para qualquer outra falha.
+    """
+
+    def __init__(self, settings, port, host='127.0.0.1', actions=None):
+        self.settings = settings
+        self.actions = dict(actions or {})
+        self.port = port
+        self.host = host
+        self.httpd = None
+        self.thread = None
+
+    def start(self):
+        server = self
+
+        class Handler(ControlRequestHandler):
+            control = server
+
+        try:
+            self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+            self.httpd.daemon_threads = True
+        except OSError as e:
+            logger.warning(f"Não foi possível iniciar API de controle na porta {self.port}: {e}")
+            return False
+
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='control-http', daemon=True)
+        self.thread.start()
+        logger.info(f"🎛️  API de controle em http://{self.host}:{self.port}/settings")
+        return True
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+
+class ControlRequestHandler(BaseHTTPRequestHandler):
+    control = None
+
+    def log_message(self, format, *args):
+        logger.debug(f"control {self.address_string()} - {format % args}")
+
+    def setup(self):
+        # Thread por conexão: fora da prioridade e dos núcleos do tempo real
+        release_thread('requisição de controle')
+        super().setup()
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, indent=2, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/settings':
+            self._send_json(404, {'error': 'not found'})
+            return
+        payload = self.control.settings.snapshot()
+        payload['limits'] = {name: {'type': kind.__name__, 'min': lo, 'max': hi}
+                             for name, (kind, lo, hi) in self.control.settings.spec.items()}
+        self._send_json(200, payload)
+
+    def _send_error_json(self, error):
+        """Resposta de erro para uma exceção da ação/alteração (a conexão nunca cai sem resposta)"""
+        if isinstance(error, (KeyError, ValueError)):
+            status = 400
+        elif isinstance(error, RuntimeError):
+            status = 409
+        else:
+            status = 500
+            logger.error(f"Erro na API de controle ({self.path}): {error!r}")
+        message = error.args[0] if isinstance(error, KeyError) and error.args else str(error)
+        self._send_json(status, {'error': str(message)})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path in self.control.actions:
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                result = self.control.actions[url.path](params)
+            except Exception as e:
+                self._send_error_json(e)
+                return
+            self._send_json(200, result)
+            return
+        if url.path != '/settings':
+            self._send_json(404, {'error': 'not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', '0'))
+            changes = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(changes, dict):
+                raise ValueError("corpo deve ser um objeto JSON")
+            accepted = self.control.settings.update(changes)
+        except Exception as e:
+            self._send_error_json(e)
+            return
+        logger.info(f"🎛️  Alteração agendada via API ({self.client_address[0]}): {accepted}")
+        self._send_json(202, {'accepted': accepted})
+
+    do_PATCH = do_POST
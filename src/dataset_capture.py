@@ -0,0 +1,199 @@
+import cv2
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetCapture:
+    """Salva frames selecionados em disco, em segundo plano, para re-treino do modelo.
+
+    `offer` decide em microssegundos se o frame interessa (classe, faixa de
+    confiança ou amostragem aleatória) e o coloca em uma fila limitada. Um
+    pool de threads codifica em JPEG e grava a imagem com um sidecar JSON das
+    detecções. O diretório funciona como um anel: ao passar da cota de bytes
+    ou de arquivos, os mais antigos são removidos. Com a fila cheia o frame é
+    descartado (nunca bloqueia o loop de inferência) e o descarte é contado.
+
+    O frame selecionado é copiado ao ser enfileirado: fontes como a Basler
+    devolvem o buffer da câmera ao driver assim que o loop segue em frente.
+    """
+
+    def __init__(self, directory, labels, classes=('NOK', 'PEDRA'), score_band=None,
+                 sample_rate=0.0, workers=2, queue_size=16, max_bytes=2 * 1024 ** 3,
+                 max_files=0, jpeg_quality=95):
+        self.directory = directory
+        self.labels = list(labels)
+        self.classes = set(classes)
+        self.score_band = score_band
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.jpeg_params = [int(cv2.IMWRITE_JPEG_QUALITY), int(jpeg_quality)]
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.saved = 0
+        self.dropped = 0
+        self.evicted = 0
+        self._last_drop_report = 0
+
+        self._files = deque()
+        self._total_bytes = 0
+        self._quota_lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._scan_existing()
+
+        self._workers = []
+        for i in range(max(workers, 1)):
+            worker = threading.Thread(target=self._worker_loop, name=f'dataset-capture-{i}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+        logger.info(f"💾 Captura de dataset em {directory} (classes={sorted(self.classes)}, "
+                    f"faixa={score_band}, amostragem={sample_rate}, "
+                    f"cota={max_bytes / 1024 ** 2:.0f}MB/{max_files or '∞'} arquivos)")
+
+    def _scan_existing(self):
+        """Recupera os arquivos já salvos para respeitar a cota após reinício"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.jpg'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            sidecar = path[:-4] + '.json'
+            size = st.st_size + (os.path.getsize(sidecar) if os.path.exists(sidecar) else 0)
+            entries.append((st.st_mtime, path, size))
+        for _, path, size in sorted(entries):
+            self._files.append((path, size))
+            self._total_bytes += size
+
+    def select(self, detections):
+        """Retorna o motivo da captura ('class', 'band', 'sample') ou None"""
+        for label, score, _ in detections:
+            if label in self.classes:
+                return 'class'
+        if self.score_band:
+            lo, hi = self.score_band
+            for _, score, _ in detections:
+                if lo <= score < hi:
+                    return 'band'
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return 'sample'
+        return None
+
+    def offer(self, frame, detections, seq, timestamp):
+        """Enfileira o frame se selecionado; descarta sem bloquear se a fila estiver cheia"""
+        reason = self.select(detections)
+        if reason is None:
+            return False
+        try:
+            if self.queue.full():
+                raise queue.Full
+            self.queue.put_nowait((frame.copy(), detections, seq, timestamp, reason))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped - self._last_drop_report >= 100:
+                self._last_drop_report = self.dropped
+                logger.warning(f"⚠️ Captura de dataset saturada - {self.dropped} frames descartados até agora")
+            return False
+
+    def stats(self):
+        return {
+            'queued': self.queue.qsize(),
+            'saved': self.saved,
+            'dropped': self.dropped,
+            'evicted': self.evicted,
+            'files': len(self._files),
+            'bytes': self._total_bytes,
+        }
+
+    def _worker_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                break
+            try:
+                self._save(*item)
+            except Exception as e:
+                logger.error(f"Erro ao salvar frame de dataset: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _save(self, frame, detections, seq, timestamp, reason):
+        ok, buffer = cv2.imencode('.jpg', frame, self.jpeg_params)
+        if not ok:
+            raise RuntimeError("falha na codificação JPEG")
+
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(timestamp))
+        base = os.path.join(self.directory, f"{stamp}-{int(timestamp * 1000) % 1000:03d}_{seq:08d}_{reason}")
+        frame_h, frame_w = frame.shape[:2]
+        sidecar = {
+            'timestamp': timestamp,
+            'seq': seq,
+            'reason': reason,
+            'width': frame_w,
+            'height': frame_h,
+            'detections': [
+                {
+                    'label': label,
+                    'class_id': self.labels.index(label) if label in self.labels else -1,
+                    'score': round(float(score), 4),
+                    'box': [int(v) for v in box],
+                }
+                for label, score, box in detections
+            ],
+        }
+        sidecar_bytes = json.dumps(sidecar, indent=2).encode('utf-8')
+
+        # Grava em .tmp e renomeia, para nunca deixar imagem truncada no dataset
+        for path, payload in ((base + '.json', sidecar_bytes), (base + '.jpg', buffer.tobytes())):
+            with open(path + '.tmp', 'wb') as f:
+                f.write(payload)
+            os.replace(path + '.tmp', path)
+
+        self.saved += 1
+        self._enforce_quota(base + '.jpg', len(buffer) + len(sidecar_bytes))
+
+    def _enforce_quota(self, path, size):
+        """Remove os arquivos mais antigos até voltar à cota"""
+        with self._quota_lock:
+            self._files.append((path, size))
+            self._total_bytes += size
+            while self._files and (
+                (self.max_bytes and self._total_bytes > self.max_bytes)
+                or (self.max_files and len(self._files) > self.max_files)
+            ):
+                old_path, old_size = self._files.popleft()
+                self._total_bytes -= old_size
+                for victim in (old_path, old_path[:-4] + '.json'):
+                    try:
+                        os.unlink(victim)
+                    except OSError:
+                        pass
+                self.evicted += 1
+
+    def close(self, timeout=5.0):
+        """Esvazia a fila (com limite de tempo) e encerra os workers"""
+        deadline = time.monotonic() + timeout
+        for _ in self._workers:
+            try:
+                self.queue.put(None, timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Full:
+                break
+        for worker in self._workers:
+            worker.join(max(deadline - time.monotonic(), 0.01))
+        logger.info(f"💾 Captura de dataset: {self.saved} salvos, {self.dropped} descartados, "
+                    f"{self.evicted} removidos pela cota")
@@ -0,0 +1,313 @@
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Registro de decodificadores: (nome, função que reconhece a assinatura, classe)
+DECODERS = []
+
+
+def register_decoder(name, matches):
+    """Registra um decodificador para modelos cuja assinatura de saída satisfaz `matches`"""
+    def wrapper(cls):
+        cls.format_name = name
+        DECODERS.append((name, matches, cls))
+        return cls
+    return wrapper
+
+
+def create_decoder(interpreter):
+    """Escolhe o decodificador adequado a partir das saídas do interpretador"""
+    output_details = interpreter.get_output_details()
+    for name, matches, cls in DECODERS:
+        if matches(output_details):
+            logger.info(f"🔎 Formato de saída detectado: {name}")
+            return cls(output_details)
+    shapes = [list(d['shape']) for d in output_details]
+    raise ValueError(f"Formato de saída do modelo não suportado: {shapes}")
+
+
+def output_shapes(output_details):
+    """Formas dos tensores de saída na ordem dos índices (parte da assinatura do modelo)"""
+    return [tuple(int(n) for n in d['shape']) for d in sorted(output_details, key=lambda d: d['index'])]
+
+
+def supressao_nao_maxima(boxes, scores, iou_threshold):
+    """Aplica Supressão Não-Máxima (NMS) para remover caixas sobrepostas."""
+    if len(boxes) == 0:
+        return []
+    x1 = boxes[:, 0]
+    y1 = boxes[:, 1]
+    x2 = boxes[:, 2]
+    y2 = boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+        w = np.maximum(0.0, xx2 - xx1)
+        h = np.maximum(0.0, yy2 - yy1)
+        intersection = w * h
+        iou = intersection / (areas[i] + areas[order[1:]] - intersection)
+        inds = np.where(iou <= iou_threshold)[0]
+        order = order[inds + 1]
+    return keep
+
+
+def apply_nms(boxes, scores, class_ids, iou_threshold):
+    """NMS sobre resultados já concatenados (ex.: várias faixas da ROI)"""
+    keep = supressao_nao_maxima(boxes, scores, iou_threshold)
+    return boxes[keep], scores[keep], class_ids[keep]
+
+
+def _empty_result():
+    return np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int32)
+
+
+def _is_yolo(output_details):
+    if len(output_details) != 1:
+        return False
+    shape = output_details[0]['shape']
+    return len(shape) == 3 and shape[0] == 1 and min(shape[1], shape[2]) > 4
+
+
+def _is_ssd_postprocess(output_details):
+    if len(output_details) != 4:
+        return False
+    ranks = sorted(len(d['shape']) for d in output_details)
+    return ranks == [1, 2, 2, 3] and any(d['shape'][-1] == 4 for d in output_details if len(d['shape']) == 3)
+
+
+@register_decoder('yolo', _is_yolo)
+class YoloDecoder:
+    """Saída única estilo YOLOv8: [1, 4+C, N] (transposta) ou [1, N, 4+C].
+
+    Caixas em (cx, cy, w, h) normalizados. O limiar é aplicado sobre o tensor
+    bruto (inclusive quantizado), e só os candidatos são desquantizados,
+    convertidos e passam pelo NMS.
+    """
+
+    needs_nms = True
+
+    def __init__(self, output_details):
+        detail = output_details[0]
+        self.index = detail['index']
+        self.output_shapes = output_shapes(output_details)
+        _, a, b = detail['shape']
+        # Convenção do YOLOv8: poucas linhas (4 + classes), muitas âncoras
+        self.transposed = a < b
+        self.num_classes = (a if self.transposed else b) - 4
+        scale, zero_point = detail.get('quantization', (0.0, 0))
+        self.quantized = np.issubdtype(detail['dtype'], np.integer) and scale > 0
+        self.scale = float(scale) if self.quantized else 1.0
+        self.zero_point = int(zero_point) if self.quantized else 0
+        # Buffers reaproveitados entre frames, dimensionados pelo número de âncoras
+        # na primeira decodificação (no pior caso todas passam do limiar)
+        self._scratch = None
+
+    def _raw_threshold(self, threshold):
+        if not self.quantized:
+            return threshold
+        return threshold / self.scale + self.zero_point
+
+    def _dequantize_into(self, values, out):
+        np.copyto(out, values)
+        if self.quantized:
+            np.subtract(out, self.zero_point, out=out)
+            np.multiply(out, self.scale, out=out)
+        return out
+
+    def _buffers(self, rows):
+        scratch = self._scratch
+        if scratch is None or scratch['raw'].dtype != rows.dtype:
+            n = rows.shape[1]
+            scratch = self._scratch = {
+                # Limiar e candidatos
+                'best': np.empty(n, dtype=rows.dtype),
+                'mask': np.empty(n, dtype=bool),
+                'anchors': np.arange(n, dtype=np.intp),
+                'index': np.empty(n, dtype=np.intp),
+                'raw': np.empty(n, dtype=rows.dtype),
+                'best_raw': np.empty(n, dtype=rows.dtype),
+                'equal': np.empty(n, dtype=bool),
+                'coords': np.empty((4, n), dtype=np.float32),
+                'half': np.empty(n, dtype=np.float32),
+                'edge': np.empty(n, dtype=np.float32),
+                'boxes': np.empty((n, 4), dtype=np.int32),
+                'scores': np.empty(n, dtype=np.float32),
+                'class_ids': np.empty(n, dtype=np.int32),
+                # NMS: caixas ordenadas por score, áreas e IoU contra as seguintes
+                'sorted': np.empty((4, n), dtype=np.int32),
+                'areas': np.empty(n, dtype=np.int32),
+                'inter_x': np.empty((2, n), dtype=np.int32),
+                'inter_y': np.empty((2, n), dtype=np.int32),
+                'inter': np.empty(n, dtype=np.float64),
+                'union': np.empty(n, dtype=np.float64),
+                'overlap': np.empty(n, dtype=bool),
+                'suppressed': np.empty(n, dtype=bool),
+            }
+        return scratch
+
+    def _select(self, interpreter, frame_w, frame_h, conf_threshold):
+        """Preenche os buffers com os candidatos acima do limiar; retorna (buffers, quantidade).
+
+        Os primeiros `count` elementos de boxes/scores/class_ids são views dos
+        buffers e valem só até a próxima decodificação.
+        """
+        # View do tensor de saída (sem cópia); não pode sobreviver ao próximo invoke
+        output = interpreter.tensor(self.index)()[0]
+        rows = output if self.transposed else output.T  # (4+C, N)
+        class_scores = rows[4:]
+        buf = self._buffers(rows)
+
+        # Máximo linha a linha: np.max(axis=0) alocaria buffers internos de redução
+        best = buf['best']
+        best[:] = class_scores[0]
+        for row in class_scores[1:]:
+            np.maximum(best, row, out=best)
+        np.greater(best, self._raw_threshold(conf_threshold), out=buf['mask'])
+        count = int(np.count_nonzero(buf['mask']))
+        if count == 0:
+            return buf, 0
+
+        index = np.compress(buf['mask'], buf['anchors'], out=buf['index'][:count])
+        best_raw = np.take(best, index, out=buf['best_raw'][:count])
+        self._dequantize_into(best_raw, buf['scores'][:count])
+
+        # argmax por candidato sem a cópia (C, k): percorre as classes de trás para frente
+        # para que, em caso de empate, vença a de menor índice (como o argmax)
+        raw = buf['raw'][:count]
+        equal = buf['equal'][:count]
+        class_ids = buf['class_ids'][:count]
+        for class_id in range(len(class_scores) - 1, -1, -1):
+            np.take(class_scores[class_id], index, out=raw)
+            np.equal(raw, best_raw, out=equal)
+            np.copyto(class_ids, class_id, where=equal)
+
+        coords = buf['coords'][:, :count]
+        for i in range(4):
+            np.take(rows[i], index, out=raw)
+            self._dequantize_into(raw, coords[i])
+        cx, cy, w, h = coords
+        half = buf['half'][:count]
+        edge = buf['edge'][:count]
+        boxes = buf['boxes'][:count]
+        for center, size, scale, low, high in ((cx, w, frame_w, 0, 2), (cy, h, frame_h, 1, 3)):
+            np.divide(size, 2, out=half)
+            np.subtract(center, half, out=edge)
+            np.multiply(edge, scale, out=edge)
+            boxes[:, low] = edge
+            np.add(center, half, out=edge)
+            np.multiply(edge, scale, out=edge)
+            boxes[:, high] = edge
+        return buf, count
+
+    def _nms(self, buf, count, iou_threshold):
+        """Mesma supressão de `supressao_nao_maxima`, sobre os buffers; retorna os índices mantidos"""
+        boxes = buf['boxes'][:count]
+        order = buf['scores'][:count].argsort()[::-1]
+        ordered = buf['sorted'][:, :count]
+        for i in range(4):
+            np.take(boxes[:, i], order, out=ordered[i])
+        x1, y1, x2, y2 = ordered
+        areas = buf['areas'][:count]
+        heights = buf['inter_y'][0, :count]
+        np.subtract(x2, x1, out=areas)
+        np.subtract(y2, y1, out=heights)
+        np.multiply(areas, heights, out=areas)
+        suppressed = buf['suppressed'][:count]
+        suppressed[:] = False
+
+        keep = []
+        for i in range(count):
+            if suppressed[i]:
+                continue
+            keep.append(order[i])
+            rest = count - i - 1
+            if rest == 0:
+                break
+            xx1, xx2 = buf['inter_x'][:, :rest]
+            yy1, yy2 = buf['inter_y'][:, :rest]
+            np.maximum(x1[i], x1[i + 1:], out=xx1)
+            np.maximum(y1[i], y1[i + 1:], out=yy1)
+            np.minimum(x2[i], x2[i + 1:], out=xx2)
+            np.minimum(y2[i], y2[i + 1:], out=yy2)
+            np.subtract(xx2, xx1, out=xx2)
+            np.subtract(yy2, yy1, out=yy2)
+            inter = buf['inter'][:rest]
+            union = buf['union'][:rest]
+            np.maximum(xx2, 0.0, out=inter)
+            np.maximum(yy2, 0.0, out=union)
+            np.multiply(inter, union, out=inter)
+            np.add(areas[i + 1:], areas[i], out=union)
+            np.subtract(union, inter, out=union)
+            np.divide(inter, union, out=inter)
+            # Suprime o que não satisfaz IoU <= limiar (inclui NaN, como a versão original)
+            overlap = buf['overlap'][:rest]
+            np.less_equal(inter, iou_threshold, out=overlap)
+            np.logical_not(overlap, out=overlap)
+            np.logical_or(suppressed[i + 1:], overlap, out=suppressed[i + 1:])
+        return keep
+
+    def candidates(self, interpreter, frame_w, frame_h, conf_threshold):
+        """Caixas acima do limiar, antes do NMS, em pixels de um quadro frame_w x frame_h"""
+        buf, count = self._select(interpreter, frame_w, frame_h, conf_threshold)
+        if count == 0:
+            return _empty_result()
+        # Cópias: quem chama acumula resultados de várias faixas e os altera
+        return buf['boxes'][:count].copy(), buf['scores'][:count].copy(), buf['class_ids'][:count].copy()
+
+    def decode(self, interpreter, frame_w, frame_h, conf_threshold, iou_threshold):
+        buf, count = self._select(interpreter, frame_w, frame_h, conf_threshold)
+        if count == 0:
+            return _empty_result()
+        keep = self._nms(buf, count, iou_threshold)
+        # Só as detecções mantidas saem dos buffers (são guardadas além do frame)
+        return buf['boxes'][keep], buf['scores'][keep], buf['class_ids'][keep]
+
+
+@register_decoder('ssd', _is_ssd_postprocess)
+class SsdDecoder:
+    """Saída do TFLite_Detection_PostProcess: caixas, classes, scores e contagem.
+
+    O modelo já aplicou NMS; aqui só se filtra por confiança e se converte
+    (ymin, xmin, ymax, xmax) normalizados para pixels do frame.
+    """
+
+    needs_nms = False
+
+    def __init__(self, output_details):
+        self.output_shapes = output_shapes(output_details)
+        by_rank = {}
+        for detail in sorted(output_details, key=lambda d: d['name']):
+            by_rank.setdefault(len(detail['shape']), []).append(detail['index'])
+        self.boxes_index = by_rank[3][0]
+        # Ordem padrão do PostProcess: ':1' = classes, ':2' = scores
+        self.classes_index, self.scores_index = by_rank[2][:2]
+        self.count_index = by_rank[1][0]
+
+    def candidates(self, interpreter, frame_w, frame_h, conf_threshold):
+        count = int(interpreter.get_tensor(self.count_index)[0])
+        scores = interpreter.get_tensor(self.scores_index)[0][:count]
+        selected = np.nonzero(scores > conf_threshold)[0]
+        if selected.size == 0:
+            return _empty_result()
+
+        raw_boxes = interpreter.get_tensor(self.boxes_index)[0][selected]
+        class_ids = interpreter.get_tensor(self.classes_index)[0][selected].astype(np.int32)
+
+        boxes = np.empty((selected.size, 4), dtype=np.int32)
+        boxes[:, 0] = raw_boxes[:, 1] * frame_w
+        boxes[:, 1] = raw_boxes[:, 0] * frame_h
+        boxes[:, 2] = raw_boxes[:, 3] * frame_w
+        boxes[:, 3] = raw_boxes[:, 2] * frame_h
+        return boxes, scores[selected].astype(np.float32), class_ids
+
+    def decode(self, interpreter, frame_w, frame_h, conf_threshold, iou_threshold):
+        return self.candidates(interpreter, frame_w, frame_h, conf_threshold)
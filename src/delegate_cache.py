@@ -0,0 +1,224 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Locais conhecidos da biblioteca do delegate VX (mesma lista de scripts/check_delegates.py)
+VX_DELEGATE_SEARCH_PATHS = [
+    '/usr/lib/libvx_delegate.so',
+    '/usr/local/lib/libvx_delegate.so',
+    '/usr/lib/aarch64-linux-gnu/libvx_delegate.so',
+    '/usr/lib/arm-linux-gnueabihf/libvx_delegate.so',
+]
+
+STATUS_OK = 'ok'
+STATUS_FAILED = 'failed'
+STATUS_PENDING = 'pending'
+
+# A espera por nova tentativa dobra a cada falha repetida, até este fator
+MAX_RETRY_SCALE = 16
+
+
+class DelegateCache:
+    """Cache persistente de capacidade do delegate e do grafo compilado pelo VX.
+
+    Guarda em `capabilities.json` se um delegate carregou e executou para um
+    par (hash do modelo, versão da biblioteca). Uma tentativa que derruba o
+    processo fica registrada como `pending` e é tratada como falha no próximo
+    boot, evitando repetir o crash.
+
+    Falhas não são permanentes: a entrada volta a ser tentada depois de
+    `retry_after_boots` consultas recusadas (boots que pularam o delegate) ou
+    de `retry_after_s` segundos, o que vier primeiro (0 desabilita cada
+    regra). Cada falha repetida dobra os dois prazos, até `MAX_RETRY_SCALE`
+    vezes, para um delegate que sempre derruba o processo não entrar em laço.
+    """
+
+    def __init__(self, cache_dir, max_graph_files=4, retry_after_boots=5, retry_after_s=86400.0):
+        self.cache_dir = cache_dir
+        self.max_graph_files = max_graph_files
+        self.retry_after_boots = retry_after_boots
+        self.retry_after_s = retry_after_s
+        self.capabilities_path = os.path.join(cache_dir, 'capabilities.json')
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._hashes = {}
+
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.writable = os.access(cache_dir, os.W_OK)
+        except OSError as e:
+            logger.warning(f"Diretório de cache indisponível ({cache_dir}): {e}")
+            self.writable = False
+
+        self._load()
+
+    def _load(self):
+        """Carrega o arquivo de capacidades, ignorando conteúdo corrompido"""
+        if not os.path.exists(self.capabilities_path):
+            return
+        try:
+            with open(self.capabilities_path, 'r') as f:
+                data = json.load(f)
+            self._entries = data.get('entries', {})
+            self._hashes = data.get('hashes', {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache de delegates corrompido, recriando: {e}")
+            self._entries = {}
+            self._hashes = {}
+
+    def _save(self):
+        """Grava o cache de forma atômica (tmp + fsync + rename)"""
+        if not self.writable:
+            return
+        tmp_path = self.capabilities_path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'entries': self._entries, 'hashes': self._hashes}, f, indent=2, sort_keys=True)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.capabilities_path)
+        except OSError as e:
+            logger.warning(f"Falha ao gravar cache de delegates: {e}")
+
+    def model_hash(self, model_path):
+        """SHA-256 do modelo, memorizado por (tamanho, mtime) para não reler o arquivo"""
+        st = os.stat(model_path)
+        stamp = f"{st.st_size}:{st.st_mtime_ns}"
+        real_path = os.path.realpath(model_path)
+        cached = self._hashes.get(real_path)
+        if cached and cached.get('stamp') == stamp:
+            return cached['sha256']
+
+        digest = hashlib.sha256()
+        with open(model_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        value = digest.hexdigest()
+        with self._lock:
+            self._hashes[real_path] = {'stamp': stamp, 'sha256': value}
+        return value
+
+    @staticmethod
+    def find_library(lib_name):
+        """Resolve o caminho real da biblioteca do delegate, se existir"""
+        if os.path.isabs(lib_name):
+            return lib_name if os.path.exists(lib_name) else None
+        search = [os.path.join(d, lib_name) for d in os.getenv('LD_LIBRARY_PATH', '').split(':') if d]
+        search += [p for p in VX_DELEGATE_SEARCH_PATHS if os.path.basename(p) == lib_name]
+        for path in search:
+            if os.path.exists(path):
+                return os.path.realpath(path)
+        return None
+
+    @classmethod
+    def library_version(cls, lib_name, runtime_version=''):
+        """Identifica a versão da biblioteca pelo arquivo real + versão do runtime TFLite"""
+        path = cls.find_library(lib_name)
+        if not path:
+            return f"{lib_name}:missing:{runtime_version}"
+        st = os.stat(path)
+        return f"{path}:{st.st_size}:{int(st.st_mtime)}:{runtime_version}"
+
+    def key(self, model_path, lib_name, runtime_version=''):
+        return f"{self.model_hash(model_path)}|{self.library_version(lib_name, runtime_version)}"
+
+    def lookup(self, key):
+        """Retorna a entrada registrada para a chave ou None"""
+        return self._entries.get(key)
+
+    def is_known_bad(self, key):
+        """Falha (ou crash) registrada que ainda não venceu; cada recusa conta um boot pulado"""
+        entry = self.lookup(key)
+        if entry is None or entry.get('status') not in (STATUS_FAILED, STATUS_PENDING):
+            return False
+        if self.retry_due(entry):
+            logger.info(f"🔁 Falha registrada no cache venceu ({entry.get('attempts', 1)} tentativa(s), "
+                        f"{entry.get('skipped', 0)} boot(s) pulado(s)) - tentando o delegate de novo")
+            return False
+        with self._lock:
+            entry['skipped'] = entry.get('skipped', 0) + 1
+            self._save()
+        return True
+
+    def retry_due(self, entry, now=None):
+        """Se a entrada `failed`/`pending` já pode ser tentada de novo"""
+        now = time.time() if now is None else now
+        scale = min(2 ** max(entry.get('attempts', 1) - 1, 0), MAX_RETRY_SCALE)
+        if self.retry_after_boots and entry.get('skipped', 0) >= self.retry_after_boots * scale:
+            return True
+        if self.retry_after_s and now - entry.get('timestamp', now) >= self.retry_after_s * scale:
+            return True
+        return False
+
+    def is_known_good(self, key):
+        entry = self.lookup(key)
+        return entry is not None and entry.get('status') == STATUS_OK
+
+    def mark_pending(self, key):
+        """Registra a tentativa antes de carregar o delegate (detecta crash no boot seguinte)"""
+        previous = self.lookup(key)
+        attempts = 1
+        if previous is not None and previous.get('status') != STATUS_OK:
+            attempts = previous.get('attempts', 1) + 1
+        self._record(key, STATUS_PENDING, 'tentativa em andamento', attempts)
+
+    def record_success(self, key, detail=''):
+        self._record(key, STATUS_OK, detail, 0)
+
+    def record_failure(self, key, reason):
+        previous = self.lookup(key)
+        self._record(key, STATUS_FAILED, reason, previous.get('attempts', 1) if previous else 1)
+
+    def _record(self, key, status, detail, attempts):
+        with self._lock:
+            self._entries[key] = {'status': status, 'detail': str(detail), 'timestamp': time.time(),
+                                  'attempts': attempts, 'skipped': 0}
+            self._save()
+
+    def clear(self):
+        """Apaga capacidades registradas e grafos compilados"""
+        with self._lock:
+            self._entries = {}
+            self._save()
+        for name in self._graph_files():
+            try:
+                os.unlink(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+
+    def graph_cache_path(self, model_path):
+        """Caminho do grafo binário compilado pelo VX para este modelo"""
+        return os.path.join(self.cache_dir, f"vx_{self.model_hash(model_path)[:16]}.nb")
+
+    def vx_options(self, model_path):
+        """Opções do delegate VX que habilitam o cache de grafo compilado"""
+        if not self.writable:
+            return {}
+        self.prune_graphs(keep=self.graph_cache_path(model_path))
+        return {
+            'allowed_cache_mode': 'true',
+            'cache_file_path': self.graph_cache_path(model_path),
+        }
+
+    def _graph_files(self):
+        try:
+            return [n for n in os.listdir(self.cache_dir) if n.startswith('vx_') and n.endswith('.nb')]
+        except OSError:
+            return []
+
+    def prune_graphs(self, keep=None):
+        """Mantém apenas os `max_graph_files` grafos mais recentes (além do atual)"""
+        paths = [os.path.join(self.cache_dir, n) for n in self._graph_files()]
+        paths = [p for p in paths if p != keep]
+        paths.sort(key=lambda p: os.path.getmtime(p), reverse=True)
+        for path in paths[max(self.max_graph_files - 1, 0):]:
+            try:
+                os.unlink(path)
+                logger.info(f"🧹 Grafo VX antigo removido do cache: {os.path.basename(path)}")
+            except OSError:
+                pass
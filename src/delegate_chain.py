@@ -0,0 +1,203 @@
+import logging
+import os
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VX_LIBRARY = 'libvx_delegate.so'
+
+# Entradas reconhecidas na cadeia, da mais rápida (NPU) à mais simples
+DELEGATE_KINDS = ('vx', 'xnnpack', 'builtin', 'reference')
+
+
+def op_resolver_type(tflite):
+    """Enum OpResolverType (tflite_runtime o expõe no módulo; o TensorFlow em `experimental`)"""
+    return getattr(tflite, 'OpResolverType', None) or tflite.experimental.OpResolverType
+
+
+def parse_chain(value):
+    """Converte "vx,xnnpack,builtin" em lista validada"""
+    chain = [k.strip().lower() for k in value.split(',') if k.strip()]
+    unknown = [k for k in chain if k not in DELEGATE_KINDS]
+    if unknown:
+        raise ValueError(f"Delegates desconhecidos na cadeia: {unknown} (válidos: {list(DELEGATE_KINDS)})")
+    return chain
+
+
+def build_interpreter(tflite, model_path, kind, num_threads=None, vx_library=VX_LIBRARY, vx_options=None):
+    """Cria (sem alocar) o interpretador para uma entrada da cadeia.
+
+    - vx: delegate da NPU carregado de `vx_library`
+    - xnnpack: resolvedor padrão do runtime, que aplica o XNNPACK na CPU
+    - builtin: kernels otimizados do TFLite, sem delegates padrão
+    - reference: kernels de referência (lentos; último recurso/diagnóstico)
+    """
+    kwargs = {'model_path': model_path}
+    if kind == 'vx':
+        kwargs['experimental_delegates'] = [tflite.load_delegate(vx_library, options=vx_options or {})]
+    else:
+        kwargs['num_threads'] = num_threads
+        if kind == 'builtin':
+            kwargs['experimental_op_resolver_type'] = op_resolver_type(tflite).BUILTIN_WITHOUT_DEFAULT_DELEGATES
+        elif kind == 'reference':
+            kwargs['experimental_op_resolver_type'] = op_resolver_type(tflite).BUILTIN_REF
+    return tflite.Interpreter(**kwargs)
+
+
+def thread_candidates(cpu_count=None):
+    """num_threads testados no modo automático: 1, 2, 4 ... até o número de CPUs"""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    candidates = {cpu_count}
+    n = 1
+    while n < cpu_count:
+        candidates.add(n)
+        n *= 2
+    return sorted(candidates)
+
+
+class DelegateChain:
+    """Escolhe o caminho de execução percorrendo uma cadeia ordenada de delegates.
+
+    Cada entrada só é aceita depois de alocar, executar um invoke de teste com
+    saída finita e ficar dentro de `max_latency_ms` (mediana de
+    `validation_invokes` invokes; 0 desabilita o limite). Entradas de CPU com
+    `num_threads='auto'` medem os candidatos de `thread_candidates` e ficam com
+    o mais rápido (empate de até 5% favorece menos threads, deixando núcleos
+    livres para câmera e PLC). O VX consulta o DelegateCache para não repetir
+    combinações que já falharam ou derrubaram o processo.
+    """
+
+    def __init__(self, tflite, chain, num_threads='auto', max_latency_ms=0.0, validation_invokes=5,
+                 delegate_cache=None, runtime_version=''):
+        self.tflite = tflite
+        self.chain = list(chain)
+        self.num_threads = num_threads
+        self.max_latency_ms = max_latency_ms
+        self.validation_invokes = max(int(validation_invokes), 1)
+        self.delegate_cache = delegate_cache
+        self.runtime_version = runtime_version
+        self.attempts = []
+        self.choice = None
+
+    def _validate(self, interpreter):
+        """Aloca, roda o invoke de teste e mede a latência; retorna a mediana em ms"""
+        interpreter.allocate_tensors()
+        detail = interpreter.get_input_details()[0]
+        interpreter.set_tensor(detail['index'], np.zeros(detail['shape'], dtype=detail['dtype']))
+        interpreter.invoke()
+
+        for output in interpreter.get_output_details():
+            values = interpreter.get_tensor(output['index'])
+            if np.issubdtype(values.dtype, np.floating) and not np.all(np.isfinite(values)):
+                raise ValueError(f"saída '{output['name']}' não finita no invoke de teste")
+
+        latencies = []
+        for _ in range(self.validation_invokes):
+            start = time.perf_counter()
+            interpreter.invoke()
+            latencies.append((time.perf_counter() - start) * 1000)
+        return float(np.median(latencies))
+
+    def _check_latency(self, latency_ms):
+        if self.max_latency_ms and latency_ms > self.max_latency_ms:
+            raise ValueError(f"latência {latency_ms:.1f}ms acima do limite {self.max_latency_ms:.1f}ms")
+
+    def _try_vx(self, model_path):
+        cache = self.delegate_cache
+        key = None
+        vx_options = None
+        if cache is not None:
+            key = cache.key(model_path, VX_LIBRARY, self.runtime_version)
+            if cache.is_known_bad(key):
+                raise RuntimeError(f"falha registrada em cache: {cache.lookup(key).get('detail')}")
+            vx_options = cache.vx_options(model_path)
+            graph_cached = os.path.exists(cache.graph_cache_path(model_path))
+            logger.info(f"🔧 Carregando modelo com delegate VX (grafo em cache: {'sim' if graph_cached else 'não'})...")
+            cache.mark_pending(key)
+
+        start = time.perf_counter()
+        try:
+            interpreter = build_interpreter(self.tflite, model_path, 'vx', vx_options=vx_options)
+            latency_ms = self._validate(interpreter)
+        except Exception as e:
+            if key:
+                cache.record_failure(key, e)
+            raise
+        if key:
+            cache.record_success(key, f"carga+validação em {(time.perf_counter() - start) * 1000:.0f}ms, "
+                                      f"invoke {latency_ms:.1f}ms")
+        # Lento demais não é falha do delegate: não fica registrado como ruim no cache
+        self._check_latency(latency_ms)
+        return interpreter, None, latency_ms
+
+    def _try_cpu(self, model_path, kind):
+        if self.num_threads != 'auto':
+            interpreter = build_interpreter(self.tflite, model_path, kind, int(self.num_threads))
+            latency_ms = self._validate(interpreter)
+            self._check_latency(latency_ms)
+            return interpreter, int(self.num_threads), latency_ms
+
+        best = None
+        for threads in thread_candidates():
+            interpreter = build_interpreter(self.tflite, model_path, kind, threads)
+            latency_ms = self._validate(interpreter)
+            logger.info(f"   {kind} com {threads} thread(s): {latency_ms:.1f}ms")
+            if best is None or latency_ms < best[2] * 0.95:
+                best = (interpreter, threads, latency_ms)
+            else:
+                del interpreter
+        self._check_latency(best[2])
+        return best
+
+    def replicate(self, model_path, count):
+        """Cria `count` interpretadores extras no caminho escolhido por `select`, já validados.
+
+        Todos abrem o mesmo arquivo por `model_path` (mapeado em memória pelo
+        TFLite), então os pesos ficam compartilhados no page cache.
+        """
+        if self.choice is None:
+            raise RuntimeError("Nenhum caminho de execução escolhido (chame select antes)")
+        kind = self.choice['delegate']
+        vx_options = None
+        if kind == 'vx' and self.delegate_cache is not None:
+            vx_options = self.delegate_cache.vx_options(model_path)
+        replicas = []
+        for _ in range(count):
+            interpreter = build_interpreter(self.tflite, model_path, kind, self.choice['num_threads'],
+                                            vx_options=vx_options)
+            self._validate(interpreter)
+            replicas.append(interpreter)
+        return replicas
+
+    def select(self, model_path):
+        """Retorna o primeiro interpretador aceito na cadeia; RuntimeError se nenhum for"""
+        self.attempts = []
+        for kind in self.chain:
+            start = time.perf_counter()
+            try:
+                if kind == 'vx':
+                    interpreter, threads, latency_ms = self._try_vx(model_path)
+                else:
+                    interpreter, threads, latency_ms = self._try_cpu(model_path, kind)
+            except Exception as e:
+                self.attempts.append({'delegate': kind, 'accepted': False, 'reason': str(e)})
+                logger.warning(f"⏭️  Delegate '{kind}' rejeitado: {e}")
+                continue
+
+            self.choice = {
+                'delegate': kind,
+                'num_threads': threads,
+                'latency_ms': latency_ms,
+                'setup_ms': (time.perf_counter() - start) * 1000,
+            }
+            self.attempts.append({'delegate': kind, 'accepted': True, 'reason': f"{latency_ms:.1f}ms"})
+            rejected = [f"{a['delegate']} ({a['reason']})" for a in self.attempts if not a['accepted']]
+            logger.info(f"✅ Caminho de execução: {kind}"
+                        f"{f' com {threads} thread(s)' if threads else ''}, invoke {latency_ms:.1f}ms"
+                        f"{' | rejeitados: ' + '; '.join(rejected) if rejected else ''}")
+            return interpreter
+
+        reasons = '; '.join(f"{a['delegate']}: {a['reason']}" for a in self.attempts)
+        raise RuntimeError(f"Nenhum delegate da cadeia {self.chain} foi aceito ({reasons})")
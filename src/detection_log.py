@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Log binário de detecções em arquivo circular mapeado em memória.
+
+Layout do arquivo:
+    [0, 4096)            cabeçalho (magic, capacidade, contador, stride, labels em JSON)
+    [4096, ...)          registros de tamanho fixo (RECORD_DTYPE), em anel
+    [..., fim)           índice esparso: um bloco por `index_stride` registros
+                         com tempo mínimo/máximo e máscara das classes presentes
+
+Uso como consulta:
+    python3 src/detection_log.py data/logs/detections.bin --start 10:00 --end 10:05 --class PEDRA
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'POTLOG01'
+HEADER_SIZE = 4096
+LABELS_OFFSET = 32
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('seq', '<u8'),
+    ('class_id', '<i2'),
+    ('plc_value', '<i2'),
+    ('score', '<f4'),
+    ('box', '<i4', (4,)),
+])
+
+INDEX_DTYPE = np.dtype([
+    ('first', '<u8'),       # número absoluto do primeiro registro do bloco
+    ('t_min', '<f8'),
+    ('t_max', '<f8'),
+    ('class_mask', '<u8'),
+])
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('capacity', '<u8'),
+    ('write_count', '<u8'),
+    ('index_stride', '<u8'),
+])
+
+
+def _class_bit(class_id):
+    return np.uint64(1) << np.uint64(min(max(int(class_id), 0), 63))
+
+
+class DetectionLog:
+    """Log append-only de detecções com flush periódico e índice por tempo/classe.
+
+    `append` apenas escreve campos no mapeamento (microssegundos por frame);
+    uma thread de fundo faz `flush` a cada `flush_interval` segundos, o que
+    limita a perda de dados em caso de queda de energia a esse intervalo.
+    """
+
+    def __init__(self, path, capacity=500_000, index_stride=256, flush_interval=1.0,
+                 labels=None, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flush_thread = None
+        self._dirty = False
+
+        capacity = max(index_stride, (capacity // index_stride) * index_stride)
+        if readonly:
+            self._open_existing()
+        else:
+            if not self._try_open_existing(capacity, index_stride):
+                self._create(capacity, index_stride, labels or [])
+            self._flush_thread = threading.Thread(target=self._flush_loop, name='detection-log-flush', daemon=True)
+            self._flush_thread.start()
+
+    # --- Arquivo ---------------------------------------------------------
+
+    def _file_size(self, capacity, index_stride):
+        return HEADER_SIZE + capacity * RECORD_DTYPE.itemsize + (capacity // index_stride) * INDEX_DTYPE.itemsize
+
+    def _map(self, mode):
+        self._mm = np.memmap(self.path, dtype=np.uint8, mode=mode)
+        self.header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self._mm, offset=0)
+        self.capacity = int(self.header['capacity'])
+        self.index_stride = int(self.header['index_stride'])
+        self.records = np.ndarray((self.capacity,), dtype=RECORD_DTYPE, buffer=self._mm, offset=HEADER_SIZE)
+        self.index = np.ndarray((self.capacity // self.index_stride,), dtype=INDEX_DTYPE, buffer=self._mm,
+                                offset=HEADER_SIZE + self.capacity * RECORD_DTYPE.itemsize)
+        raw_labels = bytes(self._mm[LABELS_OFFSET:HEADER_SIZE]).rstrip(b'\x00')
+        try:
+            self.labels = json.loads(raw_labels.decode('utf-8')) if raw_labels else []
+        except ValueError:
+            self.labels = []
+
+    def _open_existing(self):
+        with open(self.path, 'rb') as f:
+            if f.read(8) != MAGIC:
+                raise ValueError(f"Arquivo não é um log de detecções: {self.path}")
+        self._map('r')
+
+    def _try_open_existing(self, capacity, index_stride):
+        """Reabre o log existente se o formato for compatível; senão o renomeia"""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            expected = self._file_size(capacity, index_stride)
+            with open(self.path, 'rb') as f:
+                header = np.frombuffer(f.read(HEADER_DTYPE.itemsize), dtype=HEADER_DTYPE)[0]
+            if (header['magic'] == MAGIC and int(header['capacity']) == capacity
+                    and int(header['index_stride']) == index_stride
+                    and os.path.getsize(self.path) == expected):
+                self._map('r+')
+                logger.info(f"📒 Log de detecções reaberto: {self.path} ({int(self.header['write_count'])} registros)")
+                return True
+        except (OSError, ValueError, IndexError) as e:
+            logger.warning(f"Log de detecções ilegível: {e}")
+
+        backup = self.path + '.old'
+        os.replace(self.path, backup)
+        logger.warning(f"Formato do log de detecções mudou - arquivo anterior movido para {backup}")
+        return False
+
+    def _create(self, capacity, index_stride, labels):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'wb') as f:
+            f.truncate(self._file_size(capacity, index_stride))
+        self._mm = np.memmap(self.path, dtype=np.uint8, mode='r+')
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self._mm, offset=0)
+        header['magic'] = MAGIC
+        header['capacity'] = capacity
+        header['write_count'] = 0
+        header['index_stride'] = index_stride
+        self._write_labels(labels)
+        self._mm.flush()
+        self._map('r+')
+        logger.info(f"📒 Log de detecções criado: {self.path} ({capacity} registros)")
+
+    def _write_labels(self, labels):
+        raw = json.dumps(list(labels)).encode('utf-8')[:HEADER_SIZE - LABELS_OFFSET]
+        self._mm[LABELS_OFFSET:HEADER_SIZE] = 0
+        self._mm[LABELS_OFFSET:LABELS_OFFSET + len(raw)] = np.frombuffer(raw, dtype=np.uint8)
+
+    def set_labels(self, labels):
+        """Grava os nomes das classes no cabeçalho (usados pelas consultas)"""
+        with self._lock:
+            self._write_labels(labels)
+            self.labels = list(labels)
+            self._dirty = True
+
+    # --- Escrita ---------------------------------------------------------
+
+    @property
+    def write_count(self):
+        return int(self.header['write_count'])
+
+    def append(self, timestamp, seq, detections, plc_value):
+        """Registra as detecções de um frame: lista de (class_id, score, (x1, y1, x2, y2))"""
+        if not detections:
+            return
+        with self._lock:
+            n = int(self.header['write_count'])
+            for class_id, score, box in detections:
+                slot = n % self.capacity
+                rec = self.records[slot]
+                rec['timestamp'] = timestamp
+                rec['seq'] = seq
+                rec['class_id'] = class_id
+                rec['plc_value'] = plc_value
+                rec['score'] = score
+                rec['box'] = box
+
+                block = slot // self.index_stride
+                entry = self.index[block]
+                if n % self.index_stride == 0:
+                    entry['first'] = n
+                    entry['t_min'] = timestamp
+                    entry['t_max'] = timestamp
+                    entry['class_mask'] = 0
+                else:
+                    entry['t_min'] = min(float(entry['t_min']), timestamp)
+                    entry['t_max'] = max(float(entry['t_max']), timestamp)
+                entry['class_mask'] = entry['class_mask'] | _class_bit(class_id)
+                n += 1
+
+            # Contador atualizado por último: um registro só "existe" depois de escrito
+            self.header['write_count'] = n
+            self._dirty = True
+
+    def flush(self):
+        """Força a gravação das páginas sujas em disco"""
+        if self.readonly:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+        self._mm.flush()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Erro ao gravar log de detecções: {e}")
+
+    def close(self):
+        self._stop.set()
+        if self._flush_thread:
+            self._flush_thread.join(timeout=2.0)
+        self.flush()
+
+    # --- Consulta --------------------------------------------------------
+
+    def query(self, start=None, end=None, class_id=None):
+        """Retorna os registros (em ordem de escrita) no intervalo de tempo e classe pedidos.
+
+        Usa o índice esparso para pular blocos inteiros fora do intervalo
+        ou sem a classe pedida.
+        """
+        total = self.write_count
+        oldest = max(0, total - self.capacity)
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        n_blocks = len(self.index)
+        bit = _class_bit(class_id) if class_id is not None else None
+
+        results = []
+        for block_abs in range(oldest // self.index_stride, (total + self.index_stride - 1) // self.index_stride):
+            entry = self.index[block_abs % n_blocks]
+            if int(entry['first']) != block_abs * self.index_stride:
+                # Bloco mais antigo, já em parte sobrescrito: a entrada do índice é do bloco
+                # novo, então o que sobrou dele é varrido sem o índice
+                if block_abs * self.index_stride > oldest:
+                    continue
+            elif entry['t_max'] < start or entry['t_min'] > end:
+                continue
+            elif bit is not None and not (entry['class_mask'] & bit):
+                continue
+
+            lo = max(block_abs * self.index_stride, oldest)
+            hi = min((block_abs + 1) * self.index_stride, total)
+            chunk = self.records[lo % self.capacity:(hi - 1) % self.capacity + 1]
+            mask = (chunk['timestamp'] >= start) & (chunk['timestamp'] <= end)
+            if class_id is not None:
+                mask &= chunk['class_id'] == class_id
+            if mask.any():
+                results.append(chunk[mask])
+
+        if not results:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.concatenate(results)
+
+
+def _parse_time(value):
+    """Aceita timestamp unix, 'HH:MM[:SS]' (hoje) ou ISO 8601"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    for fmt in ('%H:%M', '%H:%M:%S'):
+        try:
+            t = datetime.datetime.strptime(value, fmt).time()
+            return datetime.datetime.combine(datetime.date.today(), t).timestamp()
+        except ValueError:
+            continue
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consulta o log binário de detecções")
+    parser.add_argument('path', help="Arquivo do log (ex.: data/logs/detections.bin)")
+    parser.add_argument('--start', help="Início (unix, HH:MM[:SS] ou ISO 8601)")
+    parser.add_argument('--end', help="Fim (unix, HH:MM[:SS] ou ISO 8601)")
+    parser.add_argument('--class', dest='class_name', help="Nome ou id da classe (ex.: PEDRA)")
+    args = parser.parse_args()
+
+    log = DetectionLog(args.path, readonly=True)
+    class_id = None
+    if args.class_name is not None:
+        if args.class_name in log.labels:
+            class_id = log.labels.index(args.class_name)
+        else:
+            class_id = int(args.class_name)
+
+    started = time.perf_counter()
+    rows = log.query(_parse_time(args.start), _parse_time(args.end), class_id)
+    elapsed = time.perf_counter() - started
+
+    for row in rows:
+        ts = datetime.datetime.fromtimestamp(row['timestamp']).isoformat(timespec='milliseconds')
+        cid = int(row['class_id'])
+        label = log.labels[cid] if 0 <= cid < len(log.labels) else f'Class_{cid}'
+        x1, y1, x2, y2 = (int(v) for v in row['box'])
+        print(f"{ts}  seq={int(row['seq'])}  {label:<6} score={row['score']:.2f}  "
+              f"box=({x1},{y1},{x2},{y2})  plc={int(row['plc_value'])}")
+    print(f"{len(rows)} registro(s) em {elapsed*1000:.1f}ms ({log.write_count} gravados no total)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
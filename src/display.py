@@ -0,0 +1,212 @@
+import cv2
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def desenhar_deteccoes(frame, detections, info_text, colors, size=None, out=None):
+    """Desenha caixas, labels e texto de performance em uma cópia do frame.
+
+    Se `size` (largura, altura) for informado, o frame é redimensionado antes
+    do desenho e as caixas são escaladas, mantendo o traço nítido no destino.
+    `out` é um canvas reaproveitado entre chamadas (usado se tiver o tamanho certo).
+    """
+    frame_h, frame_w = frame.shape[:2]
+    out_w, out_h = size if size else (frame_w, frame_h)
+    if out is not None and out.shape != (out_h, out_w) + frame.shape[2:]:
+        out = None
+    if (out_w, out_h) != (frame_w, frame_h):
+        canvas = cv2.resize(frame, (out_w, out_h), dst=out, interpolation=cv2.INTER_LINEAR)
+    elif out is not None:
+        canvas = out
+        canvas[...] = frame
+    else:
+        canvas = frame.copy()
+    sx = out_w / frame_w
+    sy = out_h / frame_h
+
+    for label, score, (x1, y1, x2, y2) in detections:
+        color = colors.get(label, (255, 255, 255))
+        p1 = (int(x1 * sx), int(y1 * sy))
+        p2 = (int(x2 * sx), int(y2 * sy))
+        cv2.rectangle(canvas, p1, p2, color, 2)
+        cv2.putText(canvas, f'{label}: {score:.2f}', (p1[0], p1[1] - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+
+    if info_text:
+        cv2.putText(canvas, info_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    return canvas
+
+
+class FrameCopies:
+    """Cópias dos frames entregues a threads consumidoras, com buffers reaproveitados.
+
+    O frame do loop pode ser uma view de um buffer da câmera (Basler sem cópia)
+    que volta ao driver poucas leituras depois; quem o usa em outra thread
+    precisa de uma cópia própria. Os buffers devolvidos com `release` são
+    reutilizados, então em regime permanente a cópia não aloca.
+    """
+
+    def __init__(self, spare=2):
+        self.spare = spare
+        self._free = []
+        self._lock = threading.Lock()
+
+    def copy(self, frame):
+        with self._lock:
+            buffer = self._free.pop() if self._free else None
+        if buffer is None or buffer.shape != frame.shape or buffer.dtype != frame.dtype:
+            buffer = np.empty_like(frame)
+        np.copyto(buffer, frame)
+        return buffer
+
+    def release(self, buffer):
+        with self._lock:
+            if len(self._free) < self.spare:
+                self._free.append(buffer)
+
+
+class DisplayWorker:
+    """Renderiza o último frame e suas detecções em uma thread própria.
+
+    O loop de inferência apenas publica (frame, detecções, texto) via
+    `update`; esta thread desenha no tamanho da janela, com taxa limitada a
+    `refresh_hz`, de modo que o compositor (Weston) não dita o FPS da inferência.
+    Toda chamada HighGUI fica nesta thread, como o OpenCV exige.
+    """
+
+    def __init__(self, window_name, colors, refresh_hz=15.0, fullscreen=True,
+                 window_size=(1024, 768), on_quit=None):
+        self.window_name = window_name
+        self.colors = colors
+        self.refresh_hz = refresh_hz
+        self.fullscreen = fullscreen
+        self.window_size = window_size
+        self.on_quit = on_quit
+
+        self._lock = threading.Lock()
+        self._new_frame = threading.Event()
+        self._latest = None
+        self._copies = FrameCopies()
+        self._display_size = window_size
+        self._canvas = None
+        self._last_size_check = 0.0
+        self._stop = False
+        self.thread = None
+
+        self.frames_received = 0
+        self.frames_rendered = 0
+
+    def start(self):
+        """Inicia a thread de exibição"""
+        if self.thread is None or not self.thread.is_alive():
+            self._stop = False
+            self.thread = threading.Thread(target=self._run, name='display', daemon=True)
+            self.thread.start()
+            logger.info(f"🖥️  Thread de exibição iniciada ({self.refresh_hz:.0f} Hz)")
+
+    def stop(self, timeout=2.0):
+        """Para a thread de exibição e fecha a janela"""
+        self._stop = True
+        self._new_frame.set()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout)
+
+    def update(self, frame, detections, info_text=''):
+        """Publica uma cópia do frame mais recente e suas detecções.
+
+        `detections` é uma lista de (label, score, (x1, y1, x2, y2)) em
+        coordenadas do frame. Frames não exibidos são simplesmente substituídos.
+        """
+        image = self._copies.copy(frame)
+        with self._lock:
+            replaced, self._latest = self._latest, (image, detections, info_text)
+            self.frames_received += 1
+        if replaced is not None:
+            self._copies.release(replaced[0])
+        self._new_frame.set()
+
+    def _setup_window(self):
+        """Cria a janela uma única vez (moveWindow só aqui)"""
+        cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
+        if self.fullscreen:
+            cv2.setWindowProperty(self.window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+            logger.info("🖥️  Janela configurada para TELA CHEIA")
+        else:
+            cv2.resizeWindow(self.window_name, *self.window_size)
+            cv2.moveWindow(self.window_name, 100, 50)
+            logger.info(f"🖥️  Janela configurada para modo CENTRALIZADO ({self.window_size[0]}x{self.window_size[1]})")
+
+    def _query_display_size(self):
+        """Atualiza o tamanho da área de desenho (no máximo uma vez por segundo)"""
+        now = time.monotonic()
+        if now - self._last_size_check < 1.0:
+            return self._display_size
+        self._last_size_check = now
+        try:
+            _, _, w, h = cv2.getWindowImageRect(self.window_name)
+            if w > 0 and h > 0:
+                self._display_size = (w, h)
+        except Exception:
+            pass
+        return self._display_size
+
+    def render(self, frame, detections, info_text):
+        """Redimensiona para o tamanho da janela e desenha as detecções (canvas reaproveitado)"""
+        self._canvas = desenhar_deteccoes(frame, detections, info_text, self.colors,
+                                          self._query_display_size(), out=self._canvas)
+        return self._canvas
+
+    def _run(self):
+        try:
+            self._setup_window()
+        except Exception as e:
+            logger.error(f"Erro ao criar janela de exibição: {e}")
+            return
+
+        next_render = time.monotonic()
+
+        while not self._stop:
+            self._new_frame.wait(timeout=0.1)
+            if self._stop:
+                break
+
+            # Limitar a taxa de atualização (refresh_hz pode mudar em execução)
+            period = 1.0 / self.refresh_hz if self.refresh_hz > 0 else 0.0
+            now = time.monotonic()
+            if now < next_render:
+                time.sleep(next_render - now)
+            next_render = max(next_render + period, time.monotonic())
+
+            latest = None
+            if self._new_frame.is_set():
+                with self._lock:
+                    latest, self._latest = self._latest, None
+                    self._new_frame.clear()
+
+            try:
+                if latest is not None:
+                    try:
+                        cv2.imshow(self.window_name, self.render(*latest))
+                    finally:
+                        self._copies.release(latest[0])
+                    self.frames_rendered += 1
+
+                # waitKey também processa os eventos da janela
+                key = cv2.waitKey(1) & 0xFF
+                if key == ord('q') or key == 27:  # 'q' ou ESC
+                    logger.info("Usuário solicitou fechamento da aplicação")
+                    if self.on_quit:
+                        self.on_quit()
+                    break
+            except Exception as e:
+                logger.error(f"Erro na thread de exibição: {e}")
+
+        try:
+            cv2.destroyWindow(self.window_name)
+        except Exception:
+            pass
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Anel de frames em memória compartilhada para consumidores em outros processos.
+
+O processo de captura publica cada frame em um de N slots de tamanho fixo;
+leitores (gravador, preview, um segundo modelo...) se anexam pelo nome, sem
+abrir a câmera e sem poder atrasar ou derrubar a inferência: o produtor
+nunca espera por eles.
+
+Layout do segmento (/dev/shm/<nome>):
+    [0, 4096)            cabeçalho (magic, slots, bytes por slot, último seq publicado, pid)
+    [4096, ...)          metadados por slot (SLOT_DTYPE)
+    [..., fim)           dados dos slots, `slot_bytes` cada
+
+Cada slot guarda o seq em dois campos: `begin` é escrito antes dos pixels e
+`end` depois. Um leitor só aceita o slot se `end` for o seq pedido antes da
+leitura e `begin` continuar igual depois; se o produtor deu a volta no anel
+no meio da cópia, o frame é descartado e contado como sobrescrito. Os
+metadados (forma, tamanho) só são usados depois de conferir `begin` outra
+vez, e uma forma incoerente também conta como sobrescrito, nunca como erro.
+
+Ordem de memória: o protocolo pressupõe que as escritas do produtor ficam
+visíveis para o leitor na ordem em que foram feitas, como no x86. As
+atribuições do numpy não emitem barreira, e no aarch64 (a placa alvo) o
+leitor pode ver o `end` novo antes de todos os pixels. Lá, um frame rasgado
+pode raramente passar na verificação. Use o anel para gravação, preview e
+análise, que toleram isso, e não para decisões de rejeição.
+
+Uso como leitor (estatísticas e gravação opcional):
+    python3 src/frame_ring.py potato-frames --seconds 30 --record saida.avi
+"""
+
+import argparse
+import collections
+import logging
+import os
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'POTRING1'
+HEADER_SIZE = 4096
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('slots', '<u8'),
+    ('slot_bytes', '<u8'),
+    ('head', '<u8'),          # seq do último frame publicado (0 = nenhum)
+    ('producer_pid', '<u8'),
+])
+
+SLOT_DTYPE = np.dtype([
+    ('begin', '<u8'),
+    ('end', '<u8'),
+    ('timestamp', '<f8'),
+    ('height', '<u4'),
+    ('width', '<u4'),
+    ('channels', '<u4'),
+    ('nbytes', '<u4'),
+])
+
+# Frame lido do anel (mesmos campos de frame_source.Frame)
+RingFrame = collections.namedtuple('RingFrame', ['image', 'timestamp', 'seq'])
+
+
+def _segment_size(slots, slot_bytes):
+    return HEADER_SIZE + slots * SLOT_DTYPE.itemsize + slots * slot_bytes
+
+
+class _RingView:
+    """Arrays numpy sobre o buffer do segmento (comum a produtor e leitor)"""
+
+    def _map(self, shm):
+        self._shm = shm
+        self.header = np.ndarray((), dtype=HEADER_DTYPE, buffer=shm.buf, offset=0)
+        if bytes(self.header['magic']) != MAGIC:
+            raise ValueError(f"Segmento '{shm.name}' não é um anel de frames")
+        self.slots = int(self.header['slots'])
+        self.slot_bytes = int(self.header['slot_bytes'])
+        self.meta = np.ndarray((self.slots,), dtype=SLOT_DTYPE, buffer=shm.buf, offset=HEADER_SIZE)
+        self.data = np.ndarray((self.slots, self.slot_bytes), dtype=np.uint8, buffer=shm.buf,
+                               offset=HEADER_SIZE + self.slots * SLOT_DTYPE.itemsize)
+
+    def _unmap(self):
+        # As views precisam sair de cena antes do close do SharedMemory
+        self.header = self.meta = self.data = None
+        self._shm.close()
+
+
+class FrameRingWriter(_RingView):
+    """Lado da captura: cria o segmento e publica frames sem nunca bloquear.
+
+    O segmento é criado no primeiro `publish`, com slots do tamanho do frame
+    (ou `slot_bytes`, se informado); frames maiores que o slot são ignorados.
+    """
+
+    def __init__(self, name, slots=4, slot_bytes=0):
+        self.name = name
+        self.requested_slots = max(int(slots), 2)
+        self.requested_slot_bytes = int(slot_bytes)
+        self._shm = None
+        self.published = 0
+        self.oversized = 0
+
+    def _create(self, slot_bytes):
+        size = _segment_size(self.requested_slots, slot_bytes)
+        try:
+            shm = shared_memory.SharedMemory(self.name, create=True, size=size)
+        except FileExistsError:
+            # Segmento de uma execução anterior que não terminou limpa
+            stale = shared_memory.SharedMemory(self.name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(self.name, create=True, size=size)
+
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=shm.buf, offset=0)
+        header['magic'] = MAGIC
+        header['slots'] = self.requested_slots
+        header['slot_bytes'] = slot_bytes
+        header['head'] = 0
+        header['producer_pid'] = os.getpid()
+        del header
+        self._map(shm)
+        self.meta[:] = 0
+        logger.info(f"🔁 Anel de frames '/dev/shm/{self.name}': {self.slots} slots de "
+                    f"{slot_bytes / 1024:.0f}KB")
+
+    def publish(self, frame):
+        """Copia `frame` (Frame da fonte) para o próximo slot e avança o `head`"""
+        image = frame.image
+        if self._shm is None:
+            self._create(self.requested_slot_bytes or image.nbytes)
+        if image.nbytes > self.slot_bytes:
+            if not self.oversized:
+                logger.warning(f"Frame de {image.nbytes} bytes não cabe no slot de {self.slot_bytes} bytes - ignorado")
+            self.oversized += 1
+            return False
+
+        seq = frame.seq
+        meta = self.meta[seq % self.slots]
+        meta['begin'] = seq
+        height, width = image.shape[:2]
+        channels = image.shape[2] if image.ndim == 3 else 1
+        self.data[seq % self.slots, :image.nbytes].reshape(image.shape)[...] = image
+        meta['timestamp'] = frame.timestamp
+        meta['height'] = height
+        meta['width'] = width
+        meta['channels'] = channels
+        meta['nbytes'] = image.nbytes
+        meta['end'] = seq
+        self.header['head'] = seq
+        self.published += 1
+        return True
+
+    def stats(self):
+        return {'name': self.name, 'published': self.published, 'oversized': self.oversized}
+
+    def close(self):
+        if self._shm is None:
+            return
+        self._unmap()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        self._shm = None
+
+
+class FrameRingReader(_RingView):
+    """Leitor em outro processo: anexa pelo nome e lê frames sem afetar o produtor.
+
+    `read(seq)` devolve o frame `seq` se ele ainda estiver no anel. Com
+    `copy=False` a imagem é uma view dos slots (sem cópia): o chamador deve
+    conferir `is_valid(seq)` depois de usá-la, porque o produtor pode
+    sobrescrever o slot a qualquer momento.
+    """
+
+    def __init__(self, name):
+        shm = shared_memory.SharedMemory(name)
+        self.name = name
+        self._map(shm)
+        # No Python < 3.13 o resource_tracker do leitor apagaria o segmento ao sair
+        if int(self.header['producer_pid']) != os.getpid():
+            try:
+                resource_tracker.unregister(shm._name, 'shared_memory')
+            except Exception:
+                pass
+        self.last_seq = 0
+        self.received = 0
+        self.overwritten = 0
+        self.skipped = 0
+
+    @property
+    def head(self):
+        return int(self.header['head'])
+
+    def is_valid(self, seq):
+        """O slot de `seq` ainda não começou a ser sobrescrito"""
+        return int(self.meta[seq % self.slots]['begin']) == seq
+
+    def read(self, seq, copy=True):
+        """Frame `seq` ou None se ainda não publicado ou já sobrescrito"""
+        if seq <= 0:
+            return None
+        meta = self.meta[seq % self.slots]
+        if int(meta['end']) != seq:
+            return None
+        shape = (int(meta['height']), int(meta['width']), int(meta['channels']))
+        timestamp = float(meta['timestamp'])
+        nbytes = int(meta['nbytes'])
+        # O produtor pode ter dado a volta enquanto os metadados eram lidos: não usá-los
+        if not self.is_valid(seq):
+            self.overwritten += 1
+            return None
+        try:
+            image = self.data[seq % self.slots, :nbytes].reshape(shape)
+            if copy:
+                image = image.copy()
+        except ValueError:
+            # Metadados de frames diferentes (escrita em andamento)
+            self.overwritten += 1
+            return None
+        if not self.is_valid(seq):
+            self.overwritten += 1
+            return None
+        return RingFrame(image, timestamp, seq)
+
+    def next(self, timeout=1.0, latest=False, copy=True, poll_interval=0.002):
+        """Próximo frame depois do último lido (ou o mais recente, com `latest`).
+
+        Espera por polling até `timeout`; frames que saíram do anel antes de
+        serem lidos são contados em `skipped`.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            head = self.head
+            oldest = max(head - self.slots + 1, self.last_seq + 1, 1)
+            # Slot sobrescrito durante a leitura: segue para o seguinte, ainda disponível
+            for seq in ([head] if latest else range(oldest, head + 1)):
+                frame = self.read(seq, copy=copy)
+                if frame is not None:
+                    if self.last_seq:
+                        self.skipped += seq - self.last_seq - 1
+                    self.last_seq = seq
+                    self.received += 1
+                    return frame
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'head': self.head,
+            'received': self.received,
+            'skipped': self.skipped,
+            'overwritten': self.overwritten,
+            'producer_pid': int(self.header['producer_pid']),
+        }
+
+    def close(self):
+        if self.header is not None:
+            self._unmap()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Leitor do anel de frames em memória compartilhada")
+    parser.add_argument('name', help="nome do segmento (FRAME_RING_NAME)")
+    parser.add_argument('--seconds', type=float, default=10.0, help="duração da leitura")
+    parser.add_argument('--latest', action='store_true', help="sempre o frame mais recente (pula atrasados)")
+    parser.add_argument('--record', default='', help="grava os frames lidos em um vídeo (MJPG)")
+    parser.add_argument('--fps', type=float, default=15.0, help="fps do vídeo gravado")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        reader = FrameRingReader(args.name)
+    except (FileNotFoundError, ValueError) as e:
+        logger.error(f"❌ Anel de frames indisponível: {e}")
+        return 1
+
+    writer = None
+    start = time.monotonic()
+    try:
+        while time.monotonic() - start < args.seconds:
+            frame = reader.next(timeout=1.0, latest=args.latest)
+            if frame is None:
+                logger.warning("Nenhum frame novo em 1s")
+                continue
+            if args.record:
+                import cv2
+                if writer is None:
+                    writer = cv2.VideoWriter(args.record, cv2.VideoWriter.fourcc(*'MJPG'), args.fps,
+                                             (frame.image.shape[1], frame.image.shape[0]))
+                writer.write(frame.image)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if writer is not None:
+            writer.release()
+
+    elapsed = time.monotonic() - start
+    stats = reader.stats()
+    print(f"{stats['received']} frames em {elapsed:.1f}s ({stats['received'] / elapsed:.1f} fps) | "
+          f"pulados {stats['skipped']} | sobrescritos durante a leitura {stats['overwritten']}")
+    reader.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,491 @@
+import collections
+import glob
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Frame entregue por uma fonte: imagem BGR, instante da captura (time.time()) e sequência
+Frame = collections.namedtuple('Frame', ['image', 'timestamp', 'seq'])
+
+# Registro de fontes de frames: nome -> classe
+FRAME_SOURCES = {}
+
+
+def register_source(name):
+    """Registra uma implementação de FrameSource sob `name` (valor de FRAME_SOURCE)"""
+    def wrapper(cls):
+        cls.source_name = name
+        FRAME_SOURCES[name] = cls
+        return cls
+    return wrapper
+
+
+def create_frame_source(name, **options):
+    """Instancia a fonte registrada como `name` com as opções informadas"""
+    try:
+        cls = FRAME_SOURCES[name]
+    except KeyError:
+        raise ValueError(f"Fonte de frames desconhecida: {name!r} (disponíveis: {sorted(FRAME_SOURCES)})")
+    return cls(**options)
+
+
+class FrameSource:
+    """Contrato comum das fontes de captura.
+
+        open()   -> bool       abre o dispositivo/arquivo (pode ser chamado de novo após close)
+        read()   -> Frame|None frame mais recente com timestamp e sequência; None em falha
+        stats()  -> dict       contadores de frames, falhas e taxa medida
+        close()                libera o recurso (idempotente)
+
+    Subclasses implementam `_open`, `_grab` e `_close` (e `_capture_time`, se o
+    dispositivo informa quando capturou); numeração, timestamp e
+    estatísticas ficam aqui, iguais para todas as fontes. `index` identifica a
+    câmera para configurações por câmera (ex.: ROI_CAM<índice>).
+    """
+
+    source_name = None
+
+    def __init__(self):
+        self.index = 0
+        self.is_open = False
+        self.seq = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_timestamp = 0.0
+        self.capture_age_s = 0.0
+        self._opened_at = 0.0
+        self._frames_since_open = 0
+
+    def open(self):
+        if self.is_open:
+            return True
+        self.is_open = bool(self._open())
+        if self.is_open:
+            self._opened_at = time.monotonic()
+            self._frames_since_open = 0
+            self.consecutive_failures = 0
+        return self.is_open
+
+    def read(self):
+        if not self.is_open:
+            return None
+        image = self._grab()
+        if image is None:
+            self.failures += 1
+            self.consecutive_failures += 1
+            return None
+        self.consecutive_failures = 0
+        self.seq += 1
+        self._frames_since_open += 1
+        now = time.time()
+        self.last_timestamp = self._capture_time(now)
+        self.capture_age_s = now - self.last_timestamp
+        return Frame(image, self.last_timestamp, self.seq)
+
+    def stats(self):
+        elapsed = time.monotonic() - self._opened_at if self.is_open else 0.0
+        return {
+            'source': self.source_name,
+            'open': self.is_open,
+            'frames': self.seq,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'fps': self._frames_since_open / elapsed if elapsed > 0 else 0.0,
+            'last_timestamp': self.last_timestamp,
+            'capture_age_ms': self.capture_age_s * 1000,
+        }
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            self._close()
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _grab(self):
+        raise NotImplementedError
+
+    def _capture_time(self, now):
+        """Instante da captura do último `_grab` (time.time()); sem timestamp do dispositivo, `now`"""
+        return now
+
+    def _close(self):
+        pass
+
+
+class _PacedSource(FrameSource):
+    """Base de fontes sem relógio próprio: limita a entrega a `fps` (0 = sem limite)"""
+
+    def __init__(self, fps=0.0):
+        super().__init__()
+        self.period = 1.0 / fps if fps and fps > 0 else 0.0
+        self._next_frame = 0.0
+
+    def _pace(self):
+        if not self.period:
+            return
+        now = time.monotonic()
+        if now < self._next_frame:
+            time.sleep(self._next_frame - now)
+        self._next_frame = max(self._next_frame + self.period, time.monotonic())
+
+
+@register_source('v4l2')
+class V4L2Source(FrameSource):
+    """Câmera USB (UVC) via OpenCV/V4L2, testando os índices em ordem até um capturar.
+
+    O timestamp do frame é o do buffer V4L2 (CLOCK_MONOTONIC, o mesmo de
+    `time.monotonic()`), convertido para time.time(); se o driver não o
+    fornecer ou ele for incoerente, vale o retorno do read.
+    """
+
+    # Idade máxima aceita para o timestamp do buffer (acima disso é outro relógio)
+    MAX_BUFFER_AGE_S = 1.0
+
+    def __init__(self, indices=(2, 0, 1, 3, 4), width=640, height=480, fps=30, mjpeg=True):
+        super().__init__()
+        self.indices = list(indices)
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.mjpeg = mjpeg
+        self.cap = None
+
+    def _open(self):
+        for camera_index in self.indices:
+            try:
+                logger.info(f"Testando câmera no índice {camera_index}...")
+                cap = cv2.VideoCapture(camera_index, cv2.CAP_V4L2)
+
+                if not cap.isOpened():
+                    logger.warning(f"Não foi possível abrir câmera no índice {camera_index}")
+                    continue
+
+                # Configurar resolução e formato
+                cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+                cap.set(cv2.CAP_PROP_FPS, self.fps)
+                if self.mjpeg:
+                    try:
+                        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter.fourcc('M', 'J', 'P', 'G'))
+                    except Exception:
+                        logger.info("MJPEG não suportado, usando formato padrão")
+
+                # Testar captura
+                ret, frame = cap.read()
+                if ret and frame is not None:
+                    logger.info(f"✅ Câmera USB inicializada no índice {camera_index}")
+                    logger.info(f"Resolução: {frame.shape[1]}x{frame.shape[0]}")
+                    self.cap = cap
+                    self.index = camera_index
+                    return True
+                cap.release()
+                logger.warning(f"Câmera {camera_index} não conseguiu capturar frame")
+
+            except Exception as e:
+                logger.warning(f"Erro ao testar câmera {camera_index}: {e}")
+        return False
+
+    def _grab(self):
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def _capture_time(self, now):
+        try:
+            buffer_ms = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+        except Exception:
+            return now
+        age = time.monotonic() - buffer_ms / 1000
+        if buffer_ms <= 0 or not 0 <= age < self.MAX_BUFFER_AGE_S:
+            return now
+        return now - age
+
+    def _close(self):
+        self.cap.release()
+        self.cap = None
+
+
+@register_source('file')
+class FileSource(_PacedSource):
+    """Vídeo ou diretório de imagens, repetido em loop (`loop=False` encerra no fim)"""
+
+    IMAGE_EXTENSIONS = ('jpg', 'jpeg', 'png', 'bmp')
+
+    def __init__(self, path, fps=0.0, loop=True):
+        super().__init__(fps)
+        self.path = path
+        self.loop = loop
+        self._video = None
+        self._images = []
+        self._position = 0
+
+    def _open(self):
+        if os.path.isdir(self.path):
+            self._images = sorted(p for ext in self.IMAGE_EXTENSIONS
+                                  for p in glob.glob(os.path.join(self.path, f'*.{ext}')))
+            if not self._images:
+                logger.warning(f"Nenhuma imagem em {self.path}")
+                return False
+            self._position = 0
+            return True
+        self._video = cv2.VideoCapture(self.path)
+        if not self._video.isOpened():
+            logger.warning(f"Não foi possível abrir {self.path}")
+            self._video = None
+            return False
+        return True
+
+    def _grab(self):
+        self._pace()
+        if self._images:
+            if self._position >= len(self._images):
+                if not self.loop:
+                    self.close()
+                    return None
+                self._position = 0
+            path = self._images[self._position]
+            self._position += 1
+            return cv2.imread(path)
+
+        ret, frame = self._video.read()
+        if not ret and self.loop:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._video.read()
+        if not ret and not self.loop:
+            self.close()
+        return frame if ret else None
+
+    def _close(self):
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+        self._images = []
+
+
+@register_source('synthetic')
+class SyntheticSource(_PacedSource):
+    """Ruído determinístico em ciclo de `variants` frames; para testes sem hardware"""
+
+    def __init__(self, width=640, height=480, fps=0.0, variants=8, seed=0):
+        super().__init__(fps)
+        self.width = width
+        self.height = height
+        self.variants = max(int(variants), 1)
+        self.seed = seed
+        self._frames = []
+
+    def _open(self):
+        rng = np.random.RandomState(self.seed)
+        self._frames = [rng.randint(0, 256, size=(self.height, self.width, 3)).astype(np.uint8)
+                        for _ in range(self.variants)]
+        return True
+
+    def _grab(self):
+        self._pace()
+        return self._frames[self.seq % self.variants]
+
+    def _close(self):
+        self._frames = []
+
+
+@register_source('basler')
+class BaslerSource(FrameSource):
+    """Câmera industrial Basler via pypylon (dependência opcional, importada no `open`).
+
+    - `GrabStrategy_LatestImageOnly`: a câmera sobrescreve o buffer pendente,
+      então `read` sempre devolve a imagem mais recente, sem fila acumulada.
+    - Formato de pixel escolhido na câmera, em ordem de preferência: BGR8 é o
+      que o pipeline consome (o InputWriter faz BGR->RGB direto no tensor);
+      Bayer é convertido no host; Mono8 (ex.: emulador) vira BGR.
+    - Em BGR8 o frame é uma view do buffer do pylon (sem cópia). O buffer só
+      volta ao pylon `hold_frames` leituras depois, ou seja, quando o loop já
+      terminou de processar o frame; consumidores que guardam frames por mais
+      tempo (exibição, preview, captura) devem copiá-los. Se ainda houver uma
+      view viva nessa hora, o buffer fica retido (`late_releases`) e só é
+      devolvido quando a última view deixar de existir.
+    - `emulated=True` usa o emulador de câmera do pylon (PYLON_CAMEMU).
+    """
+
+    PIXEL_FORMATS = ('BGR8', 'BayerRG8', 'BayerBG8', 'BayerGB8', 'BayerGR8', 'Mono8')
+    BAYER_TO_BGR = {
+        'BayerRG8': cv2.COLOR_BayerRG2BGR,
+        'BayerBG8': cv2.COLOR_BayerBG2BGR,
+        'BayerGB8': cv2.COLOR_BayerGB2BGR,
+        'BayerGR8': cv2.COLOR_BayerGR2BGR,
+    }
+
+    def __init__(self, serial=None, pixel_formats=None, exposure_us=None, gain=None,
+                 width=0, height=0, timeout_ms=1000, hold_frames=2, emulated=False):
+        super().__init__()
+        self.serial = serial or None
+        self.pixel_formats = list(pixel_formats or self.PIXEL_FORMATS)
+        self.exposure_us = exposure_us
+        self.gain = gain
+        self.width = width
+        self.height = height
+        self.timeout_ms = timeout_ms
+        self.hold_frames = max(int(hold_frames), 1)
+        self.emulated = emulated
+        self.pixel_format = None
+        self.camera = None
+        self.skipped_images = 0
+        self.late_releases = 0
+        self._pylon = None
+        self._held = collections.deque()
+        self._lingering = []
+
+    def _set_feature(self, names, value):
+        """Ajusta o primeiro nó existente em `names` (nomes variam entre USB3 e GigE)"""
+        for name in names:
+            node = getattr(self.camera, name, None)
+            if node is None:
+                continue
+            try:
+                node.Value = value
+                return True
+            except Exception as e:
+                logger.warning(f"Basler: não foi possível ajustar {name}={value}: {e}")
+                return False
+        logger.warning(f"Basler: nenhum dos parâmetros {names} existe nesta câmera")
+        return False
+
+    def _open(self):
+        if self.emulated:
+            os.environ.setdefault('PYLON_CAMEMU', '1')
+        try:
+            from pypylon import pylon
+        except ImportError as e:
+            logger.error(f"pypylon não disponível: {e}")
+            return False
+        self._pylon = pylon
+
+        try:
+            factory = pylon.TlFactory.GetInstance()
+            devices = factory.EnumerateDevices()
+            if self.serial:
+                devices = [d for d in devices if d.GetSerialNumber() == self.serial]
+            if not devices:
+                logger.warning(f"Nenhuma câmera Basler encontrada{f' com serial {self.serial}' if self.serial else ''}")
+                return False
+
+            device = devices[0]
+            self.camera = pylon.InstantCamera(factory.CreateDevice(device))
+            self.camera.Open()
+            self.index = device.GetSerialNumber()
+
+            available = set(self.camera.PixelFormat.Symbolics)
+            self.pixel_format = next((f for f in self.pixel_formats if f in available), None)
+            if self.pixel_format is None:
+                logger.error(f"Basler: nenhum formato suportado entre {self.pixel_formats} (câmera: {sorted(available)})")
+                self.camera.Close()
+                return False
+            self.camera.PixelFormat.Value = self.pixel_format
+
+            if self.width:
+                self._set_feature(['Width'], int(self.width))
+            if self.height:
+                self._set_feature(['Height'], int(self.height))
+            if self.exposure_us:
+                self._set_feature(['ExposureTime', 'ExposureTimeAbs'], float(self.exposure_us))
+            if self.gain is not None:
+                self._set_feature(['Gain', 'GainRaw'], self.gain)
+
+            # Buffers retidos pelo pipeline + um sendo preenchido + folga
+            self.camera.MaxNumBuffer.Value = self.hold_frames + 2
+            self.camera.StartGrabbing(pylon.GrabStrategy_LatestImageOnly)
+        except Exception as e:
+            logger.error(f"Erro ao abrir câmera Basler: {e}")
+            if self.camera is not None:
+                self.camera.Close()
+                self.camera = None
+            return False
+
+        logger.info(f"✅ Câmera Basler {device.GetModelName()} ({self.index}) aberta em {self.pixel_format}"
+                    f"{' [emulador]' if self.emulated else ''}")
+        return True
+
+    def _try_release(self, context, result):
+        """Devolve o buffer ao pylon se nenhuma view ainda o referencia"""
+        try:
+            context.__exit__(None, None, None)
+        except RuntimeError:
+            return False
+        result.Release()
+        return True
+
+    def _release_oldest(self):
+        context, result = self._held.popleft()
+        if not self._try_release(context, result):
+            # Algum consumidor ainda referencia a view: devolver o buffer agora o
+            # deixaria ser sobrescrito pela câmera. Fica retido até a view sumir.
+            self.late_releases += 1
+            self._lingering.append((context, result))
+            if len(self._lingering) == 1:
+                logger.warning("Basler: frame ainda referenciado ao ser liberado - buffer retido até a view sumir")
+
+    def _release_lingering(self):
+        self._lingering = [held for held in self._lingering if not self._try_release(*held)]
+
+    def _grab(self):
+        if self._lingering:
+            self._release_lingering()
+        while len(self._held) >= self.hold_frames:
+            self._release_oldest()
+
+        try:
+            result = self.camera.RetrieveResult(self.timeout_ms, self._pylon.TimeoutHandling_Return)
+        except Exception as e:
+            logger.warning(f"Basler: erro ao capturar: {e}")
+            return None
+        if result is None or not result.IsValid():
+            return None
+        if not result.GrabSucceeded():
+            logger.debug(f"Basler: captura falhou: {result.GetErrorDescription()}")
+            result.Release()
+            return None
+
+        self.skipped_images += result.GetNumberOfSkippedImages()
+
+        if self.pixel_format == 'BGR8':
+            context = result.GetArrayZeroCopy()
+            image = context.__enter__()
+            self._held.append((context, result))
+            return image
+
+        # Bayer/Mono: a conversão já cria um array próprio; o buffer volta na hora
+        raw = result.GetArray()
+        result.Release()
+        if self.pixel_format == 'Mono8':
+            return cv2.cvtColor(raw, cv2.COLOR_GRAY2BGR)
+        return cv2.cvtColor(raw, self.BAYER_TO_BGR[self.pixel_format])
+
+    def stats(self):
+        stats = super().stats()
+        stats.update({
+            'pixel_format': self.pixel_format,
+            'skipped_images': self.skipped_images,
+            'late_releases': self.late_releases,
+            'lingering_buffers': len(self._lingering),
+        })
+        return stats
+
+    def _close(self):
+        while self._held:
+            self._release_oldest()
+        self._release_lingering()
+        if self._lingering:
+            # Os resultados continuam referenciados aqui: o pylon só libera o buffer
+            # quando o resultado é liberado, então as views seguem válidas
+            logger.warning(f"Basler: {len(self._lingering)} buffer(s) ainda referenciado(s) ao fechar")
+        try:
+            self.camera.StopGrabbing()
+            self.camera.Close()
+        except Exception as e:
+            logger.warning(f"Erro ao fechar câmera Basler: {e}")
+        self.camera = None
@@ -0,0 +1,215 @@
+import atexit
+import collections
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+# Campos estruturados ficam em record.fields (passados via `extra`)
+FIELDS_ATTR = 'fields'
+
+
+def log_event(logger, level, event, **fields):
+    """Registro estruturado `event chave=valor ...` para o caminho quente.
+
+    Nada é formatado na thread que chama: os campos seguem como dicionário
+    até o listener. Sem o nível habilitado, custa só o `isEnabledFor`.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={FIELDS_ATTR: fields})
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return f"{value:.3f}".rstrip('0').rstrip('.') or '0'
+    text = str(value)
+    if not text or any(c in text for c in ' ="\n'):
+        return '"' + text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+    return text
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Formatter da aplicação: registros de `log_event` saem como `event k=v k=v` (logfmt)
+    e registros liberados pelo limitador informam quantos iguais foram suprimidos"""
+
+    def formatMessage(self, record):
+        fields = getattr(record, FIELDS_ATTR, None)
+        if fields:
+            pairs = ' '.join(f"{key}={_format_value(value)}" for key, value in fields.items())
+            record.message = f"{record.message} {pairs}"
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            record.message += f" (+{suppressed} iguais suprimidas)"
+        return super().formatMessage(record)
+
+
+class RateLimitFilter(logging.Filter):
+    """Deixa passar a mesma mensagem no máximo uma vez a cada `interval` segundos.
+
+    A chave é (logger, nível, mensagem); em registros estruturados, só os
+    campos de texto entram na chave (números são medidas, como seq ou ms).
+    A próxima ocorrência liberada informa quantas foram suprimidas; `flush`
+    relata as que ficaram pendentes.
+    """
+
+    def __init__(self, interval=10.0, max_keys=1024):
+        super().__init__()
+        self.interval = interval
+        self.max_keys = max_keys
+        self._entries = collections.OrderedDict()  # chave -> [liberada em, suprimidas]
+        self._lock = threading.Lock()
+        self.suppressed_total = 0
+
+    def _key(self, record):
+        fields = getattr(record, FIELDS_ATTR, None)
+        if fields:
+            identity = tuple((k, v) for k, v in fields.items() if isinstance(v, str))
+            return record.name, record.levelno, record.msg, identity
+        return record.name, record.levelno, record.getMessage()
+
+    def filter(self, record):
+        if self.interval <= 0:
+            return True
+        key = self._key(record)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.interval:
+                entry[1] += 1
+                self.suppressed_total += 1
+                return False
+            suppressed = entry[1] if entry else 0
+            self._entries[key] = [now, 0]
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    def flush(self, logger):
+        """Relata mensagens com ocorrências suprimidas ainda não informadas"""
+        with self._lock:
+            pending = [(key, entry[1]) for key, entry in self._entries.items() if entry[1]]
+            for key, _ in pending:
+                self._entries[key][1] = 0
+        for key, count in pending:
+            logger.log(key[1], f"{count} ocorrências suprimidas de: {key[2]}")
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que nunca bloqueia nem formata na thread que loga.
+
+    A fila é do mesmo processo, então o registro vai intacto (o listener
+    formata). Fila cheia descarta o registro e conta; o total aparece no
+    próximo registro que couber.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._dropped_reported = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            if self.dropped != self._dropped_reported:
+                lost = self.dropped - self._dropped_reported
+                notice = logging.LogRecord(record.name, logging.WARNING, __file__, 0,
+                                           f"⚠️ Fila de log cheia: {lost} registros descartados", None, None)
+                self.queue.put_nowait(notice)
+                self._dropped_reported = self.dropped
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _StderrHandler(logging.StreamHandler):
+    """Escreve no sys.stderr do momento (pode ter sido trocado depois da configuração, ex.: pytest)"""
+
+    def __init__(self):
+        super().__init__(sys.stderr)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class LogRouting:
+    """Estado do logging assíncrono (handler da fila, listener e limitador)"""
+
+    def __init__(self, handler, listener, rate_limit, output):
+        self.handler = handler
+        self.listener = listener
+        self.rate_limit = rate_limit
+        self.output = output
+
+    def stats(self):
+        return {
+            'queued': self.handler.queue.qsize(),
+            'dropped': self.handler.dropped,
+            'suppressed': self.rate_limit.suppressed_total,
+        }
+
+    def stop(self):
+        """Relata suprimidas, esvazia a fila e para o listener"""
+        if self.listener is None:
+            return
+        self.rate_limit.flush(logging.getLogger(__name__))
+        self.listener.stop()
+        self.listener = None
+
+
+_routing = None
+
+
+def setup_logging(level=logging.INFO, fmt='%(asctime)s - %(levelname)s - %(message)s',
+                  queue_size=10000, rate_limit_s=10.0, stream=None):
+    """Passa o logger raiz para uma fila atendida por uma thread de escrita.
+
+    As threads da aplicação só enfileiram; a escrita em stderr acontece no
+    QueueListener. Substitui handlers já configurados (ex.: `basicConfig`).
+    Chamadas seguintes devolvem a mesma configuração.
+    """
+    global _routing
+    if _routing is not None:
+        return _routing
+
+    output = logging.StreamHandler(stream) if stream is not None else _StderrHandler()
+    output.setFormatter(KeyValueFormatter(fmt))
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    handler = NonBlockingQueueHandler(log_queue)
+    rate_limit = RateLimitFilter(rate_limit_s)
+    handler.addFilter(rate_limit)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    _routing = LogRouting(handler, listener, rate_limit, output)
+    atexit.register(shutdown_logging)
+    return _routing
+
+
+def shutdown_logging():
+    """Para o listener (mensagens pendentes são escritas antes); depois disso o log volta a ser síncrono"""
+    global _routing
+    if _routing is not None:
+        _routing.stop()
+        root = logging.getLogger()
+        root.removeHandler(_routing.handler)
+        root.addHandler(_routing.output)
+        _routing = None
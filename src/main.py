@@ -45,44 +45,239 @@ except ImportError:
     tflite = tf_full.lite
     USING_TFLITE_RUNTIME = False
 
+try:
+    if USING_TFLITE_RUNTIME:
+        import tflite_runtime
+        TFLITE_VERSION = tflite_runtime.__version__
+    else:
+        TFLITE_VERSION = tf_full.__version__
+except AttributeError:
+    TFLITE_VERSION = 'unknown'
+
 from plc import Plc
+from decoders import create_decoder, apply_nms
+from roi import RegionOfInterest
+from frame_source import create_frame_source
+from frame_ring import FrameRingWriter
+from capture_watchdog import CaptureWatchdog
+from preprocessing import InputWriter
+from pipeline import InferencePipeline
+from model_swap import ModelCandidate, ModelSwapper
+from cascade import InferenceCascade
+from profiler import FrameProfiler
+from control import RuntimeSettings, ControlServer
+from delegate_cache import DelegateCache
+from delegate_chain import DelegateChain, parse_chain
+from display import DisplayWorker
+from preview_server import PreviewServer
+from detection_log import DetectionLog
+from dataset_capture import DatasetCapture
+from reject_scheduler import RejectScheduler
+from realtime import (IdleGc, LatencyReport, apply_thread_policy, housekeeping_cpus, parse_cpu_list,
+                      set_housekeeping_cpus)
+from log_setup import log_event, setup_logging
 
 # --- Lógica de Caminhos Absolutos ---
 script_dir = os.path.dirname(os.path.abspath(__file__))
 base_dir = os.path.dirname(script_dir)
 
+# Cache persistente de capacidade dos delegates e do grafo compilado pelo VX
+NPU_CACHE_DIR = os.getenv('NPU_CACHE_DIR', os.path.join(base_dir, 'data', 'cache'))
+NPU_CACHE_RESET = os.getenv('NPU_CACHE_RESET', '0') == '1'
+# Falha/crash registrado volta a ser tentado após N boots pulados ou T segundos (dobra a cada falha repetida)
+NPU_CACHE_RETRY_BOOTS = int(os.getenv('NPU_CACHE_RETRY_BOOTS', '5'))
+NPU_CACHE_RETRY_S = float(os.getenv('NPU_CACHE_RETRY_S', '86400'))
+
+# Cadeia ordenada de delegates (vx, xnnpack, builtin, reference); a primeira entrada validada é usada
+DELEGATE_CHAIN = os.getenv('DELEGATE_CHAIN', 'vx,xnnpack,builtin' if NPU_AVAILABLE else 'xnnpack,builtin')
+CPU_THREADS = os.getenv('CPU_THREADS', 'auto')  # 'auto' mede 1, 2, 4... e fica com o mais rápido
+DELEGATE_MAX_LATENCY_MS = float(os.getenv('DELEGATE_MAX_LATENCY_MS', '0'))  # 0 = sem limite
+DELEGATE_VALIDATION_INVOKES = int(os.getenv('DELEGATE_VALIDATION_INVOKES', '5'))
+
+# Interpretadores em alternância: pré-processa o frame N+1 enquanto o N executa (1 = sequencial)
+PIPELINE_DEPTH = int(os.getenv('PIPELINE_DEPTH', '1'))
+
+# Fonte de frames: v4l2 (câmera USB), basler (pypylon), file (vídeo/diretório de imagens) ou synthetic
+FRAME_SOURCE = os.getenv('FRAME_SOURCE', 'v4l2')
+FRAME_SOURCE_PATH = os.getenv('FRAME_SOURCE_PATH', '')
+FRAME_SOURCE_FPS = float(os.getenv('FRAME_SOURCE_FPS', '0'))  # ritmo de file/synthetic (0 = sem limite)
+CAMERA_INDICES = [int(i) for i in os.getenv('CAMERA_INDICES', '2,0,1,3,4').split(',') if i.strip()]
+CAMERA_WIDTH = int(os.getenv('CAMERA_WIDTH', '640'))
+CAMERA_HEIGHT = int(os.getenv('CAMERA_HEIGHT', '480'))
+CAMERA_FPS = int(os.getenv('CAMERA_FPS', '30'))
+
+# Watchdog da captura: reabre a câmera em segundo plano quando ela trava (0 = desabilitado)
+CAMERA_WATCHDOG = os.getenv('CAMERA_WATCHDOG', '1') == '1'
+CAMERA_STALL_TIMEOUT_S = float(os.getenv('CAMERA_STALL_TIMEOUT_S', '2.0'))  # sem frames há mais que isso = travada
+CAMERA_MAX_FAILURES = int(os.getenv('CAMERA_MAX_FAILURES', '10'))  # leituras seguidas com falha
+CAMERA_STUCK_FRAMES = int(os.getenv('CAMERA_STUCK_FRAMES', '30'))  # frames idênticos seguidos (só câmeras reais)
+CAMERA_REOPEN_BACKOFF_S = float(os.getenv('CAMERA_REOPEN_BACKOFF_S', '0.5'))
+CAMERA_REOPEN_MAX_BACKOFF_S = float(os.getenv('CAMERA_REOPEN_MAX_BACKOFF_S', '10'))
+# Estado da câmera no PLC: palavra própria no DB1, separada do telegrama de rejeição (bytes 0-3)
+CAMERA_STATUS_DB_OFFSET = int(os.getenv('CAMERA_STATUS_DB_OFFSET', '-1'))  # ex.: 4 = bytes 4-5 (-1 = não envia)
+CAMERA_DEGRADED_VALUE = int(os.getenv('CAMERA_DEGRADED_VALUE', '3'))  # câmera travada (0 = câmera ok)
+CAMERA_DEGRADED_REPORT_S = float(os.getenv('CAMERA_DEGRADED_REPORT_S', '1.0'))
+CAMERA_STATUS_REPORT = CAMERA_WATCHDOG and CAMERA_STATUS_DB_OFFSET >= 0
+
+# Anel de frames em memória compartilhada para leitores em outros processos (vazio = desabilitado)
+FRAME_RING_NAME = os.getenv('FRAME_RING_NAME', '')
+FRAME_RING_SLOTS = int(os.getenv('FRAME_RING_SLOTS', '4'))
+
+# Câmera Basler (FRAME_SOURCE=basler)
+BASLER_SERIAL = os.getenv('BASLER_SERIAL', '')
+BASLER_PIXEL_FORMATS = [f.strip() for f in os.getenv('BASLER_PIXEL_FORMATS', '').split(',') if f.strip()]
+BASLER_EXPOSURE_US = float(os.getenv('BASLER_EXPOSURE_US', '0'))
+BASLER_GAIN = os.getenv('BASLER_GAIN', '')
+BASLER_WIDTH = int(os.getenv('BASLER_WIDTH', '0'))
+BASLER_HEIGHT = int(os.getenv('BASLER_HEIGHT', '0'))
+BASLER_EMULATED = os.getenv('BASLER_EMULATED', '0') == '1'
+
+# Taxa máxima de atualização da janela (Hz), independente da inferência
+DISPLAY_REFRESH_HZ = float(os.getenv('DISPLAY_REFRESH_HZ', '15'))
+
+# Preview MJPEG via HTTP para unidades headless (0 = desabilitado)
+PREVIEW_PORT = int(os.getenv('PREVIEW_PORT', '0'))
+PREVIEW_FPS = float(os.getenv('PREVIEW_FPS', '5'))
+PREVIEW_WIDTH = int(os.getenv('PREVIEW_WIDTH', '640'))
+PREVIEW_QUALITY = int(os.getenv('PREVIEW_QUALITY', '70'))
+
+# Log binário de detecções (vazio = desabilitado)
+DETECTION_LOG_PATH = os.getenv('DETECTION_LOG_PATH', os.path.join(base_dir, 'data', 'logs', 'detections.bin'))
+DETECTION_LOG_CAPACITY = int(os.getenv('DETECTION_LOG_CAPACITY', '500000'))
+DETECTION_LOG_FLUSH_S = float(os.getenv('DETECTION_LOG_FLUSH_S', '1.0'))
+
+# Captura de frames para re-treino (vazio = desabilitado)
+CAPTURE_DIR = os.getenv('CAPTURE_DIR', '')
+CAPTURE_CLASSES = [c.strip() for c in os.getenv('CAPTURE_CLASSES', 'NOK,PEDRA').split(',') if c.strip()]
+CAPTURE_SCORE_BAND = os.getenv('CAPTURE_SCORE_BAND', '')  # ex.: "0.5,0.6" (detecções incertas)
+CAPTURE_SAMPLE_RATE = float(os.getenv('CAPTURE_SAMPLE_RATE', '0'))
+CAPTURE_MAX_MB = float(os.getenv('CAPTURE_MAX_MB', '2048'))
+CAPTURE_MAX_FILES = int(os.getenv('CAPTURE_MAX_FILES', '0'))
+CAPTURE_WORKERS = int(os.getenv('CAPTURE_WORKERS', '2'))
+CAPTURE_QUEUE = int(os.getenv('CAPTURE_QUEUE', '16'))
+
+# PLC (0 = sem cliente PLC; a conexão só é aberta se houver rejeição ou estado da câmera a enviar)
+PLC_ENABLED = os.getenv('PLC_ENABLED', '1') == '1'
+
+# Rejeição compensada pela latência: instante de chegada ao ejetor a partir do timestamp de captura
+REJECT_BELT_SPEED_MM_S = float(os.getenv('REJECT_BELT_SPEED_MM_S', '0'))  # 0 = desabilitada
+REJECT_EJECTOR_DISTANCE_MM = float(os.getenv('REJECT_EJECTOR_DISTANCE_MM', '0'))  # centro do frame -> ejetor
+REJECT_MM_PER_PX = float(os.getenv('REJECT_MM_PER_PX', '0'))  # 0 = ignora a posição do objeto no frame
+REJECT_BELT_DIRECTION = os.getenv('REJECT_BELT_DIRECTION', 'down')  # sentido do movimento na imagem
+REJECT_CAMERA_LATENCY_MS = float(os.getenv('REJECT_CAMERA_LATENCY_MS', '0'))  # exposição -> timestamp do frame
+REJECT_ACTUATION_MS = float(os.getenv('REJECT_ACTUATION_MS', '0'))  # escrita no PLC -> ejetor atuando
+REJECT_PULSE_MS = float(os.getenv('REJECT_PULSE_MS', '50'))
+REJECT_MERGE_MS = float(os.getenv('REJECT_MERGE_MS', '60'))
+REJECT_MODE = os.getenv('REJECT_MODE', 'scheduler')  # scheduler (temporiza aqui) ou telegram (temporiza no PLC)
+
+# Modo tempo real (opt-in): afinidade de CPU, prioridade e GC só nos intervalos ociosos
+REALTIME_MODE = os.getenv('REALTIME_MODE', '0').strip().lower() in ('1', 'true', 'yes', 'on')
+REALTIME_LOOP_CPUS = parse_cpu_list(os.getenv('REALTIME_LOOP_CPUS', ''))  # captura + inferência (ex.: "2,3")
+REALTIME_INFERENCE_CPUS = parse_cpu_list(os.getenv('REALTIME_INFERENCE_CPUS', ''))  # threads do pipeline
+REALTIME_PLC_CPUS = parse_cpu_list(os.getenv('REALTIME_PLC_CPUS', ''))  # agendador de rejeição / PLC
+REALTIME_PRIORITY = int(os.getenv('REALTIME_PRIORITY', '10'))  # SCHED_FIFO (0 = só nice)
+REALTIME_NICE = int(os.getenv('REALTIME_NICE', '-10'))  # usado quando SCHED_FIFO não é permitido
+LATENCY_REPORT_S = float(os.getenv('LATENCY_REPORT_S', '60'))
+
+# Troca de modelo a quente: arquivo .tflite ou diretório observado (vazio = só via POST /model)
+MODEL_WATCH_PATH = os.getenv('MODEL_WATCH_PATH', '')
+MODEL_WATCH_POLL_S = float(os.getenv('MODEL_WATCH_POLL_S', '2'))
+MODEL_WATCH_SETTLE_S = float(os.getenv('MODEL_WATCH_SETTLE_S', '1'))  # arquivo estável por este tempo antes da carga
+
+# API local de controle de parâmetros em execução (0 = desabilitada)
+CONTROL_PORT = int(os.getenv('CONTROL_PORT', '0'))
+CONTROL_HOST = os.getenv('CONTROL_HOST', '127.0.0.1')
+
+# Parâmetros ajustáveis em execução: nome -> (tipo, mínimo, máximo)
+RUNTIME_SETTINGS_SPEC = {
+    'confidence_threshold': (float, 0.0, 1.0),
+    'iou_threshold': (float, 0.0, 1.0),
+    'frame_skip': (int, 0, 30),
+    'max_detections': (int, 0, 1000),
+    'display_refresh_hz': (float, 0.5, 60.0),
+    'preview_fps': (float, 0.5, 30.0),
+    'cascade_threshold': (float, 0.0, 1.0),
+}
+
+# Cascata: modelo leve decide quando rodar o detector completo (vazio = desabilitada)
+CASCADE_MODEL = os.getenv('CASCADE_MODEL', '')
+CASCADE_LABELS = os.getenv('CASCADE_LABELS', '')
+CASCADE_TRIGGER_CLASSES = [c.strip() for c in os.getenv('CASCADE_TRIGGER_CLASSES', 'NOK,PEDRA').split(',') if c.strip()]
+CASCADE_THRESHOLD = float(os.getenv('CASCADE_THRESHOLD', '0.25'))
+CASCADE_MIN_INTERVAL = int(os.getenv('CASCADE_MIN_INTERVAL', '10'))
+
+# Perfilamento sob demanda (SIGUSR1 ou POST /profile na API de controle)
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(base_dir, 'data', 'profiles'))
+PROFILE_FRAMES = int(os.getenv('PROFILE_FRAMES', '100'))
+PROFILE_SAMPLE_HZ = float(os.getenv('PROFILE_SAMPLE_HZ', '200'))
+
+# Aquecimento do interpretador antes do loop da câmera
+WARMUP_MIN_ITERATIONS = int(os.getenv('WARMUP_MIN_ITERATIONS', '5'))
+WARMUP_MAX_ITERATIONS = int(os.getenv('WARMUP_MAX_ITERATIONS', '50'))
+WARMUP_WINDOW = int(os.getenv('WARMUP_WINDOW', '5'))
+WARMUP_TOLERANCE = float(os.getenv('WARMUP_TOLERANCE', '0.15'))
+
 # --- Configuração do Logging ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Threads da aplicação só enfileiram; a escrita em stderr fica com a thread do QueueListener
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))  # cheia = registros descartados e contados
+LOG_RATE_LIMIT_S = float(os.getenv('LOG_RATE_LIMIT_S', '10'))  # mesma mensagem no máximo 1x por intervalo (0 = sem limite)
+log_routing = setup_logging(getattr(logging, LOG_LEVEL, logging.INFO), queue_size=LOG_QUEUE_SIZE,
+                            rate_limit_s=LOG_RATE_LIMIT_S)
 logger = logging.getLogger(__name__)
 
-def supressao_nao_maxima(boxes, scores, iou_threshold):
-    """Aplica Supressão Não-Máxima (NMS) para remover caixas sobrepostas."""
-    if len(boxes) == 0:
-        return []
-    x1 = boxes[:, 0]
-    y1 = boxes[:, 1]
-    x2 = boxes[:, 2]
-    y2 = boxes[:, 3]
-    areas = (x2 - x1) * (y2 - y1)
-    order = scores.argsort()[::-1]
-    keep = []
-    while order.size > 0:
-        i = order[0]
-        keep.append(i)
-        xx1 = np.maximum(x1[i], x1[order[1:]])
-        yy1 = np.maximum(y1[i], y1[order[1:]])
-        xx2 = np.minimum(x2[i], x2[order[1:]])
-        yy2 = np.minimum(y2[i], y2[order[1:]])
-        w = np.maximum(0.0, xx2 - xx1)
-        h = np.maximum(0.0, yy2 - yy1)
-        intersection = w * h
-        iou = intersection / (areas[i] + areas[order[1:]] - intersection)
-        inds = np.where(iou <= iou_threshold)[0]
-        order = order[inds + 1]
-    return keep
+def frame_source_options(name):
+    """Opções da fonte de frames `name` a partir das variáveis de ambiente"""
+    if name == 'v4l2':
+        return {'indices': CAMERA_INDICES, 'width': CAMERA_WIDTH, 'height': CAMERA_HEIGHT, 'fps': CAMERA_FPS}
+    if name == 'file':
+        return {'path': FRAME_SOURCE_PATH, 'fps': FRAME_SOURCE_FPS}
+    if name == 'synthetic':
+        return {'width': CAMERA_WIDTH, 'height': CAMERA_HEIGHT, 'fps': FRAME_SOURCE_FPS}
+    if name == 'basler':
+        return {
+            'serial': BASLER_SERIAL,
+            'pixel_formats': BASLER_PIXEL_FORMATS or None,
+            'exposure_us': BASLER_EXPOSURE_US or None,
+            'gain': float(BASLER_GAIN) if BASLER_GAIN else None,
+            'width': BASLER_WIDTH,
+            'height': BASLER_HEIGHT,
+            'emulated': BASLER_EMULATED,
+            # Com o pipeline, até PIPELINE_DEPTH frames ainda referenciam buffers do pylon
+            'hold_frames': max(PIPELINE_DEPTH, 1) + 1,
+        }
+    return {}
+
+def create_capture_watchdog(name, source, open_source, stuck_frames=None):
+    """Watchdog da fonte `name` com a configuração do ambiente.
+
+    Frames idênticos só indicam travamento em câmeras reais (arquivo e
+    sintético podem repetir imagens), a menos que `stuck_frames` seja informado.
+    """
+    if stuck_frames is None:
+        stuck_frames = CAMERA_STUCK_FRAMES if name in ('v4l2', 'basler') else 0
+    return CaptureWatchdog(
+        source,
+        open_source,
+        stall_timeout_s=CAMERA_STALL_TIMEOUT_S,
+        max_failures=CAMERA_MAX_FAILURES,
+        stuck_frames=stuck_frames,
+        backoff_s=CAMERA_REOPEN_BACKOFF_S,
+        max_backoff_s=CAMERA_REOPEN_MAX_BACKOFF_S
+    )
+
+def latencia_estabilizada(latencias, janela, tolerancia):
+    """Indica se as últimas `janela` latências variam menos que `tolerancia` (relativo à mediana)."""
+    if janela <= 0 or len(latencias) < janela:
+        return False
+    recentes = sorted(latencias[-janela:])
+    mediana = recentes[len(recentes) // 2]
+    if mediana <= 0:
+        return True
+    return (recentes[-1] - recentes[0]) / mediana <= tolerancia
 
 class VisionSystem:
-    def __init__(self, root=None):
+    def __init__(self, root=None, plc=None):
         self.root = root
         # Para OpenCV puro, não depender do parâmetro root para determinar GUI
         self.headless = HEADLESS_MODE
@@ -91,6 +286,10 @@ class VisionSystem:
         # Variáveis para OpenCV GUI
         self.window_name = "Conecsa - Vision System"
         self.should_quit = False
+        self.display = None
+        self.preview = None
+        # Consumidores do frame anotado (janela local, preview HTTP)
+        self.frame_sinks = []
 
         logger.info("Iniciando a inicialização do VisionSystem...")
         logger.info(f"Modo headless: {self.headless}")
@@ -98,10 +297,25 @@ class VisionSystem:
         logger.info(f"GUI disponível: {GUI_AVAILABLE}")
 
         # --- Configurações de Detecção ---
-        self.CONFIDENCE_THRESHOLD = 0.5
-        self.IOU_THRESHOLD = 0.45
+        self.CONFIDENCE_THRESHOLD = float(os.getenv('CONFIDENCE_THRESHOLD', '0.5'))
+        self.IOU_THRESHOLD = float(os.getenv('IOU_THRESHOLD', '0.45'))
+        self.FRAME_SKIP = int(os.getenv('FRAME_SKIP', '0'))  # frames descartados entre inferências
+        self.MAX_DETECTIONS = int(os.getenv('MAX_DETECTIONS', '0'))  # 0 = sem limite
         self.CAMERA_INDEX = 2
         
+        # --- Parâmetros ajustáveis em execução (aplicados na fronteira entre frames) ---
+        self.settings = RuntimeSettings(RUNTIME_SETTINGS_SPEC, {
+            'confidence_threshold': self.CONFIDENCE_THRESHOLD,
+            'iou_threshold': self.IOU_THRESHOLD,
+            'frame_skip': self.FRAME_SKIP,
+            'max_detections': self.MAX_DETECTIONS,
+            'display_refresh_hz': DISPLAY_REFRESH_HZ,
+            'preview_fps': PREVIEW_FPS,
+            'cascade_threshold': CASCADE_THRESHOLD,
+        })
+        self.control_server = None
+        self.profiler = FrameProfiler(PROFILE_DIR, frames=PROFILE_FRAMES, sample_hz=PROFILE_SAMPLE_HZ)
+        
         # --- Configurações do Sistema ---
         self.colors = {'OK': (0, 255, 0), 'NOK': (0, 0, 255), 'PEDRA': (255, 0, 0)}
         self.class_priority = {'PEDRA': 3, 'NOK': 2, 'OK': 1}
@@ -111,56 +325,140 @@ class VisionSystem:
         self.camera = None
         self.interpreter = None
         self.input_details = None
+        self.input_writer = None
         self.output_details = None
+        self.decoder = None
+        self.delegate_chain = None
+        self.delegate_choice = None
+        self.model_path = None
+        self.pipeline = None
+        self.model_swapper = None
+        self.roi = None
+        self.cascade = None
         self.input_height = 0
         self.input_width = 0
         self.labels = []
+        self.warmup_stats = None
+        self.frame_seq = 0
+        # Tempos (s) do último frame processado, por etapa
+        self.frame_timings = {'capture': 0.0, 'inference': 0.0, 'processing': 0.0, 'total': 0.0}
+        self.detection_log = None
+        self.dataset_capture = None
+        self.frame_ring = None
+        self.reject_scheduler = None
+        self.idle_gc = None
+        self.latency_report = LatencyReport(
+            'tempo real ligado' if REALTIME_MODE else 'tempo real desligado', LATENCY_REPORT_S
+        )
+        self._frame_period = 0.0
+        self._last_read_start = 0.0
+        self._camera_degraded_reported = 0.0
         
-        # --- Inicializar PLC com resiliência ---
-        try:
-            self.plc = Plc()
-            logger.info("✅ PLC inicializado")
-        except Exception as e:
-            logger.warning(f"Erro ao inicializar PLC - aplicação continuará sem PLC: {e}")
-            self.plc = None
+        # --- Inicializar PLC com resiliência (`plc` injetado: ex. simulado nos testes) ---
+        # A conexão só é aberta em run(), e apenas se algo for escrito no PLC
+        self.plc = plc
+        if self.plc is None and PLC_ENABLED:
+            try:
+                self.plc = Plc()
+                logger.info("✅ PLC inicializado")
+            except Exception as e:
+                logger.warning(f"Erro ao inicializar PLC - aplicação continuará sem PLC: {e}")
+                self.plc = None
+
+        # --- Cache persistente de delegates / grafo VX ---
+        self.delegate_cache = DelegateCache(NPU_CACHE_DIR, retry_after_boots=NPU_CACHE_RETRY_BOOTS,
+                                            retry_after_s=NPU_CACHE_RETRY_S)
+        if NPU_CACHE_RESET:
+            logger.info("🧹 NPU_CACHE_RESET=1 - limpando cache de delegates")
+            self.delegate_cache.clear()
 
         # --- Inicializar Modelo ---
         self._initialize_model()
 
-    def _test_delegate_safety(self):
-        """Testa se o delegate VX é seguro para usar"""
-        try:
-            logger.info("🧪 Testando segurança do delegate VX...")
-            
-            # Criar um modelo dummy para testar
-            import tempfile
-            import struct
-            
-            # Criar um modelo TFLite minimal válido para teste
-            with tempfile.NamedTemporaryFile(suffix='.tflite', delete=False) as temp_model:
-                # Este é um modelo TFLite minimal válido (apenas para teste)
-                minimal_model = bytes([0x54, 0x46, 0x4C, 0x33])  # Header TFL3
-                temp_model.write(minimal_model)
-                temp_model_path = temp_model.name
-            
+        # --- Cascata de inferência (opcional) ---
+        if CASCADE_MODEL:
             try:
-                # Tentar carregar delegate
-                delegate = tflite.load_delegate('libvx_delegate.so')
-                logger.info("✅ Delegate VX carregado para teste")
-                
-                # Cleanup
-                os.unlink(temp_model_path)
-                return True
-                
+                cascade_labels = self.labels
+                if CASCADE_LABELS and os.path.exists(CASCADE_LABELS):
+                    with open(CASCADE_LABELS, 'r') as f:
+                        cascade_labels = [line.strip() for line in f.readlines()]
+                self.cascade = InferenceCascade(
+                    tflite,
+                    CASCADE_MODEL,
+                    cascade_labels,
+                    trigger_classes=CASCADE_TRIGGER_CLASSES,
+                    threshold=self.settings.get('cascade_threshold'),
+                    min_interval=CASCADE_MIN_INTERVAL
+                )
             except Exception as e:
-                logger.warning(f"⚠️ Delegate VX falhou no teste: {e}")
-                os.unlink(temp_model_path)
-                return False
-                
-        except Exception as e:
-            logger.warning(f"⚠️ Erro no teste de segurança: {e}")
-            return False
-        
+                logger.warning(f"Cascata indisponível - detector completo em todos os frames: {e}")
+                self.cascade = None
+
+        # --- Log de detecções (auditoria) ---
+        if DETECTION_LOG_PATH:
+            try:
+                self.detection_log = DetectionLog(
+                    DETECTION_LOG_PATH,
+                    capacity=DETECTION_LOG_CAPACITY,
+                    flush_interval=DETECTION_LOG_FLUSH_S,
+                    labels=self.labels
+                )
+                self.detection_log.set_labels(self.labels)
+            except Exception as e:
+                logger.warning(f"Log de detecções indisponível - aplicação continuará sem log: {e}")
+                self.detection_log = None
+
+        # --- Captura de frames para dataset ---
+        if CAPTURE_DIR:
+            try:
+                score_band = None
+                if CAPTURE_SCORE_BAND:
+                    lo, hi = (float(v) for v in CAPTURE_SCORE_BAND.split(','))
+                    score_band = (lo, hi)
+                self.dataset_capture = DatasetCapture(
+                    CAPTURE_DIR,
+                    self.labels,
+                    classes=CAPTURE_CLASSES,
+                    score_band=score_band,
+                    sample_rate=CAPTURE_SAMPLE_RATE,
+                    workers=CAPTURE_WORKERS,
+                    queue_size=CAPTURE_QUEUE,
+                    max_bytes=int(CAPTURE_MAX_MB * 1024 ** 2),
+                    max_files=CAPTURE_MAX_FILES
+                )
+            except Exception as e:
+                logger.warning(f"Captura de dataset indisponível: {e}")
+                self.dataset_capture = None
+
+        # --- Agendamento de rejeição pela chegada ao ejetor ---
+        if REJECT_BELT_SPEED_MM_S > 0:
+            try:
+                self.reject_scheduler = RejectScheduler(
+                    self._send_reject,
+                    REJECT_BELT_SPEED_MM_S,
+                    REJECT_EJECTOR_DISTANCE_MM,
+                    mm_per_px=REJECT_MM_PER_PX,
+                    belt_direction=REJECT_BELT_DIRECTION,
+                    camera_latency_ms=REJECT_CAMERA_LATENCY_MS,
+                    actuation_ms=REJECT_ACTUATION_MS,
+                    pulse_ms=REJECT_PULSE_MS,
+                    merge_ms=REJECT_MERGE_MS,
+                    reset_value=self.class_values['OK'],
+                    mode=REJECT_MODE
+                )
+            except ValueError as e:
+                logger.warning(f"Agendamento de rejeição desabilitado: {e}")
+                self.reject_scheduler = None
+
+        if CAMERA_STATUS_REPORT and CAMERA_STATUS_DB_OFFSET < 4:
+            logger.warning(f"CAMERA_STATUS_DB_OFFSET={CAMERA_STATUS_DB_OFFSET} sobrepõe o telegrama de rejeição "
+                           f"(DB1, bytes 0-3)")
+
+    def _connect_plc(self) -> None:
+        """Conecta ao PLC em segundo plano quando há o que escrever nele (rejeição e/ou estado da câmera)"""
+        if self.plc and (self.reject_scheduler or CAMERA_STATUS_REPORT):
+            self.plc.connect_in_background()
+
     def _initialize_model(self):
         """Inicializar modelo TensorFlow Lite"""
         logger.info("🧠 Carregando modelo TensorFlow Lite...")
@@ -190,59 +488,21 @@ class VisionSystem:
             raise FileNotFoundError("Nenhum modelo válido encontrado")
 
         try:
-            # Estratégia simplificada: testar disponibilidade do delegate primeiro
-            use_delegate = False
-            
-            if NPU_AVAILABLE and not DISABLE_DELEGATES:
-                logger.info("🚀 Verificando disponibilidade do delegate VX...")
-                
-                # Primeiro, verificar se conseguimos importar o delegate sem erro
-                try:
-                    # Teste mais simples e seguro
-                    import ctypes
-                    
-                    # Tentar carregar a biblioteca diretamente
-                    lib_path = 'libvx_delegate.so'
-                    lib = ctypes.CDLL(lib_path)
-                    logger.info("✅ Biblioteca VX delegate encontrada e carregável")
-                    
-                    # Se chegou até aqui, tentar usar o delegate
-                    logger.info("🔧 Carregando modelo com delegate VX...")
-                    delegate = tflite.load_delegate(lib_path)
-                    self.interpreter = tflite.Interpreter(
-                        model_path=primary_model,
-                        experimental_delegates=[delegate]
-                    )
-                    use_delegate = True
-                    logger.info("✅ Modelo configurado com delegate VX")
-                    
-                except Exception as delegate_error:
-                    logger.warning(f"⚠️ Delegate VX não disponível: {delegate_error}")
-                    use_delegate = False
-            elif DISABLE_DELEGATES:
-                logger.info("🚫 Delegates desabilitados via DISABLE_DELEGATES=1")
-            
-            # Se delegate não funcionou ou NPU não disponível, usar CPU
-            if not use_delegate:
-                logger.info("� Carregando modelo na CPU...")
-                self.interpreter = tflite.Interpreter(model_path=primary_model)
-            
-            # Alocar tensors (para ambos os casos)
-            logger.info("🧠 Alocando tensors...")
-            self.interpreter.allocate_tensors()
-            
-            if use_delegate:
-                logger.info("✅ Modelo carregado com sucesso usando delegate VX")
-            else:
-                logger.info("✅ Modelo carregado com sucesso na CPU")
-                
+            delegate_chain = self._create_delegate_chain()
+            logger.info(f"🔗 Cadeia de delegates: {' -> '.join(delegate_chain.chain)}")
+            self.interpreter = delegate_chain.select(primary_model)
+            self.delegate_chain = delegate_chain
+            self.delegate_choice = delegate_chain.choice
+            self.model_path = primary_model
         except Exception as e:
             logger.error(f"❌ Erro crítico ao carregar modelo: {e}")
             raise e
 
         # Obter detalhes do modelo
         self.input_details = self.interpreter.get_input_details()[0]
-        self.output_details = self.interpreter.get_output_details()[0]
+        self.output_details = self.interpreter.get_output_details()
+        self.input_writer = InputWriter(self.interpreter, self.input_details)
+        self.decoder = create_decoder(self.interpreter)
         self.input_height = self.input_details['shape'][1]
         self.input_width = self.input_details['shape'][2]
         
@@ -257,68 +517,430 @@ class VisionSystem:
             logger.warning("Arquivo de labels não encontrado, usando labels padrão")
             self.labels = ['OK', 'NOK', 'PEDRA']
 
+    def _create_delegate_chain(self):
+        """DelegateChain configurada pelo ambiente (carga inicial e troca a quente)"""
+        chain = parse_chain(DELEGATE_CHAIN)
+        if DISABLE_DELEGATES and 'vx' in chain:
+            logger.info("🚫 Delegate VX desabilitado via DISABLE_DELEGATES=1")
+            chain.remove('vx')
+        return DelegateChain(
+            tflite,
+            chain,
+            num_threads=CPU_THREADS,
+            max_latency_ms=DELEGATE_MAX_LATENCY_MS,
+            validation_invokes=DELEGATE_VALIDATION_INVOKES,
+            delegate_cache=self.delegate_cache,
+            runtime_version=TFLITE_VERSION
+        )
+
+    def _prepare_model(self, model_path) -> ModelCandidate:
+        """Carrega `model_path` fora do loop (thread do ModelSwapper), com as réplicas do pipeline"""
+        # Carga e compilação não devem disputar CPU com a inferência em curso
+        apply_thread_policy('carga de modelo', REALTIME_PLC_CPUS if REALTIME_MODE else None, nice=10)
+        chain = self._create_delegate_chain()
+        interpreter = chain.select(model_path)
+        replicas = chain.replicate(model_path, self.pipeline.depth - 1) if self.pipeline else []
+        return ModelCandidate(model_path, [interpreter] + replicas, create_decoder(interpreter),
+                              extra={'chain': chain})
+
+    def _swap_model(self, candidate) -> None:
+        """Troca para o modelo já carregado e aquecido (entre dois frames)"""
+        start = time.perf_counter()
+        if self.pipeline:
+            # Frames já submetidos terminam no modelo antigo: nenhum frame é perdido
+            self._handle_pipeline_results(self.pipeline.drain())
+            old_pipeline, self.pipeline = self.pipeline, InferencePipeline(candidate.interpreters)
+            old_pipeline.close()
+            if REALTIME_MODE:
+                self._apply_pipeline_thread_policy()
+
+        self.interpreter = candidate.interpreters[0]
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()
+        self.input_writer = InputWriter(self.interpreter, self.input_details)
+        self.decoder = candidate.decoder
+        self.input_height = self.input_details['shape'][1]
+        self.input_width = self.input_details['shape'][2]
+        self.delegate_chain = candidate.extra['chain']
+        self.delegate_choice = self.delegate_chain.choice
+        self.model_path = candidate.path
+        # O interpretador antigo é liberado aqui (última referência era do loop)
+        self.model_swapper.committed(candidate, (time.perf_counter() - start) * 1000)
+
+    def _init_model_swapper(self) -> None:
+        """Troca de modelo a quente, pela API (POST /model) e/ou observando MODEL_WATCH_PATH"""
+        if not (MODEL_WATCH_PATH or CONTROL_PORT):
+            return
+        self.model_swapper = ModelSwapper(
+            self._prepare_model,
+            self.model_path,
+            self.decoder,
+            watch_path=MODEL_WATCH_PATH,
+            poll_s=MODEL_WATCH_POLL_S,
+            settle_s=MODEL_WATCH_SETTLE_S,
+            warmup_invokes=WARMUP_MIN_ITERATIONS
+        )
+
+    def _model_action(self, params) -> dict:
+        """Ação da API de controle: carrega `path` (relativo a data/models) e troca a quente; sem `path`, estado.
+
+        O caminho é resolvido (inclusive links simbólicos e `..`) e recusado se
+        cair fora de data/models: a API não carrega arquivos arbitrários.
+        """
+        if not self.model_swapper:
+            raise ValueError("troca de modelo indisponível (modelo ainda não carregado)")
+        path = params.get('path')
+        if not path:
+            return self.model_swapper.status()
+        models_dir = os.path.realpath(os.path.join(base_dir, 'data', 'models'))
+        path = os.path.realpath(os.path.join(models_dir, path))
+        if os.path.commonpath([models_dir, path]) != models_dir:
+            raise ValueError(f"modelo fora de {models_dir}: {params.get('path')}")
+        return self.model_swapper.request(path)
+
+    def warm_up(self) -> dict:
+        """Executa invokes sintéticos até a latência estabilizar.
+
+        O primeiro invoke após `allocate_tensors` (principalmente com delegate)
+        é muito mais lento que os seguintes; ele é medido separadamente para
+        que o primeiro frame real já rode em regime permanente.
+        """
+        logger.info("🔥 Aquecendo interpretador com entradas sintéticas...")
+        shape = self.input_details['shape']
+        dtype = self.input_details['dtype']
+        if dtype == np.uint8 or dtype == np.int8:
+            info = np.iinfo(dtype)
+            synthetic = np.random.randint(info.min, info.max + 1, size=shape).astype(dtype)
+        else:
+            synthetic = np.random.random_sample(shape).astype(dtype)
+
+        latencies = []
+        stable = False
+        for _ in range(max(WARMUP_MAX_ITERATIONS, 1)):
+            start_time = time.perf_counter()
+            self.interpreter.set_tensor(self.input_details['index'], synthetic)
+            self.interpreter.invoke()
+            latencies.append(time.perf_counter() - start_time)
+
+            steady = latencies[1:]
+            if len(steady) >= WARMUP_MIN_ITERATIONS and latencia_estabilizada(steady, WARMUP_WINDOW, WARMUP_TOLERANCE):
+                stable = True
+                break
+
+        steady = sorted(latencies[1:]) or latencies
+        self.warmup_stats = {
+            'first_ms': latencies[0] * 1000,
+            'steady_ms': steady[len(steady) // 2] * 1000,
+            'iterations': len(latencies),
+            'stable': stable,
+        }
+
+        logger.info(f"🔥 Primeiro invoke: {self.warmup_stats['first_ms']:.1f}ms | "
+                    f"regime permanente: {self.warmup_stats['steady_ms']:.1f}ms "
+                    f"({self.warmup_stats['iterations']} invokes)")
+        if not stable:
+            logger.warning(f"⚠️ Latência não estabilizou em {WARMUP_MAX_ITERATIONS} invokes - iniciando mesmo assim")
+        return self.warmup_stats
+
     def init_camera(self) -> bool:
-        """Inicializar câmera USB usando OpenCV."""
-        logger.info("📷 Inicializando câmera...")
-        
-        # Lista de índices de câmera para tentar
-        camera_indices = [2, 0, 1, 3, 4]
-        
-        for camera_index in camera_indices:
-            try:
-                logger.info(f"Testando câmera no índice {camera_index}...")
-                cap = cv2.VideoCapture(camera_index, cv2.CAP_V4L2)
-                
-                if cap.isOpened():
-                    # Configurar resolução e formato
-                    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                    cap.set(cv2.CAP_PROP_FPS, 30)
-                    
-                    # Tentar configurar formato MJPEG
-                    try:
-                        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter.fourcc('M', 'J', 'P', 'G'))
-                    except:
-                        logger.info("MJPEG não suportado, usando formato padrão")
-                    
-                    # Testar captura
-                    ret, frame = cap.read()
-                    if ret and frame is not None:
-                        logger.info(f"✅ Câmera USB inicializada no índice {camera_index}")
-                        logger.info(f"Resolução: {frame.shape[1]}x{frame.shape[0]}")
-                        self.camera = cap
-                        self.CAMERA_INDEX = camera_index
-                        
-                        # Configurar janela se GUI disponível
-                        if self.use_opencv_gui:
-                            cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
-                            
-                            # Verificar modo de exibição da janela
-                            fullscreen_mode = os.getenv('FULLSCREEN_MODE', '1') == '1'
-                            
-                            if fullscreen_mode:
-                                # Modo tela cheia
-                                cv2.setWindowProperty(self.window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
-                                logger.info("🖥️  Janela configurada para TELA CHEIA")
-                            else:
-                                # Modo janela centralizada
-                                cv2.resizeWindow(self.window_name, 1024, 768)
-                                cv2.moveWindow(self.window_name, 100, 50)
-                                logger.info("🖥️  Janela configurada para modo CENTRALIZADO (1024x768)")
-                        
-                        return True
-                    else:
-                        cap.release()
-                        logger.warning(f"Câmera {camera_index} não conseguiu capturar frame")
-                else:
-                    logger.warning(f"Não foi possível abrir câmera no índice {camera_index}")
-                    
-            except Exception as e:
-                logger.warning(f"Erro ao testar câmera {camera_index}: {e}")
+        """Abre a fonte de frames configurada em FRAME_SOURCE (por padrão, câmera USB via V4L2)."""
+        logger.info(f"📷 Inicializando fonte de frames '{FRAME_SOURCE}'...")
+        try:
+            source = self._open_frame_source()
+        except Exception as e:
+            logger.error(f"❌ Erro ao criar fonte de frames '{FRAME_SOURCE}': {e}")
+            return False
+
+        if source is None:
+            logger.error("❌ Nenhuma câmera funcional encontrada")
+            return False
+
+        if CAMERA_WATCHDOG:
+            # Reabertura usa a mesma descoberta (índices V4L2, serial Basler...)
+            source = create_capture_watchdog(FRAME_SOURCE, source, self._open_frame_source)
+        self.camera = source
+        self.CAMERA_INDEX = source.index
+
+        # Frames publicados em memória compartilhada (gravador, preview etc. em outros processos)
+        if FRAME_RING_NAME:
+            self.frame_ring = FrameRingWriter(FRAME_RING_NAME, slots=FRAME_RING_SLOTS)
+
+        # Região de interesse da esteira (por câmera)
+        try:
+            self.roi = RegionOfInterest.from_env(source.index)
+            if self.roi:
+                frame = source.read()
+                if frame is not None:
+                    self.roi.prepare(frame.image.shape[1], frame.image.shape[0])
+        except ValueError as e:
+            logger.warning(f"ROI ignorada: {e}")
+            self.roi = None
+
+        # Configurar thread de exibição se GUI disponível
+        if self.use_opencv_gui:
+            self.display = DisplayWorker(
+                self.window_name,
+                self.colors,
+                refresh_hz=self.settings.get('display_refresh_hz'),
+                fullscreen=os.getenv('FULLSCREEN_MODE', '1') == '1',
+                on_quit=self.request_quit
+            )
+            self.display.start()
+            self.frame_sinks.append(self.display)
+
+        return True
+
+    def _open_frame_source(self):
+        """Cria e abre a fonte de FRAME_SOURCE; None se nenhuma câmera abriu"""
+        source = create_frame_source(FRAME_SOURCE, **frame_source_options(FRAME_SOURCE))
+        return source if source.open() else None
+
+    def _report_camera_state(self, degraded) -> None:
+        """Estado da câmera no PLC (DB1, CAMERA_STATUS_DB_OFFSET): CAMERA_DEGRADED_VALUE repetido enquanto
+        travada, 0 quando volta"""
+        now = time.monotonic()
+        if degraded:
+            if now - self._camera_degraded_reported < CAMERA_DEGRADED_REPORT_S:
+                return
+            self._camera_degraded_reported = now
+            value = CAMERA_DEGRADED_VALUE
+            log_event(logger, logging.WARNING, 'camera_degraded', reason=self.camera.last_reason,
+                      degraded_s=self.camera.degraded_for())
+        else:
+            self._camera_degraded_reported = 0.0
+            value = 0
+        if self.plc and CAMERA_STATUS_REPORT:
+            self.plc.write_db(value, start=CAMERA_STATUS_DB_OFFSET)
+
+    def _init_pipeline(self) -> None:
+        """Cria os interpretadores extras do modo em alternância (PIPELINE_DEPTH > 1)"""
+        if PIPELINE_DEPTH <= 1:
+            return
+        if self.roi or self.cascade:
+            # ROI (vários recortes por frame) e cascata dependem do resultado do próprio frame
+            logger.info("⏩ PIPELINE_DEPTH ignorado com ROI ou cascata - execução sequencial")
+            return
+        try:
+            replicas = self.delegate_chain.replicate(self.model_path, PIPELINE_DEPTH - 1)
+            self.pipeline = InferencePipeline([self.interpreter] + replicas)
+        except Exception as e:
+            logger.warning(f"Pipeline de inferência indisponível - execução sequencial: {e}")
+            self.pipeline = None
+
+    def enter_realtime(self) -> None:
+        """Modo tempo real: fixa e prioriza as threads críticas e congela o GC (chamar após inicializar)"""
+        if not REALTIME_MODE:
+            return
+        logger.info("⚙️  Modo tempo real habilitado")
+        # Threads auxiliares criadas depois daqui (reabertura da câmera, reconexão do PLC, handlers
+        # HTTP) herdariam SCHED_FIFO e os núcleos de quem as cria: voltam para estas CPUs
+        housekeeping = housekeeping_cpus(REALTIME_LOOP_CPUS | REALTIME_INFERENCE_CPUS | REALTIME_PLC_CPUS)
+        set_housekeeping_cpus(housekeeping)
+        logger.info(f"⚙️  Threads auxiliares: SCHED_OTHER nas CPUs {sorted(housekeeping)}")
+        apply_thread_policy('loop de captura/inferência', REALTIME_LOOP_CPUS, REALTIME_PRIORITY, REALTIME_NICE)
+        self._apply_pipeline_thread_policy()
+        if self.reject_scheduler:
+            apply_thread_policy('agendador de rejeição', REALTIME_PLC_CPUS, REALTIME_PRIORITY, REALTIME_NICE,
+                                native_id=self.reject_scheduler.thread.native_id)
+        plc_thread = getattr(self.plc, 'connection_thread', None)
+        if plc_thread and plc_thread.is_alive() and REALTIME_PLC_CPUS:
+            # Reconexão não é crítica: só sai dos núcleos da inferência
+            apply_thread_policy('reconexão PLC', REALTIME_PLC_CPUS, native_id=plc_thread.native_id)
+
+        # Tudo o que a inicialização criou vai para a geração permanente
+        self.idle_gc = IdleGc()
+        self.idle_gc.freeze()
+
+    def _apply_pipeline_thread_policy(self) -> None:
+        if self.pipeline:
+            for slot in self.pipeline.slots:
+                apply_thread_policy(f'inferência {slot.number}', REALTIME_INFERENCE_CPUS or REALTIME_LOOP_CPUS,
+                                    REALTIME_PRIORITY, REALTIME_NICE, native_id=slot.thread.native_id)
+
+    def _run_inference(self, image) -> float:
+        """Redimensiona, normaliza e executa o modelo sobre `image`; retorna o tempo de invoke"""
+        # Escrita direta no tensor de entrada, sem arrays temporários por frame
+        self.input_writer.write(image)
+
+        start_time = time.time()
+        self.interpreter.invoke()
+        return time.time() - start_time
+
+    def _detect_roi(self, frame):
+        """Inferência por recorte da ROI, com caixas mapeadas de volta ao frame inteiro"""
+        parts = []
+        inference_time = 0.0
+        for lane, (crop, (ox, oy)) in enumerate(self.roi.crops(frame)):
+            crop_h, crop_w = crop.shape[:2]
+            inference_time += self._run_inference(crop)
+            boxes, scores, class_ids = self.decoder.candidates(
+                self.interpreter, crop_w, crop_h, self.CONFIDENCE_THRESHOLD
+            )
+            boxes[:, [0, 2]] += ox
+            boxes[:, [1, 3]] += oy
+            parts.append((boxes, scores, class_ids, np.full(len(scores), lane)))
+
+        boxes = np.concatenate([p[0] for p in parts])
+        scores = np.concatenate([p[1] for p in parts])
+        class_ids = np.concatenate([p[2] for p in parts])
+        lanes = np.concatenate([p[3] for p in parts])
+
+        # Descartar o que está fora do polígono antes do NMS
+        inside = self.roi.inside(boxes)
+        boxes, scores, class_ids, lanes = boxes[inside], scores[inside], class_ids[inside], lanes[inside]
+        # Objeto sobre a divisa entre faixas: uma detecção só
+        boxes, scores, class_ids = self.roi.merge_lanes(boxes, scores, class_ids, lanes)
+        if self.decoder.needs_nms or len(parts) > 1:
+            boxes, scores, class_ids = apply_nms(boxes, scores, class_ids, self.IOU_THRESHOLD)
+        return boxes, scores, class_ids, inference_time
+
+    def _handle_detections(self, frame, boxes, scores, class_ids, inference_time, read_start, frame_start) -> None:
+        """Decisão, registro e exibição das detecções de `frame` (etapas 4-7 do loop)"""
+        if self.MAX_DETECTIONS and len(scores) > self.MAX_DETECTIONS:
+            top = np.argsort(scores)[::-1][:self.MAX_DETECTIONS]
+            boxes, scores, class_ids = boxes[top], scores[top], class_ids[top]
+
+        # --- 4. Processar Resultados ---
+        highest_priority_class = None
+        highest_priority = 0
+        detections = []
+
+        for box, score, class_id in zip(boxes, scores, class_ids):
+            label = self.labels[class_id] if class_id < len(self.labels) else f'Class_{class_id}'
+            detections.append((label, float(score), tuple(int(v) for v in box)))
+
+            priority = self.class_priority.get(label, 0)
+            if priority > highest_priority:
+                highest_priority = priority
+                highest_priority_class = label
+
+        # --- 5. Registrar detecções e valor de decisão ---
+        if self.detection_log and len(class_ids):
+            plc_value = self.class_values.get(highest_priority_class, self.class_values['OK'])
+            self.detection_log.append(
+                frame.timestamp,
+                frame.seq,
+                list(zip(class_ids, scores, boxes)),
+                plc_value
+            )
+
+        if self.dataset_capture:
+            self.dataset_capture.offer(frame.image, detections, frame.seq, frame.timestamp)
+
+        # --- 6. Enviar para PLC com resiliência ---
+        if self.reject_scheduler:
+            # Cada objeto rejeitado é agendado para a sua chegada ao ejetor, a partir da captura
+            decision_time = time.perf_counter()
+            stages = {
+                'capture': frame_start - read_start,
+                'inference': inference_time,
+                'processing': decision_time - frame_start - inference_time,
+            }
+            frame_h, frame_w = frame.image.shape[:2]
+            for label, _, (x1, y1, x2, y2) in detections:
+                value = self.class_values.get(label, self.class_values['OK'])
+                if value != self.class_values['OK']:
+                    position = ((x1 + x2) / 2, (y1 + y2) / 2, frame_w, frame_h)
+                    self.reject_scheduler.submit(frame.timestamp, value, position, stages)
+            self.reject_scheduler.maybe_report()
+
+        # if self.plc:
+        #     if highest_priority_class:
+        #         # Há detecção - enviar valor da classe detectada
+        #         plc_data = self.class_values[highest_priority_class]
+        #         success = self.plc.write_db(plc_data)
+        #         if success:
+        #             logger.debug(f"✅ Enviado para PLC: {highest_priority_class} ({plc_data})")
+        #         else:
+        #             logger.debug(f"⚠️ PLC indisponível - valor não enviado: {highest_priority_class} ({plc_data})")
+        #     else:
+        #         # Não há detecção - enviar "OK" (0)
+        #         plc_data = self.class_values['OK']  # 0
+        #         success = self.plc.write_db(plc_data)
+        #         if success:
+        #             logger.debug(f"✅ Enviado para PLC: OK (sem detecções) ({plc_data})")
+        #         else:
+        #             logger.debug(f"⚠️ PLC indisponível - valor OK não enviado ({plc_data})")
+        # else:
+        #     # PLC não disponível
+        #     if highest_priority_class:
+        #         plc_data = self.class_values[highest_priority_class]
+        #         logger.debug(f"⚠️ PLC não inicializado - valor não enviado: {highest_priority_class} ({plc_data})")
+        #     else:
+        #         logger.debug(f"⚠️ PLC não inicializado - valor OK não enviado")
+
+        # --- 7. Exibir Frame (desenho e codificação nas threads consumidoras) ---
+        # Cada consumidor guarda a própria cópia: frame.image pode ser uma view do
+        # buffer da câmera, devolvido ao driver poucas leituras depois
+        if self.frame_sinks:
+            perf_text = f"Inference: {inference_time*1000:.1f}ms | Detections: {len(detections)}"
+            for sink in self.frame_sinks:
+                sink.update(frame.image, detections, perf_text)
+
+        frame_end = time.perf_counter()
+        timings = self.frame_timings
+        timings['capture'] = frame_start - read_start
+        timings['inference'] = inference_time
+        timings['processing'] = frame_end - frame_start - inference_time
+        timings['total'] = frame_end - read_start
+        self.latency_report.record(timings['total'])
+        log_event(logger, logging.DEBUG, 'frame', seq=frame.seq, detections=len(detections),
+                  capture_ms=timings['capture'] * 1000, inference_ms=inference_time * 1000,
+                  processing_ms=timings['processing'] * 1000, total_ms=timings['total'] * 1000)
+        if self.latency_report.due():
+            extra = ''
+            if self.idle_gc:
+                gc_stats = self.idle_gc.stats()
+                extra = (f" | GC por geração {gc_stats['collections']} (forçadas {gc_stats['forced']}, "
+                         f"pausa máx {gc_stats['max_pause_ms']:.1f}ms)")
+            self.latency_report.report(extra)
+
+    def _send_reject(self, value, delay_ms) -> bool:
+        """Escrita do agendador de rejeição no PLC (na thread do agendador)"""
+        if not self.plc:
+            return False
+        if REJECT_MODE == 'telegram':
+            return self.plc.write_reject(value, delay_ms)
+        return self.plc.write_db(value)
+
+    def _handle_pipeline_results(self, results) -> None:
+        """Conclui, na ordem dos frames, os resultados devolvidos pelo pipeline"""
+        for result in results:
+            if result.error is not None:
+                log_event(logger, logging.ERROR, 'frame_error', seq=result.frame.seq,
+                          error=type(result.error).__name__, detail=str(result.error))
                 continue
-        
-        logger.error("❌ Nenhuma câmera USB funcional encontrada")
-        return False
+            self._handle_detections(result.frame, result.boxes, result.scores, result.class_ids,
+                                    result.inference_time, result.read_start, result.frame_start)
+
+    def _profile_action(self, params) -> dict:
+        """Ação da API de controle: agenda o perfilamento dos próximos N frames"""
+        frames = int(params.get('frames', PROFILE_FRAMES))
+        if frames <= 0:
+            raise ValueError("frames deve ser positivo")
+        scheduled = self.profiler.request(frames)
+        return {'scheduled': scheduled, **self.profiler.status()}
+
+    def _apply_settings(self, changes) -> None:
+        """Propaga parâmetros alterados via API para os componentes (na fronteira entre frames)"""
+        if 'confidence_threshold' in changes:
+            self.CONFIDENCE_THRESHOLD = self.settings.get('confidence_threshold')
+        if 'iou_threshold' in changes:
+            self.IOU_THRESHOLD = self.settings.get('iou_threshold')
+        if 'frame_skip' in changes:
+            self.FRAME_SKIP = self.settings.get('frame_skip')
+        if 'max_detections' in changes:
+            self.MAX_DETECTIONS = self.settings.get('max_detections')
+        if 'display_refresh_hz' in changes and self.display:
+            self.display.refresh_hz = self.settings.get('display_refresh_hz')
+        if 'preview_fps' in changes and self.preview:
+            self.preview.max_fps = self.settings.get('preview_fps')
+        if 'cascade_threshold' in changes and self.cascade:
+            self.cascade.threshold = self.settings.get('cascade_threshold')
+
+    def request_quit(self) -> None:
+        """Sinaliza o fim do loop principal (chamado pela thread de exibição)"""
+        self.should_quit = True
 
     def process_frame(self) -> None:
         """Loop principal de processamento com lógica robusta de PLC."""
@@ -336,132 +958,127 @@ class VisionSystem:
 
         logger.info("Iniciando loop da câmera...")
         
-        while self.camera and self.camera.isOpened() and not self.should_quit:
+        while self.camera and self.camera.is_open and not self.should_quit:
             try:
-                ret, frame_original = self.camera.read()
-                if not ret:
-                    logger.warning('Falha ao capturar frame. Tentando novamente...')
+                if self.idle_gc:
+                    # Intervalo ocioso: folga estimada até o próximo frame da câmera
+                    self.idle_gc.idle(self._frame_period - (time.perf_counter() - self._last_read_start))
+                read_start = time.perf_counter()
+                if self._last_read_start:
+                    self._frame_period = 0.9 * self._frame_period + 0.1 * (read_start - self._last_read_start)
+                self._last_read_start = read_start
+                frame = self.camera.read()
+                if frame is None:
+                    if getattr(self.camera, 'degraded', False):
+                        self._report_camera_state(True)
+                    else:
+                        log_event(logger, logging.WARNING, 'frame_read_failed',
+                                  source=getattr(self.camera, 'source_name', None) or FRAME_SOURCE)
                     continue
+                if self._camera_degraded_reported:
+                    self._report_camera_state(False)
+                frame_start = time.perf_counter()
+                self.frame_seq = frame.seq
                 
-                frame_h, frame_w, _ = frame_original.shape
-                frame_desenhado = frame_original.copy()
-
-                # --- 1. Pré-processamento do Frame ---
-                img_resized = cv2.resize(frame_original, (self.input_width, self.input_height))
-                input_data = cv2.cvtColor(img_resized, cv2.COLOR_BGR2RGB)
+                if self.frame_ring:
+                    self.frame_ring.publish(frame)
+                
+                if self.profiler.armed:
+                    self.profiler.tick()
                 
-                # Normalizar dependendo do tipo do modelo
-                if self.input_details['dtype'] == np.uint8:  # Para modelos quantizados (INT8)
-                    input_data = np.expand_dims(input_data, axis=0)
-                else:  # Para modelos float
-                    input_data = np.expand_dims(input_data, axis=0).astype(np.float32) / 255.0
-
-                # --- 2. Executar Inferência ---
-                start_time = time.time()
-                self.interpreter.set_tensor(self.input_details['index'], input_data)
-                self.interpreter.invoke()
-                inference_time = time.time() - start_time
+                # Alterações da API de controle entram aqui, entre um frame e outro
+                changes = self.settings.apply_pending()
+                if changes:
+                    self._apply_settings(changes)
                 
-                output = self.interpreter.get_tensor(self.output_details['index'])
-                output_transposed = output.transpose(0, 2, 1)[0]
-
-                # --- 3. Pós-processamento ---
-                boxes, scores, class_ids = [], [], []
-                for row in output_transposed:
-                    confidence = np.max(row[4:])
-                    if confidence > self.CONFIDENCE_THRESHOLD:
-                        class_id = np.argmax(row[4:])
-                        scores.append(confidence)
-                        class_ids.append(class_id)
-                        
-                        cx, cy, w, h = row[:4]
-                        x1 = int((cx - w / 2) * frame_w)
-                        y1 = int((cy - h / 2) * frame_h)
-                        x2 = int((cx + w / 2) * frame_w)
-                        y2 = int((cy + h / 2) * frame_h)
-                        boxes.append([x1, y1, x2, y2])
+                # Modelo novo já carregado e aquecido em segundo plano: troca antes deste frame
+                candidate = self.model_swapper.take() if self.model_swapper else None
+                if candidate:
+                    self._swap_model(candidate)
                 
-                # --- 4. Aplicar NMS ---
-                indices_finais = supressao_nao_maxima(np.array(boxes), np.array(scores), self.IOU_THRESHOLD)
-
-                # --- 5. Processar e Desenhar Resultados ---
-                highest_priority_class = None
-                highest_priority = 0
-                detections_count = len(indices_finais)
-
-                for i in indices_finais:
-                    box = boxes[i]
-                    x1, y1, x2, y2 = box
-                    label = self.labels[class_ids[i]] if class_ids[i] < len(self.labels) else f'Class_{class_ids[i]}'
-                    score = scores[i]
-                    color = self.colors.get(label, (255, 255, 255))
-                    
-                    cv2.rectangle(frame_desenhado, (x1, y1), (x2, y2), color, 2)
-                    cv2.putText(frame_desenhado, f'{label}: {score:.2f}', (x1, y1 - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-
-                    priority = self.class_priority.get(label, 0)
-                    if priority > highest_priority:
-                        highest_priority = priority
-                        highest_priority_class = label
-
-                # Adicionar informações de performance
-                perf_text = f"Inference: {inference_time*1000:.1f}ms | Detections: {detections_count}"
-                cv2.putText(frame_desenhado, perf_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-                # --- 6. Enviar para PLC com resiliência ---
-                # if self.plc:
-                #     if highest_priority_class:
-                #         # Há detecção - enviar valor da classe detectada
-                #         plc_data = self.class_values[highest_priority_class]
-                #         success = self.plc.write_db(plc_data)
-                #         if success:
-                #             logger.debug(f"✅ Enviado para PLC: {highest_priority_class} ({plc_data})")
-                #         else:
-                #             logger.debug(f"⚠️ PLC indisponível - valor não enviado: {highest_priority_class} ({plc_data})")
-                #     else:
-                #         # Não há detecção - enviar "OK" (0)
-                #         plc_data = self.class_values['OK']  # 0
-                #         success = self.plc.write_db(plc_data)
-                #         if success:
-                #             logger.debug(f"✅ Enviado para PLC: OK (sem detecções) ({plc_data})")
-                #         else:
-                #             logger.debug(f"⚠️ PLC indisponível - valor OK não enviado ({plc_data})")
-                # else:
-                #     # PLC não disponível
-                #     if highest_priority_class:
-                #         plc_data = self.class_values[highest_priority_class]
-                #         logger.debug(f"⚠️ PLC não inicializado - valor não enviado: {highest_priority_class} ({plc_data})")
-                #     else:
-                #         logger.debug(f"⚠️ PLC não inicializado - valor OK não enviado")
-
-                # --- 7. Exibir Frame ---
-                if self.use_opencv_gui and not self.headless:
-                    cv2.imshow(self.window_name, frame_desenhado)
-                    cv2.moveWindow(self.window_name, 0, 0)
-                    
-                    # Verificar se usuário quer sair
-                    key = cv2.waitKey(1) & 0xFF
-                    if key == ord('q') or key == 27:  # 'q' ou ESC
-                        logger.info("Usuário solicitou fechamento da aplicação")
-                        self.should_quit = True
-                        break
-                # else:
-                #     # Modo headless - pausa pequena para não sobrecarregar CPU
-                #     # time.sleep(0.01)
+                if self.FRAME_SKIP and self.frame_seq % (self.FRAME_SKIP + 1):
+                    continue
+                
+                if self.pipeline:
+                    # Frame escrito no próximo interpretador livre; resultados anteriores saem em ordem
+                    self.pipeline.submit(frame, self.CONFIDENCE_THRESHOLD, self.IOU_THRESHOLD,
+                                         read_start=read_start, frame_start=frame_start)
+                    self._handle_pipeline_results(
+                        self.pipeline.collect(wait=self.pipeline.in_flight >= self.pipeline.depth)
+                    )
+                    continue
+
+                frame_original = frame.image
+                frame_h, frame_w, _ = frame_original.shape
+
+                # --- 1-3. Pré-processamento, inferência e pós-processamento ---
+                if self.cascade and not self.cascade.screen(frame_original):
+                    # Estágio 1 não viu NOK/PEDRA: detector completo não roda neste frame
+                    boxes, scores, class_ids = np.empty((0, 4), np.int32), np.empty(0, np.float32), np.empty(0, np.int32)
+                    inference_time = 0.0
+                elif self.roi:
+                    boxes, scores, class_ids, inference_time = self._detect_roi(frame_original)
+                else:
+                    inference_time = self._run_inference(frame_original)
+                    # Pós-processamento específico do formato (inclui NMS quando necessário)
+                    boxes, scores, class_ids = self.decoder.decode(
+                        self.interpreter, frame_w, frame_h, self.CONFIDENCE_THRESHOLD, self.IOU_THRESHOLD
+                    )
+                if self.cascade and inference_time:
+                    self.cascade.record_stage2(inference_time)
+                self._handle_detections(frame, boxes, scores, class_ids, inference_time, read_start, frame_start)
 
             except Exception as e:
-                logger.error(f"Erro no loop de processamento: {e}")
+                log_event(logger, logging.ERROR, 'frame_error', seq=self.frame_seq,
+                          error=type(e).__name__, detail=str(e))
                 continue
 
+        if self.pipeline:
+            # Frames já submetidos ainda são decididos e registrados
+            self._handle_pipeline_results(self.pipeline.drain())
+
         logger.info("Loop da câmera finalizado")
 
     def start(self):
         """Iniciar aplicação"""
         logger.info("🚀 Iniciando aplicação...")
         
+        # Perfilamento sob demanda via SIGUSR1
+        if threading.current_thread() is threading.main_thread():
+            self.profiler.install_signal()
+        
+        # Aquecer o modelo antes de abrir a câmera (evita frames velhos no buffer)
+        self.warm_up()
+        
+        # Preview MJPEG opcional (codifica apenas com clientes conectados)
+        if PREVIEW_PORT:
+            self.preview = PreviewServer(
+                PREVIEW_PORT,
+                self.colors,
+                max_fps=self.settings.get('preview_fps'),
+                max_width=PREVIEW_WIDTH,
+                jpeg_quality=PREVIEW_QUALITY
+            )
+            if self.preview.start():
+                self.frame_sinks.append(self.preview)
+        
+        # API local para ajuste de parâmetros sem reiniciar
+        if CONTROL_PORT:
+            self.control_server = ControlServer(
+                self.settings,
+                CONTROL_PORT,
+                host=CONTROL_HOST,
+                actions={'/profile': self._profile_action, '/model': self._model_action}
+            )
+            self.control_server.start()
+        
+        self._connect_plc()
+        
         if self.init_camera():
             logger.info("✅ Câmera inicializada com sucesso")
+            self._init_pipeline()
+            self._init_model_swapper()
+            self.enter_realtime()
             
             # Iniciar loop principal
             self.process_frame()
@@ -477,9 +1094,48 @@ class VisionSystem:
         logger.info("🧹 Limpando recursos...")
         self.should_quit = True
         
+        if self.idle_gc:
+            self.idle_gc.unfreeze()
+        
+        if self.display:
+            self.display.stop()
+        
+        if self.model_swapper:
+            self.model_swapper.stop()
+        
+        if self.pipeline:
+            self.pipeline.close()
+        
+        if self.preview:
+            self.preview.stop()
+        
+        if self.control_server:
+            self.control_server.stop()
+        
+        self.profiler.finish()
+        
+        if self.dataset_capture:
+            self.dataset_capture.close()
+        
+        if self.frame_ring:
+            self.frame_ring.close()
+        
+        if self.reject_scheduler:
+            self.reject_scheduler.close()
+        
+        logger.info(f"📝 Log: {log_routing.stats()}")
+        
+        if self.detection_log:
+            try:
+                self.detection_log.close()
+                logger.info("Log de detecções gravado.")
+            except Exception as e:
+                logger.error(f"Erro ao fechar log de detecções: {e}")
+        
         try:
-            if self.camera and self.camera.isOpened():
-                self.camera.release()
+            if self.camera and self.camera.is_open:
+                logger.info(f"Fonte de frames: {self.camera.stats()}")
+                self.camera.close()
                 logger.info("Câmera liberada com sucesso.")
         except Exception as e:
             logger.error(f"Erro ao fechar câmera: {e}")
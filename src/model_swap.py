@@ -0,0 +1,265 @@
+import glob
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ModelCandidate:
+    """Modelo carregado em segundo plano, pronto para entrar no lugar do atual.
+
+    `interpreters[0]` é o principal; os demais são as réplicas do modo em
+    alternância. `extra` guarda o que o chamador precisar para a troca (ex.:
+    a DelegateChain usada).
+    """
+
+    def __init__(self, path, interpreters, decoder, extra=None):
+        self.path = path
+        self.interpreters = list(interpreters)
+        self.decoder = decoder
+        self.extra = extra or {}
+        self.load_ms = 0.0
+        self.warm_ms = 0.0
+
+    def release(self):
+        """Descarta o candidato sem usá-lo (falha na verificação ou substituído por outro)"""
+        self.interpreters = []
+        self.decoder = None
+
+
+def check_signature(current_decoder, candidate_decoder):
+    """O novo modelo precisa sair no mesmo formato, com as mesmas formas de tensor e as mesmas classes do atual.
+
+    Atributos ausentes não contam como iguais: sem as formas de saída dos dois
+    lados não há como garantir que as classes batem (o SSD não expõe o número
+    de classes), e o candidato é recusado.
+    """
+    current_format = getattr(current_decoder, 'format_name', None)
+    candidate_format = getattr(candidate_decoder, 'format_name', None)
+    if current_format != candidate_format:
+        raise ValueError(f"formato de saída {candidate_format} diferente do atual ({current_format})")
+    current_shapes = getattr(current_decoder, 'output_shapes', None)
+    candidate_shapes = getattr(candidate_decoder, 'output_shapes', None)
+    if current_shapes is None or candidate_shapes is None:
+        raise ValueError("formas de saída desconhecidas - não é possível comparar os modelos")
+    if list(current_shapes) != list(candidate_shapes):
+        raise ValueError(f"formas de saída {list(candidate_shapes)} diferentes das atuais ({list(current_shapes)})")
+    current_classes = getattr(current_decoder, 'num_classes', None)
+    candidate_classes = getattr(candidate_decoder, 'num_classes', None)
+    if current_classes != candidate_classes:
+        raise ValueError(f"{candidate_classes} classes no novo modelo, {current_classes} no atual")
+
+
+def warm(interpreter, invokes):
+    """Invokes com entrada sintética para o novo modelo já entrar em regime"""
+    detail = interpreter.get_input_details()[0]
+    dtype = detail['dtype']
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        synthetic = np.random.randint(info.min, info.max + 1, size=detail['shape']).astype(dtype)
+    else:
+        synthetic = np.random.random_sample(detail['shape']).astype(dtype)
+    for _ in range(invokes):
+        interpreter.set_tensor(detail['index'], synthetic)
+        interpreter.invoke()
+
+
+class ModelSwapper:
+    """Troca do modelo em execução sem parar a captura.
+
+    `request(path)` (API) ou o observador de `watch_path` disparam a carga em
+    uma thread: `prepare(path)` cria e valida os interpretadores (pela cadeia
+    de delegates), os invokes de aquecimento rodam ali mesmo e a assinatura de
+    saída é comparada com a do modelo atual. Só então o candidato fica
+    disponível em `take()`, que o loop chama entre um frame e outro; depois
+    de trocar, o loop chama `committed(candidate, swap_ms)`. Falhas em
+    qualquer etapa mantêm o modelo atual.
+
+    `watch_path` pode ser um arquivo .tflite ou um diretório (o .tflite
+    alterado ou criado mais recentemente é carregado). O arquivo só é lido
+    depois de ficar `settle_s` segundos sem mudar; publique o modelo com
+    cópia para um nome temporário seguida de `mv`, porque o TFLite mapeia o
+    arquivo em uso na memória.
+    """
+
+    def __init__(self, prepare, current_path, current_decoder, watch_path='', poll_s=2.0, settle_s=1.0,
+                 warmup_invokes=5):
+        self.prepare = prepare
+        self.current_path = current_path
+        self.current_decoder = current_decoder
+        self.watch_path = watch_path
+        self.poll_s = poll_s
+        self.settle_s = settle_s
+        self.warmup_invokes = warmup_invokes
+
+        self.state = 'idle'
+        self.loading_path = None
+        self.last_error = ''
+        self.swaps = 0
+        self.last_swap = {}
+
+        self._lock = threading.Lock()
+        self._requested = None
+        self._ready = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._snapshot = self._scan() if watch_path else {}
+        self._changed = {}
+        self._loader = threading.Thread(target=self._run_loader, name='model-loader', daemon=True)
+        self._loader.start()
+        self._watcher = None
+        if watch_path:
+            self._watcher = threading.Thread(target=self._run_watcher, name='model-watcher', daemon=True)
+            self._watcher.start()
+            logger.info(f"👀 Observando {watch_path} para troca de modelo a quente")
+
+    # --- Pedidos -------------------------------------------------------------
+
+    def request(self, path):
+        """Agenda a carga de `path`; um pedido durante outra carga espera a vez (só o último vale)"""
+        if not os.path.isfile(path):
+            raise ValueError(f"modelo não encontrado: {path}")
+        with self._lock:
+            self._requested = path
+        self._wake.set()
+        logger.info(f"🔄 Troca de modelo agendada: {path}")
+        return self.status()
+
+    def _scan(self):
+        if os.path.isdir(self.watch_path):
+            paths = glob.glob(os.path.join(self.watch_path, '*.tflite'))
+        else:
+            paths = [self.watch_path]
+        snapshot = {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def poll(self):
+        """Uma verificação do observador; retorna o arquivo agendado ou None"""
+        now = time.monotonic()
+        snapshot = self._scan()
+        for path, signature in snapshot.items():
+            if self._snapshot.get(path) != signature:
+                # Ainda sendo escrito: o prazo recomeça a cada mudança
+                self._changed[path] = (signature, now)
+        self._snapshot = snapshot
+
+        settled = [(since, path) for path, (signature, since) in self._changed.items()
+                   if snapshot.get(path) == signature and now - since >= self.settle_s]
+        if not settled:
+            return None
+        _, path = max(settled)
+        self._changed.clear()
+        self.request(path)
+        return path
+
+    def _run_watcher(self):
+        while not self._stop.wait(self.poll_s):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning(f"Observador de modelos: {e}")
+
+    # --- Carga em segundo plano ---------------------------------------------
+
+    def _run_loader(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            with self._lock:
+                path, self._requested = self._requested, None
+            if path:
+                self._load(path)
+
+    def _load(self, path):
+        self.state = 'loading'
+        self.loading_path = path
+        candidate = None
+        try:
+            start = time.perf_counter()
+            candidate = self.prepare(path)
+            candidate.load_ms = (time.perf_counter() - start) * 1000
+            check_signature(self.current_decoder, candidate.decoder)
+            start = time.perf_counter()
+            for interpreter in candidate.interpreters:
+                warm(interpreter, self.warmup_invokes)
+            candidate.warm_ms = (time.perf_counter() - start) * 1000
+        except Exception as e:
+            if candidate is not None:
+                candidate.release()
+            self.state = 'failed'
+            self.last_error = f"{os.path.basename(path)}: {e}"
+            logger.error(f"❌ Troca de modelo cancelada - mantendo {os.path.basename(self.current_path)}: {e}")
+            return
+        finally:
+            self.loading_path = None
+
+        with self._lock:
+            previous, self._ready = self._ready, candidate
+        if previous is not None:
+            previous.release()
+        self.state = 'ready'
+        logger.info(f"🔄 Modelo {os.path.basename(path)} pronto (carga {candidate.load_ms:.0f}ms, "
+                    f"aquecimento {candidate.warm_ms:.0f}ms) - troca no próximo frame")
+
+    # --- Troca (thread do loop) ---------------------------------------------
+
+    def take(self):
+        """Candidato pronto para a troca, ou None (chamado entre frames; não bloqueia)"""
+        if self._ready is None:
+            return None
+        with self._lock:
+            candidate, self._ready = self._ready, None
+        return candidate
+
+    def committed(self, candidate, swap_ms):
+        """Registra a troca feita pelo loop; o candidato passa a ser a referência de assinatura"""
+        previous = self.current_path
+        self.current_path = candidate.path
+        self.current_decoder = candidate.decoder
+        self.swaps += 1
+        self.state = 'idle'
+        self.last_error = ''
+        self.last_swap = {
+            'from': previous,
+            'to': candidate.path,
+            'load_ms': candidate.load_ms,
+            'warm_ms': candidate.warm_ms,
+            'swap_ms': swap_ms,
+            'at': time.time(),
+        }
+        logger.info(f"✅ Modelo trocado a quente: {os.path.basename(previous)} -> "
+                    f"{os.path.basename(candidate.path)} (pausa no loop {swap_ms:.1f}ms)")
+
+    def status(self):
+        return {
+            'state': self.state,
+            'current': self.current_path,
+            'loading': self.loading_path,
+            'pending': self._requested,
+            'last_error': self.last_error,
+            'swaps': self.swaps,
+            'last_swap': self.last_swap,
+        }
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.poll_s + 1)
+        self._loader.join(timeout=30)
+        with self._lock:
+            candidate, self._ready = self._ready, None
+        if candidate is not None:
+            candidate.release()
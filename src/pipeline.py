@@ -0,0 +1,134 @@
+import collections
+import logging
+import queue
+import threading
+import time
+
+from decoders import create_decoder
+from preprocessing import InputWriter
+
+logger = logging.getLogger(__name__)
+
+# Resultado de um frame no modo com vários interpretadores; `error` != None indica falha
+PipelineResult = collections.namedtuple(
+    'PipelineResult',
+    ['frame', 'boxes', 'scores', 'class_ids', 'inference_time', 'read_start', 'frame_start', 'error']
+)
+
+
+class _Slot:
+    """Interpretador com seu escritor de entrada, decodificador e thread de invoke"""
+
+    def __init__(self, interpreter, number):
+        self.interpreter = interpreter
+        self.number = number
+        self.input_writer = InputWriter(interpreter, interpreter.get_input_details()[0])
+        self.decoder = create_decoder(interpreter)
+        self.jobs = queue.Queue(maxsize=1)
+        self.thread = None
+
+
+class InferencePipeline:
+    """Vários interpretadores do mesmo modelo usados em alternância (double buffering).
+
+    O frame N+1 é redimensionado e escrito no tensor de entrada do
+    interpretador B (na thread de chamada) enquanto o interpretador A executa
+    o frame N na sua própria thread; o `invoke` libera o GIL, então
+    pré-processamento e decodificação ficam escondidos atrás da inferência.
+    A decodificação roda na thread do slot, antes de ele voltar a ficar livre,
+    porque as views dos tensores de saída não sobrevivem ao próximo invoke.
+
+    `collect` devolve os resultados na ordem de submissão, mesmo que os
+    slots terminem fora de ordem. Os frames são mantidos por referência até
+    serem devolvidos: fontes que reciclam buffers precisam segurar pelo menos
+    `depth` frames.
+    """
+
+    def __init__(self, interpreters):
+        self.slots = [_Slot(interpreter, n) for n, interpreter in enumerate(interpreters)]
+        self.depth = len(self.slots)
+        self._free = queue.Queue()
+        self._done = queue.Queue()
+        self._ready = {}
+        self._next_ticket = 0
+        self._next_result = 0
+        for slot in self.slots:
+            slot.thread = threading.Thread(target=self._worker, args=(slot,),
+                                           name=f'inference-{slot.number}', daemon=True)
+            slot.thread.start()
+            self._free.put(slot)
+        logger.info(f"⏩ Pipeline de inferência com {self.depth} interpretadores em alternância")
+
+    @property
+    def in_flight(self):
+        """Frames submetidos e ainda não devolvidos por `collect`"""
+        return self._next_ticket - self._next_result
+
+    def _worker(self, slot):
+        while True:
+            job = slot.jobs.get()
+            if job is None:
+                return
+            ticket, frame, read_start, frame_start, conf_threshold, iou_threshold = job
+            frame_h, frame_w = frame.image.shape[:2]
+            inference_time = 0.0
+            try:
+                start_time = time.perf_counter()
+                slot.interpreter.invoke()
+                inference_time = time.perf_counter() - start_time
+                boxes, scores, class_ids = slot.decoder.decode(
+                    slot.interpreter, frame_w, frame_h, conf_threshold, iou_threshold
+                )
+                result = PipelineResult(frame, boxes, scores, class_ids, inference_time,
+                                        read_start, frame_start, None)
+            except Exception as e:
+                result = PipelineResult(frame, None, None, None, inference_time, read_start, frame_start, e)
+            self._done.put((ticket, result))
+            self._free.put(slot)
+
+    def submit(self, frame, conf_threshold, iou_threshold, read_start=None, frame_start=None):
+        """Escreve `frame` no próximo interpretador livre e dispara o invoke em segundo plano.
+
+        Bloqueia enquanto todos os slots estão ocupados.
+        """
+        slot = self._free.get()
+        frame_start = time.perf_counter() if frame_start is None else frame_start
+        try:
+            slot.input_writer.write(frame.image)
+        except Exception:
+            self._free.put(slot)
+            raise
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        slot.jobs.put((ticket, frame, read_start or frame_start, frame_start, conf_threshold, iou_threshold))
+
+    def collect(self, wait=False):
+        """Resultados prontos, em ordem; com `wait`, espera ao menos o mais antigo pendente"""
+        wait = wait and self.in_flight > 0
+        while True:
+            try:
+                ticket, result = self._done.get(block=wait and self._next_result not in self._ready)
+            except queue.Empty:
+                break
+            self._ready[ticket] = result
+            if wait and self._next_result in self._ready:
+                wait = False
+
+        results = []
+        while self._next_result in self._ready:
+            results.append(self._ready.pop(self._next_result))
+            self._next_result += 1
+        return results
+
+    def drain(self):
+        """Espera e devolve todos os resultados pendentes (fim do loop: nenhum frame é perdido)"""
+        results = []
+        while self.in_flight:
+            results.extend(self.collect(wait=True))
+        return results
+
+    def close(self):
+        for slot in self.slots:
+            slot.jobs.put(None)
+        for slot in self.slots:
+            slot.thread.join(timeout=5)
@@ -3,6 +3,8 @@ import logging
 import time
 import threading
 
+from realtime import release_thread
+
 logger = logging.getLogger(__name__)
 
 class Plc:
@@ -14,19 +16,23 @@ class Plc:
         self.auto_reconnect = True
         self.connection_thread = None
         self.stop_reconnect = False
+        # O cliente snap7 não é thread-safe: escritas (loop e agendador de rejeição),
+        # troca do cliente na reconexão e desconexão passam por este lock
+        self._lock = threading.Lock()
         
     def init_plc(self):
         """Inicializa a conexão com o PLC sem bloquear a aplicação"""
         try:
             logger.info("Tentando conectar ao PLC...")
-            self.client = snap7.client.Client()
-            self.client.connect("192.168.2.201", 0, 1)  # IP, rack, slot
-            if self.client.get_connected():
-                self.connected = True
+            client = snap7.client.Client()
+            client.connect("192.168.2.201", 0, 1)  # IP, rack, slot
+            with self._lock:
+                self.client = client
+                self.connected = client.get_connected()
+            if self.connected:
                 logger.info("PLC conectado com sucesso!")
                 return True
             else:
-                self.connected = False
                 logger.warning("Falha ao conectar ao PLC - aplicação continuará sem PLC.")
                 self._start_auto_reconnect()
                 return False
@@ -36,16 +42,24 @@ class Plc:
             self._start_auto_reconnect()
             return False
     
+    def connect_in_background(self):
+        """Conecta ao PLC na thread de reconexão (primeira tentativa imediata), sem bloquear quem chama"""
+        if not self.connected:
+            logger.info("Conectando ao PLC em segundo plano...")
+            self._start_auto_reconnect()
+
     def _start_auto_reconnect(self):
         """Inicia thread de reconexão automática"""
         if self.auto_reconnect and (self.connection_thread is None or not self.connection_thread.is_alive()):
             self.stop_reconnect = False
-            self.connection_thread = threading.Thread(target=self._auto_reconnect_loop, daemon=True)
+            self.connection_thread = threading.Thread(target=self._auto_reconnect_loop, name='plc-reconnect', daemon=True)
             self.connection_thread.start()
             logger.info("Thread de reconexão automática iniciada")
     
     def _auto_reconnect_loop(self):
         """Loop de reconexão automática executado em thread separada"""
+        # Criada pelo loop ou pelo agendador de rejeição: não herda a prioridade deles
+        release_thread('reconexão PLC')
         reconnect_attempts = 0
         while self.auto_reconnect and not self.stop_reconnect:
             if not self.connected:
@@ -56,12 +70,17 @@ class Plc:
                         logger.info(f"Tentando reconectar ao PLC automaticamente (tentativa {reconnect_attempts})...")
                     self.last_connection_attempt = current_time
                     try:
-                        if self.client:
-                            self.client.disconnect()
-                        self.client = snap7.client.Client()
-                        self.client.connect("192.168.2.201", 0, 1)
-                        if self.client.get_connected():
-                            self.connected = True
+                        with self._lock:
+                            old_client, self.client = self.client, None
+                        if old_client:
+                            old_client.disconnect()
+                        # Conecta fora do lock: o timeout do connect não segura as escritas
+                        client = snap7.client.Client()
+                        client.connect("192.168.2.201", 0, 1)
+                        with self._lock:
+                            self.client = client
+                            self.connected = client.get_connected()
+                        if self.connected:
                             logger.info(f"✅ PLC reconectado com sucesso após {reconnect_attempts} tentativas!")
                             reconnect_attempts = 0
                         else:
@@ -103,32 +122,59 @@ class Plc:
             'retry_interval': self.connection_retry_interval
         }
 
-    def write_db(self, value: int):
-        """Escreve valor no PLC com tratamento de erro robusto"""
-        try:
-            # Se PLC não está conectado, apenas registra e continua
-            if not self.connected:
-                logger.debug(f"PLC não conectado - valor {value} não foi enviado")
-                return False
+    def write_db(self, value: int, start: int = 0):
+        """Escreve valor (2 bytes) no DB1 a partir do byte `start` com tratamento de erro robusto"""
+        with self._lock:
+            try:
+                # Se PLC não está conectado, apenas registra e continua
+                if not self.connected:
+                    logger.debug(f"PLC não conectado - valor {value} não foi enviado")
+                    return False
+
+                # Verifica se a conexão ainda está ativa
+                if not self.check_connection():
+                    logger.warning("Conexão PLC perdida")
+                    self.connected = False
+                    self._start_auto_reconnect()
+                    return False
 
-            # Verifica se a conexão ainda está ativa
-            if not self.check_connection():
-                logger.warning("Conexão PLC perdida")
+                # Tenta escrever no PLC
+                data = self.int_to_bytearray(value)
+                self.client.write_area(snap7.Area.DB, 1, start, data)
+                logger.debug(f"✅ Valor {value} escrito no PLC com sucesso")
+                return True
+            
+            except Exception as e:
                 self.connected = False
+                logger.warning(f"Falha ao escrever no PLC (valor {value}): {e}")
                 self._start_auto_reconnect()
                 return False
 
-            # Tenta escrever no PLC
-            data = self.int_to_bytearray(value)
-            self.client.write_area(snap7.Area.DB, 1, 0, data)
-            logger.debug(f"✅ Valor {value} escrito no PLC com sucesso")
-            return True
-            
-        except Exception as e:
-            self.connected = False
-            logger.warning(f"Falha ao escrever no PLC (valor {value}): {e}")
-            self._start_auto_reconnect()
-            return False
+    def write_reject(self, value: int, delay_ms: int):
+        """Telegrama de rejeição: valor da classe e ms até o disparo do ejetor (DB1, bytes 0-3)"""
+        with self._lock:
+            try:
+                if not self.connected:
+                    logger.debug(f"PLC não conectado - rejeição {value} (+{delay_ms}ms) não foi enviada")
+                    return False
+
+                if not self.check_connection():
+                    logger.warning("Conexão PLC perdida")
+                    self.connected = False
+                    self._start_auto_reconnect()
+                    return False
+
+                delay = min(max(int(delay_ms), 0), 32767)
+                data = self.int_to_bytearray(value) + self.int_to_bytearray(delay)
+                self.client.write_area(snap7.Area.DB, 1, 0, data)
+                logger.debug(f"✅ Rejeição {value} em {delay}ms escrita no PLC")
+                return True
+
+            except Exception as e:
+                self.connected = False
+                logger.warning(f"Falha ao escrever rejeição no PLC (valor {value}): {e}")
+                self._start_auto_reconnect()
+                return False
 
     def disconnect(self):
         """Desconecta do PLC de forma segura e para reconexão automática"""
@@ -139,9 +185,10 @@ class Plc:
             if self.connection_thread and self.connection_thread.is_alive():
                 logger.info("Parando thread de reconexão...")
                 
-            if self.client and self.client.get_connected():
-                self.client.disconnect()
-                logger.info("PLC desconectado.")
+            with self._lock:
+                if self.client and self.client.get_connected():
+                    self.client.disconnect()
+                    logger.info("PLC desconectado.")
         except Exception as e:
             logger.error(f"Erro ao desconectar PLC: {e}")
         finally:
@@ -0,0 +1,43 @@
+import cv2
+
+import numpy as np
+
+
+class InputWriter:
+    """Pré-processamento sem alocação: escreve o frame direto no tensor de entrada.
+
+    Buffers de resize e de conversão de cor são alocados uma vez no formato
+    do modelo; a conversão para float/int8 usa uma tabela de 256 entradas
+    (`cv2.LUT` com `dst=`) em vez de aritmética que criaria arrays temporários.
+    A view do tensor do interpretador é obtida e descartada a cada chamada,
+    como o TFLite exige antes de `invoke`.
+    """
+
+    def __init__(self, interpreter, input_details):
+        self.interpreter = interpreter
+        self.index = input_details['index']
+        _, height, width, _ = input_details['shape']
+        self.size = (int(width), int(height))
+        self.dtype = input_details['dtype']
+        self._resized = np.empty((int(height), int(width), 3), dtype=np.uint8)
+        self._rgb = np.empty_like(self._resized)
+
+        pixels = np.arange(256, dtype=np.float32)
+        if self.dtype == np.uint8:
+            self._lut = None
+        elif self.dtype == np.int8:
+            scale, zero_point = input_details['quantization']
+            self._lut = np.clip(np.round(pixels / 255.0 / scale + zero_point), -128, 127).astype(np.int8)
+        else:
+            self._lut = (pixels / 255.0).astype(self.dtype)
+
+    def write(self, image):
+        """Redimensiona `image` (BGR) e grava no tensor de entrada do interpretador"""
+        cv2.resize(image, self.size, dst=self._resized)
+        tensor = self.interpreter.tensor(self.index)()[0]
+        if self._lut is None:
+            cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=tensor)
+        else:
+            cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=self._rgb)
+            cv2.LUT(self._rgb, self._lut, dst=tensor)
+        del tensor
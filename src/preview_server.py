@@ -0,0 +1,253 @@
+import cv2
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from display import FrameCopies, desenhar_deteccoes
+from realtime import release_thread
+
+logger = logging.getLogger(__name__)
+
+BOUNDARY = 'potatoframe'
+
+INDEX_HTML = b"""<!DOCTYPE html>
+<html><head><title>Potato Identifier - Preview</title></head>
+<body style="margin:0;background:#111">
+<img src="/stream.mjpg" style="display:block;margin:auto;max-width:100%">
+</body></html>
+"""
+
+
+class PreviewServer:
+    """Servidor HTTP de preview MJPEG com codificação sob demanda.
+
+    `update` guarda uma cópia do último frame. A thread de
+    codificação só existe enquanto houver pelo menos um cliente conectado;
+    cada frame é codificado uma única vez (com FPS e largura limitados) e o
+    mesmo JPEG é enviado a todos os clientes. Sem clientes, o custo é zero.
+    """
+
+    def __init__(self, port, colors, max_fps=5.0, max_width=640, jpeg_quality=70, host='0.0.0.0',
+                 keepalive_s=2.0):
+        self.port = port
+        self.host = host
+        self.colors = colors
+        self.max_fps = max_fps
+        self.max_width = max_width
+        self.jpeg_quality = jpeg_quality
+        # Sem JPEG novo por este tempo o stream escreve mesmo assim, para notar clientes desconectados
+        self.keepalive_s = keepalive_s
+
+        self._latest = None
+        self._latest_seq = 0
+        self._copies = FrameCopies()
+        self._frame_cond = threading.Condition()
+
+        self._canvas = None
+        self._jpeg = None
+        self._jpeg_seq = 0
+        self._jpeg_cond = threading.Condition()
+
+        self._clients = 0
+        self._clients_lock = threading.Lock()
+        self._encoder_thread = None
+        self._stop = False
+
+        self.httpd = None
+        self.server_thread = None
+        self.frames_encoded = 0
+
+    @property
+    def clients(self):
+        return self._clients
+
+    def start(self):
+        """Inicia o servidor HTTP em thread daemon"""
+        server = self
+
+        class Handler(PreviewRequestHandler):
+            preview = server
+
+        try:
+            self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+            self.httpd.daemon_threads = True
+        except OSError as e:
+            logger.warning(f"Não foi possível iniciar preview MJPEG na porta {self.port}: {e}")
+            return False
+
+        self.server_thread = threading.Thread(target=self.httpd.serve_forever, name='preview-http', daemon=True)
+        self.server_thread.start()
+        logger.info(f"📡 Preview MJPEG disponível em http://{self.host}:{self.port}/ "
+                    f"({self.max_fps:.0f} fps, {self.max_width}px)")
+        return True
+
+    def stop(self):
+        """Encerra o servidor e libera clientes pendentes"""
+        self._stop = True
+        with self._frame_cond:
+            self._frame_cond.notify_all()
+        with self._jpeg_cond:
+            self._jpeg_cond.notify_all()
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+    def update(self, frame, detections, info_text=''):
+        """Publica o frame mais recente; não faz nada se ninguém estiver assistindo"""
+        if self._clients == 0:
+            return
+        image = self._copies.copy(frame)
+        with self._frame_cond:
+            replaced, self._latest = self._latest, (image, detections, info_text)
+            self._latest_seq += 1
+            self._frame_cond.notify()
+        if replaced is not None:
+            self._copies.release(replaced[0])
+
+    def _client_connected(self):
+        with self._clients_lock:
+            self._clients += 1
+            if self._encoder_thread is None:
+                self._encoder_thread = threading.Thread(target=self._encode_loop, name='preview-encoder', daemon=True)
+                self._encoder_thread.start()
+            logger.info(f"📡 Cliente de preview conectado ({self._clients} ativo(s))")
+
+    def _client_disconnected(self):
+        with self._clients_lock:
+            self._clients -= 1
+            logger.info(f"📡 Cliente de preview desconectado ({self._clients} ativo(s))")
+        if self._clients == 0:
+            with self._frame_cond:
+                self._latest = None
+                self._frame_cond.notify_all()
+
+    def _encode_loop(self):
+        """Codifica o último frame no máximo `max_fps` vezes por segundo enquanto houver clientes"""
+        encoded_seq = 0
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), int(self.jpeg_quality)]
+
+        while True:
+            # Encerrar somente sob o lock, para não perder um cliente que acabou de conectar
+            with self._clients_lock:
+                if self._stop or self._clients == 0:
+                    self._encoder_thread = None
+                    return
+
+            with self._frame_cond:
+                while not self._stop and self._clients > 0 and self._latest_seq == encoded_seq:
+                    self._frame_cond.wait(timeout=1.0)
+                if self._stop or self._clients == 0 or self._latest is None:
+                    encoded_seq = self._latest_seq
+                    continue
+                frame, detections, info_text = self._latest
+                self._latest = None
+                encoded_seq = self._latest_seq
+
+            started = time.monotonic()
+            try:
+                frame_h, frame_w = frame.shape[:2]
+                size = None
+                if self.max_width and frame_w > self.max_width:
+                    size = (self.max_width, int(frame_h * self.max_width / frame_w))
+                self._canvas = desenhar_deteccoes(frame, detections, info_text, self.colors, size,
+                                                  out=self._canvas)
+                ok, buffer = cv2.imencode('.jpg', self._canvas, params)
+                if ok:
+                    with self._jpeg_cond:
+                        self._jpeg = buffer.tobytes()
+                        self._jpeg_seq += 1
+                        self.frames_encoded += 1
+                        self._jpeg_cond.notify_all()
+            except Exception as e:
+                logger.error(f"Erro ao codificar frame de preview: {e}")
+            finally:
+                self._copies.release(frame)
+
+            # max_fps pode mudar em execução
+            period = 1.0 / self.max_fps if self.max_fps > 0 else 0.0
+            remaining = period - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def wait_jpeg(self, last_seq, timeout=2.0):
+        """Aguarda um JPEG mais novo que `last_seq`; retorna (seq, bytes) ou (last_seq, None)"""
+        with self._jpeg_cond:
+            if self._jpeg_seq == last_seq and not self._stop:
+                self._jpeg_cond.wait(timeout)
+            if self._jpeg_seq == last_seq or self._jpeg is None:
+                return last_seq, None
+            return self._jpeg_seq, self._jpeg
+
+
+class PreviewRequestHandler(BaseHTTPRequestHandler):
+    preview = None
+
+    def log_message(self, format, *args):
+        logger.debug(f"preview {self.address_string()} - {format % args}")
+
+    def setup(self):
+        # Thread por conexão: fora da prioridade e dos núcleos do tempo real
+        release_thread('cliente de preview')
+        super().setup()
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path in ('/', '/index.html'):
+            self._send_bytes(INDEX_HTML, 'text/html; charset=utf-8')
+        elif path == '/stream.mjpg':
+            self._stream()
+        elif path == '/snapshot.jpg':
+            self._snapshot()
+        else:
+            self.send_error(404)
+
+    def _send_bytes(self, payload, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _snapshot(self):
+        self.preview._client_connected()
+        try:
+            _, jpeg = self.preview.wait_jpeg(self.preview._jpeg_seq, timeout=5.0)
+            if jpeg is None:
+                self.send_error(503, 'Nenhum frame disponível')
+                return
+            self._send_bytes(jpeg, 'image/jpeg')
+        finally:
+            self.preview._client_disconnected()
+
+    def _stream(self):
+        self.preview._client_connected()
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+
+            seq = 0
+            last_jpeg = None
+            while not self.preview._stop:
+                seq, jpeg = self.preview.wait_jpeg(seq, timeout=self.preview.keepalive_s)
+                if jpeg is None:
+                    # Sem frames (câmera travada, detector parado): só escrevendo no socket um
+                    # cliente que saiu levanta BrokenPipeError e libera a codificação
+                    if last_jpeg is None:
+                        self.wfile.write(b'\r\n')     # preâmbulo do multipart, ignorado pelo cliente
+                        self.wfile.flush()
+                        continue
+                    jpeg = last_jpeg                  # repete o último frame
+                last_jpeg = jpeg
+                self.wfile.write(f'--{BOUNDARY}\r\n'.encode())
+                self.wfile.write(b'Content-Type: image/jpeg\r\n')
+                self.wfile.write(f'Content-Length: {len(jpeg)}\r\n\r\n'.encode())
+                self.wfile.write(jpeg)
+                self.wfile.write(b'\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.preview._client_disconnected()
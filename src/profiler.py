@@ -0,0 +1,141 @@
+import cProfile
+import collections
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+from realtime import release_thread
+
+logger = logging.getLogger(__name__)
+
+
+class FrameProfiler:
+    """Perfilamento sob demanda dos próximos N frames do loop de inferência.
+
+    Ativado por sinal (SIGUSR1) ou pela API de controle. Enquanto ativo:
+    - cProfile na thread do loop -> `<prefixo>.pstats`
+    - amostragem de pilhas de todas as threads (inclui a do PLC) via
+      `sys._current_frames()` -> `<prefixo>.collapsed` (formato flamegraph)
+    Depois de N frames desliga sozinho. Inativo, o custo no loop é uma
+    leitura de atributo (`if profiler.armed`).
+    """
+
+    def __init__(self, output_dir, frames=100, sample_hz=200.0):
+        self.output_dir = output_dir
+        self.default_frames = frames
+        self.sample_hz = sample_hz
+
+        self.armed = False
+        self._requested_frames = 0
+        self._profile = None
+        self._frames_left = 0
+        self._sampler = None
+        self._sampling = threading.Event()
+        self._stacks = collections.Counter()
+        self._started_at = 0.0
+        self._prefix = None
+        self.last_outputs = None
+
+    def install_signal(self, signum=signal.SIGUSR1):
+        """Associa o sinal ao perfilamento (precisa ser chamado da thread principal)"""
+        try:
+            signal.signal(signum, lambda *_: self.request())
+            logger.info(f"🔬 Perfilamento sob demanda: kill -{signal.Signals(signum).name} {os.getpid()}")
+        except (ValueError, OSError) as e:
+            logger.warning(f"Não foi possível instalar o sinal de perfilamento: {e}")
+
+    def request(self, frames=None):
+        """Agenda o perfilamento dos próximos `frames` frames (seguro em handler de sinal)"""
+        if self.armed:
+            return False
+        self._requested_frames = int(frames or self.default_frames)
+        self.armed = True
+        return True
+
+    def status(self):
+        return {
+            'armed': self.armed,
+            'active': self._profile is not None,
+            'frames_left': self._frames_left,
+            'last_outputs': self.last_outputs,
+        }
+
+    def tick(self):
+        """Chamado no início de cada frame enquanto `armed`; inicia, conta e encerra"""
+        if self._profile is None:
+            self._start()
+            return
+        self._frames_left -= 1
+        if self._frames_left <= 0:
+            self._stop()
+
+    def finish(self):
+        """Encerra e grava um perfilamento em andamento (ex.: ao sair do loop)"""
+        if self._profile is not None:
+            self._stop()
+
+    def _start(self):
+        """Inicia o perfilamento; se não for possível, registra uma vez e desarma (o loop segue normal)"""
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._prefix = os.path.join(self.output_dir, time.strftime('profile-%Y%m%d-%H%M%S'))
+            self._frames_left = self._requested_frames
+            self._stacks = collections.Counter()
+            self._started_at = time.monotonic()
+
+            profile = cProfile.Profile()
+            profile.enable()
+        except Exception as e:
+            self.armed = False
+            logger.error(f"🔬 Não foi possível iniciar o perfilamento - desarmado: {e}")
+            return
+        self._profile = profile
+
+        self._sampling.set()
+        self._sampler = threading.Thread(target=self._sample_loop, name='profiler-sampler', daemon=True)
+        self._sampler.start()
+        logger.info(f"🔬 Perfilamento iniciado ({self._frames_left} frames)")
+
+    def _stop(self):
+        self._profile.disable()
+        self._sampling.clear()
+        self._sampler.join(timeout=2.0)
+        elapsed = time.monotonic() - self._started_at
+
+        pstats_path = self._prefix + '.pstats'
+        collapsed_path = self._prefix + '.collapsed'
+        try:
+            self._profile.dump_stats(pstats_path)
+            with open(collapsed_path, 'w') as f:
+                for stack, count in self._stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            self.last_outputs = [pstats_path, collapsed_path]
+            logger.info(f"🔬 Perfilamento concluído em {elapsed:.1f}s: {pstats_path}, {collapsed_path}")
+        except OSError as e:
+            logger.error(f"Erro ao gravar perfilamento: {e}")
+        finally:
+            self._profile = None
+            self._sampler = None
+            self.armed = False
+
+    def _sample_loop(self):
+        """Amostra as pilhas de todas as threads em `sample_hz`"""
+        release_thread('amostragem do perfilamento')
+        interval = 1.0 / self.sample_hz if self.sample_hz > 0 else 0.005
+        own_id = threading.get_ident()
+        while self._sampling.is_set():
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                parts.append(names.get(thread_id, str(thread_id)))
+                self._stacks[';'.join(reversed(parts))] += 1
+            time.sleep(interval)
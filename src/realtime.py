@@ -0,0 +1,220 @@
+import collections
+import gc
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def parse_cpu_list(value):
+    """Converte "2,3" ou "0-1,3" no conjunto de CPUs (vazio = não fixar)"""
+    cpus = set()
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = (int(v) for v in part.split('-'))
+            cpus.update(range(first, last + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+def apply_thread_policy(name, cpus=None, priority=0, nice=0, native_id=None):
+    """Fixa a thread nas `cpus` e eleva a prioridade; retorna o que foi aplicado.
+
+    `native_id` é o TID no Linux (padrão: a thread atual). Com `priority` > 0
+    e `cpus` definidas tenta SCHED_FIFO; sem núcleos dedicados, ou sem
+    permissão (CAP_SYS_NICE), usa `nice`: uma thread FIFO ocupada em núcleos
+    compartilhados deixaria Weston, o PLC e o próprio monitoramento sem CPU.
+    Falhas são logadas e não interrompem a aplicação.
+    """
+    tid = native_id or threading.get_native_id()
+    applied = []
+    if cpus:
+        try:
+            os.sched_setaffinity(tid, cpus)
+            applied.append(f"CPUs {sorted(cpus)}")
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚙️  {name}: afinidade {sorted(cpus)} não aplicada: {e}")
+
+    fifo = False
+    if priority > 0 and cpus:
+        try:
+            os.sched_setscheduler(tid, os.SCHED_FIFO, os.sched_param(priority))
+            applied.append(f"SCHED_FIFO {priority}")
+            fifo = True
+        except (OSError, AttributeError) as e:
+            logger.warning(f"⚙️  {name}: SCHED_FIFO {priority} não permitido ({e}) - usando nice {nice}")
+    if not fifo and nice:
+        try:
+            os.setpriority(os.PRIO_PROCESS, tid, nice)
+            applied.append(f"nice {nice}")
+        except OSError as e:
+            logger.warning(f"⚙️  {name}: nice {nice} não permitido: {e}")
+
+    if applied:
+        logger.info(f"⚙️  {name}: {', '.join(applied)}")
+    return applied
+
+
+# CPUs das threads auxiliares no modo tempo real (None = modo desligado)
+_housekeeping_cpus = None
+
+
+def housekeeping_cpus(dedicated):
+    """CPUs do processo menos as `dedicated` ao tempo real (todas, se não sobrar nenhuma).
+
+    Chamar antes de fixar a thread atual: parte da afinidade dela.
+    """
+    available = os.sched_getaffinity(0)
+    return (available - set(dedicated)) or available
+
+
+def set_housekeeping_cpus(cpus):
+    """Liga `release_thread` com as CPUs de manutenção (ao entrar no modo tempo real)"""
+    global _housekeeping_cpus
+    _housekeeping_cpus = set(cpus) if cpus is not None else None
+
+
+def release_thread(name):
+    """Volta a thread atual a SCHED_OTHER, nice 0 e às CPUs de manutenção.
+
+    No Linux uma thread nova herda política, nice e afinidade de quem a criou;
+    threads auxiliares criadas pelo loop ou pelo agendador (reabertura da
+    câmera, reconexão do PLC, handlers HTTP...) chamam isto no início para
+    não rodar em SCHED_FIFO nos núcleos da inferência. Sem o modo tempo real
+    não faz nada.
+    """
+    cpus = _housekeeping_cpus
+    if cpus is None:
+        return False
+    tid = threading.get_native_id()
+    try:
+        if os.sched_getscheduler(tid) != os.SCHED_OTHER:
+            os.sched_setscheduler(tid, os.SCHED_OTHER, os.sched_param(0))
+        if os.getpriority(os.PRIO_PROCESS, tid) < 0:
+            os.setpriority(os.PRIO_PROCESS, tid, 0)
+        os.sched_setaffinity(tid, cpus)
+    except (OSError, AttributeError) as e:
+        logger.warning(f"⚙️  {name}: política de thread auxiliar não aplicada: {e}")
+        return False
+    logger.debug(f"⚙️  {name}: SCHED_OTHER nas CPUs {sorted(cpus)}")
+    return True
+
+
+class IdleGc:
+    """Coleta de lixo só nos intervalos ociosos do loop.
+
+    `freeze` coleta tudo o que a inicialização criou, move para a geração
+    permanente (`gc.freeze`) e desliga a coleta automática. O loop chama
+    `idle(budget_s)` enquanto espera o próximo frame: a geração 0 (e, a cada
+    `gen1_every`, a 1) só é coletada se o custo estimado couber na folga.
+    Se a folga nunca aparece (loop limitado pela inferência), a coleta
+    acontece mesmo assim quando a contagem passa de `force_factor` vezes o
+    limiar, para que ciclos não se acumulem sem limite.
+    """
+
+    def __init__(self, gen1_every=10, gen2_interval=600.0, force_factor=10):
+        self.gen1_every = gen1_every
+        self.gen2_interval = gen2_interval
+        self.force_factor = force_factor
+        self.threshold = gc.get_threshold()[0] or 700
+        self.cost_s = [0.0005, 0.002, 0.02]
+        self.collections = [0, 0, 0]
+        self.forced = 0
+        self.max_pause_s = 0.0
+        self.active = False
+        self._gen0_runs = 0
+        self._last_gen2 = time.monotonic()
+
+    def freeze(self):
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+        self.active = True
+        self._last_gen2 = time.monotonic()
+        logger.info(f"🧊 GC: {gc.get_freeze_count()} objetos congelados, coleta automática desligada")
+
+    def _collect(self, generation):
+        start = time.perf_counter()
+        gc.collect(generation)
+        elapsed = time.perf_counter() - start
+        # Média móvel do custo por geração (decide se cabe na próxima folga)
+        self.cost_s[generation] = 0.8 * self.cost_s[generation] + 0.2 * elapsed
+        self.collections[generation] += 1
+        self.max_pause_s = max(self.max_pause_s, elapsed)
+
+    def idle(self, budget_s):
+        """Chamado no intervalo ocioso do loop; `budget_s` é a folga estimada até o próximo frame"""
+        if not self.active:
+            return
+        pending = gc.get_count()[0]
+        if pending < self.threshold:
+            return
+        forced = pending >= self.threshold * self.force_factor
+        if time.monotonic() - self._last_gen2 >= self.gen2_interval and (forced or budget_s > self.cost_s[2]):
+            self._collect(2)
+            self._last_gen2 = time.monotonic()
+            return
+        generation = 1 if self.gen1_every and self._gen0_runs % self.gen1_every == self.gen1_every - 1 else 0
+        fits = budget_s > self.cost_s[generation]
+        if fits or forced:
+            if not fits:
+                self.forced += 1
+            self._collect(generation)
+            self._gen0_runs += 1
+
+    def stats(self):
+        return {
+            'active': self.active,
+            'collections': list(self.collections),
+            'forced': self.forced,
+            'max_pause_ms': self.max_pause_s * 1000,
+        }
+
+    def unfreeze(self):
+        if self.active:
+            gc.enable()
+            gc.unfreeze()
+            self.active = False
+
+
+class LatencyReport:
+    """Percentis e jitter (p99 - p50) da latência total por frame, logados periodicamente"""
+
+    def __init__(self, label, report_interval=60.0, window=3000):
+        self.label = label
+        self.report_interval = report_interval
+        self.samples = collections.deque(maxlen=window)
+        self._last_report = time.monotonic()
+        self.last = None
+
+    def record(self, total_s):
+        self.samples.append(total_s)
+
+    def summary(self):
+        values = np.array(self.samples) * 1000
+        if not values.size:
+            return None
+        p50, p99 = np.percentile(values, (50, 99))
+        return {'frames': int(values.size), 'p50_ms': float(p50), 'p99_ms': float(p99),
+                'max_ms': float(values.max()), 'jitter_p99_ms': float(p99 - p50)}
+
+    def due(self):
+        return bool(self.samples) and time.monotonic() - self._last_report >= self.report_interval
+
+    def report(self, extra=''):
+        self._last_report = time.monotonic()
+        self.last = self.summary()
+        if self.last is None:
+            return
+        logger.info(f"⏱️  Latência do frame ({self.label}): p50 {self.last['p50_ms']:.1f}ms | "
+                    f"p99 {self.last['p99_ms']:.1f}ms | máx {self.last['max_ms']:.1f}ms | "
+                    f"jitter p99-p50 {self.last['jitter_p99_ms']:.1f}ms{extra}")
+        self.samples.clear()
@@ -0,0 +1,214 @@
+import collections
+import heapq
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Etapas cujo atraso é registrado por decisão, na ordem em que acontecem
+STAGES = ('camera', 'capture', 'inference', 'processing', 'dispatch')
+
+
+class RejectScheduler:
+    """Agenda a rejeição para o instante em que o objeto chega ao ejetor.
+
+    O horário de chegada parte do timestamp de captura do frame (menos a
+    latência fixa da câmera) mais o tempo de percurso na esteira: distância
+    câmera -> ejetor, corrigida pela posição do objeto no frame quando
+    `mm_per_px` é informado, dividida pela velocidade da esteira. Assim a
+    latência variável de inferência deixa de virar erro de posição, desde que
+    a decisão chegue antes do prazo.
+
+    Modos:
+    - 'scheduler': uma thread escreve o valor no instante de disparo
+      (chegada - `actuation_ms`) e volta a `reset_value` após `pulse_ms`
+    - 'telegram': o valor é enviado na hora, junto com os ms restantes até o
+      disparo; a temporização fica com o PLC
+
+    `send(value, delay_ms)` faz a escrita (PLC) e retorna True se conseguiu.
+    Detecções do mesmo objeto em frames seguidos caem no mesmo instante de
+    chegada e são fundidas dentro de `merge_ms`. A comparação é com todas as
+    detecções recentes, inclusive as já fundidas: sem `mm_per_px` o instante
+    avança um período de frame a cada frame, e o objeto que fica vários
+    frames à vista continua sendo um só.
+    """
+
+    def __init__(self, send, belt_speed_mm_s, ejector_distance_mm, mm_per_px=0.0, belt_direction='down',
+                 camera_latency_ms=0.0, actuation_ms=0.0, pulse_ms=50.0, merge_ms=60.0, reset_value=0,
+                 mode='scheduler', report_interval=60.0):
+        if belt_speed_mm_s <= 0 or ejector_distance_mm <= 0:
+            raise ValueError("velocidade da esteira e distância até o ejetor devem ser positivas")
+        if mode not in ('scheduler', 'telegram'):
+            raise ValueError(f"modo de rejeição desconhecido: {mode}")
+        if belt_direction not in ('down', 'up', 'left', 'right'):
+            raise ValueError(f"direção da esteira inválida: {belt_direction}")
+        self.send = send
+        self.belt_speed_mm_s = float(belt_speed_mm_s)
+        self.ejector_distance_mm = float(ejector_distance_mm)
+        self.mm_per_px = float(mm_per_px)
+        self.belt_direction = belt_direction
+        self.camera_latency_s = camera_latency_ms / 1000
+        self.actuation_s = actuation_ms / 1000
+        self.pulse_s = pulse_ms / 1000
+        self.merge_s = merge_ms / 1000
+        self.reset_value = reset_value
+        self.mode = mode
+        self.report_interval = report_interval
+
+        self._events = []
+        self._counter = 0
+        self._recent = collections.deque(maxlen=64)
+        self._active_until = 0.0
+        self._cond = threading.Condition()
+        self._stop = False
+        self._last_report = time.monotonic()
+        self.reset_stats()
+
+        self.thread = threading.Thread(target=self._run, name='reject-scheduler', daemon=True)
+        self.thread.start()
+        logger.info(f"🎯 Rejeição agendada ({mode}): esteira {belt_speed_mm_s:.0f}mm/s, ejetor a "
+                    f"{ejector_distance_mm:.0f}mm, atuação {actuation_ms:.0f}ms, câmera {camera_latency_ms:.0f}ms")
+
+    def reset_stats(self):
+        self.scheduled = 0
+        self.merged = 0
+        self.late = 0
+        self.dispatched = 0
+        self.failed = 0
+        self.stage_delays = {stage: collections.deque(maxlen=1000) for stage in STAGES}
+        self.slack = collections.deque(maxlen=1000)
+        self.dispatch_error = collections.deque(maxlen=1000)
+
+    def travel_s(self, position=None):
+        """Tempo de percurso até o ejetor de um objeto na posição (x, y, largura, altura) do frame"""
+        distance = self.ejector_distance_mm
+        if self.mm_per_px and position is not None:
+            x, y, frame_w, frame_h = position
+            # Deslocamento do objeto em relação ao centro do frame, no sentido do movimento
+            offset_px = {
+                'down': y - frame_h / 2,
+                'up': frame_h / 2 - y,
+                'right': x - frame_w / 2,
+                'left': frame_w / 2 - x,
+            }[self.belt_direction]
+            distance -= offset_px * self.mm_per_px
+        return max(distance, 0.0) / self.belt_speed_mm_s
+
+    def submit(self, frame_timestamp, value, position=None, stages=None):
+        """Agenda `value` para o objeto capturado em `frame_timestamp` (time.time()).
+
+        `frame_timestamp` é o da fonte (timestamp do driver quando existe, senão
+        o retorno do read); `camera_latency_ms` cobre o que vem antes dele.
+
+        `stages` traz os atrasos (s) já medidos no loop (capture, inference,
+        processing). Retorna o instante de disparo (time.monotonic()) ou None
+        se a detecção foi fundida a uma já agendada.
+        """
+        now = time.monotonic()
+        age = max(time.time() - frame_timestamp, 0.0)
+        captured_at = now - age - self.camera_latency_s
+        fire_at = captured_at + self.travel_s(position) - self.actuation_s
+
+        with self._cond:
+            merged = any(v == value and abs(t - fire_at) <= self.merge_s for t, v in self._recent)
+            self._recent.append((fire_at, value))
+            if merged:
+                self.merged += 1
+                return None
+
+            slack = fire_at - now
+            self.slack.append(slack)
+            self.scheduled += 1
+            self.stage_delays['camera'].append(self.camera_latency_s)
+            for stage, seconds in (stages or {}).items():
+                if stage in self.stage_delays:
+                    self.stage_delays[stage].append(seconds)
+            if slack < 0:
+                # Decisão depois do prazo: dispara já, e o atraso vira erro de posição
+                self.late += 1
+
+            when = now if self.mode == 'telegram' else max(fire_at, now)
+            self._push(when, 'fire', value, fire_at)
+            self._cond.notify()
+        return fire_at
+
+    def _push(self, when, kind, value, fire_at):
+        self._counter += 1
+        heapq.heappush(self._events, (when, self._counter, kind, value, fire_at))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stop and (not self._events or self._events[0][0] > time.monotonic()):
+                    timeout = self._events[0][0] - time.monotonic() if self._events else None
+                    self._cond.wait(timeout)
+                if self._stop:
+                    return
+                when, _, kind, value, fire_at = heapq.heappop(self._events)
+
+            if kind == 'reset':
+                # Outro disparo estendeu o pulso: o reset dele é que vale
+                if time.monotonic() >= self._active_until:
+                    self.send(self.reset_value, 0)
+                continue
+
+            delay_ms = max(fire_at - time.monotonic(), 0.0) * 1000 if self.mode == 'telegram' else 0
+            ok = self.send(value, int(delay_ms))
+            done = time.monotonic()
+            with self._cond:
+                # Acordar a thread + escrita no PLC (a espera proposital até o disparo não conta)
+                self.stage_delays['dispatch'].append(done - when)
+                if ok:
+                    self.dispatched += 1
+                    if self.mode == 'scheduler':
+                        self.dispatch_error.append(done - fire_at)
+                        self._active_until = done + self.pulse_s
+                        self._push(self._active_until, 'reset', self.reset_value, fire_at)
+                else:
+                    self.failed += 1
+
+    def stats(self):
+        def pct(values, q):
+            return float(np.percentile(values, q)) * 1000 if values else 0.0
+
+        with self._cond:
+            # Atraso em relação ao instante ideal de disparo, convertido em mm de esteira
+            if self.mode == 'scheduler':
+                errors = list(self.dispatch_error)
+            else:
+                errors = [-s for s in self.slack if s < 0]
+            return {
+                'mode': self.mode,
+                'scheduled': self.scheduled,
+                'merged': self.merged,
+                'late': self.late,
+                'dispatched': self.dispatched,
+                'failed': self.failed,
+                'stage_p50_ms': {s: pct(list(v), 50) for s, v in self.stage_delays.items()},
+                'stage_p99_ms': {s: pct(list(v), 99) for s, v in self.stage_delays.items()},
+                'slack_p1_ms': pct(list(self.slack), 1),
+                'position_error_p99_mm': pct(errors, 99) * self.belt_speed_mm_s / 1000,
+            }
+
+    def maybe_report(self):
+        """Loga atrasos por etapa e erro de posição a cada `report_interval` segundos"""
+        now = time.monotonic()
+        if now - self._last_report < self.report_interval or not self.scheduled:
+            return
+        self._last_report = now
+        st = self.stats()
+        stages = ' | '.join(f"{s} {st['stage_p50_ms'][s]:.1f}/{st['stage_p99_ms'][s]:.1f}" for s in STAGES)
+        logger.info(f"🎯 Rejeição: {st['scheduled']} agendadas, {st['merged']} fundidas, {st['late']} atrasadas, "
+                    f"{st['failed']} falhas | atraso p50/p99 (ms): {stages} | folga p1 {st['slack_p1_ms']:.1f}ms | "
+                    f"erro de posição p99 {st['position_error_p99_mm']:.1f}mm")
+        with self._cond:
+            self.reset_stats()
+
+    def close(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        self.thread.join(timeout=2)
@@ -0,0 +1,166 @@
+import cv2
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def parse_roi(value):
+    """Converte a configuração de ROI em lista de pontos.
+
+    Aceita retângulo "x1,y1,x2,y2" ou polígono "x,y;x,y;x,y[;...]".
+    Valores <= 1 são tratados como normalizados; acima disso, como pixels.
+    """
+    value = value.strip()
+    if not value:
+        return None
+    if ';' in value:
+        points = [tuple(float(v) for v in p.split(',')) for p in value.split(';') if p.strip()]
+        if len(points) < 3 or any(len(p) != 2 for p in points):
+            raise ValueError(f"Polígono de ROI inválido: {value!r}")
+        return points
+    coords = [float(v) for v in value.split(',')]
+    if len(coords) != 4:
+        raise ValueError(f"Retângulo de ROI inválido: {value!r}")
+    x1, y1, x2, y2 = coords
+    return [(x1, y1), (x2, y1), (x2, y2), (x1, y2)]
+
+
+class RegionOfInterest:
+    """Recorta a área útil da esteira (opcionalmente em faixas) antes da inferência.
+
+    Cada recorte é uma view do frame (sem cópia) que vai para o `cv2.resize`,
+    dando mais resolução efetiva às batatas com o mesmo custo de modelo. As
+    caixas detectadas voltam para coordenadas do frame inteiro e as que têm o
+    centro fora do polígono são descartadas antes do NMS.
+
+    Faixas vizinhas se sobrepõem em `lane_overlap` (fração da largura da
+    faixa, para cada lado da costura), para que uma batata sobre a divisa
+    apareça inteira em pelo menos uma delas; `merge_lanes` funde o que as
+    duas faixas viram do mesmo objeto.
+    """
+
+    # Distância (px) da borda do recorte a partir da qual a caixa é considerada cortada
+    EDGE_TOLERANCE = 2
+
+    def __init__(self, points, lanes=1, lane_axis='x', lane_overlap=0.0):
+        self.points = points
+        self.lanes = max(int(lanes), 1)
+        self.lane_axis = lane_axis
+        self.lane_overlap = max(float(lane_overlap), 0.0)
+        self._frame_size = None
+        self.regions = []
+        self.mask = None
+
+    @classmethod
+    def from_env(cls, camera_index):
+        """Lê ROI_CAM<índice> (ou ROI), ROI_LANES, ROI_LANE_AXIS e ROI_LANE_OVERLAP; None se não configurado"""
+        value = os.getenv(f'ROI_CAM{camera_index}', os.getenv('ROI', ''))
+        points = parse_roi(value)
+        if points is None:
+            return None
+        return cls(points, lanes=int(os.getenv('ROI_LANES', '1')), lane_axis=os.getenv('ROI_LANE_AXIS', 'x'),
+                   lane_overlap=float(os.getenv('ROI_LANE_OVERLAP', '0.1')))
+
+    def prepare(self, frame_w, frame_h):
+        """Calcula recortes e máscara para a resolução do frame (refeito se ela mudar)"""
+        if self._frame_size == (frame_w, frame_h):
+            return
+        self._frame_size = (frame_w, frame_h)
+
+        normalized = all(x <= 1.0 and y <= 1.0 for x, y in self.points)
+        pts = np.array([(x * frame_w, y * frame_h) if normalized else (x, y) for x, y in self.points])
+        pts[:, 0] = np.clip(pts[:, 0], 0, frame_w)
+        pts[:, 1] = np.clip(pts[:, 1], 0, frame_h)
+        pts = np.round(pts).astype(np.int32)
+
+        self.mask = np.zeros((frame_h, frame_w), dtype=np.uint8)
+        cv2.fillPoly(self.mask, [pts], 1)
+
+        x1, y1 = pts.min(axis=0)
+        x2, y2 = pts.max(axis=0)
+        if x2 <= x1 or y2 <= y1:
+            raise ValueError(f"ROI vazia para frame {frame_w}x{frame_h}: {self.points}")
+
+        self.regions = []
+        lo, hi = (y1, y2) if self.lane_axis == 'y' else (x1, x2)
+        pad = int(round((hi - lo) / self.lanes * self.lane_overlap))
+        for lane in range(self.lanes):
+            l1 = max(lo + (hi - lo) * lane // self.lanes - pad, lo)
+            l2 = min(lo + (hi - lo) * (lane + 1) // self.lanes + pad, hi)
+            if self.lane_axis == 'y':
+                self.regions.append((int(x1), int(l1), int(x2), int(l2)))
+            else:
+                self.regions.append((int(l1), int(y1), int(l2), int(y2)))
+
+        logger.info(f"✂️  ROI {frame_w}x{frame_h}: {len(self.regions)} recorte(s) {self.regions}")
+
+    def crops(self, frame):
+        """Gera (view do recorte, (x_offset, y_offset)) para cada faixa"""
+        frame_h, frame_w = frame.shape[:2]
+        self.prepare(frame_w, frame_h)
+        for x1, y1, x2, y2 in self.regions:
+            yield frame[y1:y2, x1:x2], (x1, y1)
+
+    def inside(self, boxes):
+        """Máscara booleana das caixas (em coordenadas do frame) com centro dentro do polígono"""
+        if len(boxes) == 0:
+            return np.zeros(0, dtype=bool)
+        frame_h, frame_w = self.mask.shape
+        cx = np.clip((boxes[:, 0] + boxes[:, 2]) // 2, 0, frame_w - 1)
+        cy = np.clip((boxes[:, 1] + boxes[:, 3]) // 2, 0, frame_h - 1)
+        return self.mask[cy, cx].astype(bool)
+
+    def _cut_at_seam(self, box, lane):
+        """Se a caixa encosta em uma costura interna do recorte da faixa `lane` (objeto cortado)"""
+        axis = 1 if self.lane_axis == 'y' else 0
+        start, end = self.regions[lane][axis], self.regions[lane][axis + 2]
+        tol = self.EDGE_TOLERANCE
+        return (lane > 0 and box[axis] <= start + tol) or (lane < self.lanes - 1 and box[axis + 2] >= end - tol)
+
+    def _same_object(self, a, lane_a, b, lane_b):
+        axis = 1 if self.lane_axis == 'y' else 0
+        cross = 1 - axis
+        # No outro eixo, as duas caixas precisam cobrir a mesma extensão
+        cross_overlap = min(a[cross + 2], b[cross + 2]) - max(a[cross], b[cross])
+        cross_min = min(a[cross + 2] - a[cross], b[cross + 2] - b[cross])
+        if cross_min <= 0 or cross_overlap < 0.5 * cross_min:
+            return False
+        # Ao longo da faixa, precisam se tocar (metades de um corte) ou se sobrepor
+        along_overlap = min(a[axis + 2], b[axis + 2]) - max(a[axis], b[axis])
+        if along_overlap < -self.EDGE_TOLERANCE:
+            return False
+        if self._cut_at_seam(a, lane_a) or self._cut_at_seam(b, lane_b):
+            return True
+        # Objeto inteiro visto pelas duas faixas na faixa de sobreposição
+        area_a = (a[2] - a[0]) * (a[3] - a[1])
+        area_b = (b[2] - b[0]) * (b[3] - b[1])
+        inter = max(along_overlap, 0) * cross_overlap
+        return inter >= 0.5 * min(area_a, area_b)
+
+    def merge_lanes(self, boxes, scores, class_ids, lanes):
+        """Funde caixas da mesma classe vistas por faixas diferentes que são o mesmo objeto.
+
+        Vale para as metades de um objeto cortado na costura e para o objeto
+        visto (inteiro ou cortado) pelas duas faixas na sobreposição. A caixa
+        resultante é a união, com o maior score. `lanes` é a faixa de cada caixa.
+        """
+        if self.lanes < 2 or len(boxes) < 2:
+            return boxes, scores, class_ids
+        boxes = boxes.copy()
+        scores = scores.copy()
+        keep = np.ones(len(boxes), dtype=bool)
+        for i in range(len(boxes)):
+            if not keep[i]:
+                continue
+            for j in range(i + 1, len(boxes)):
+                if (not keep[j] or lanes[i] == lanes[j] or class_ids[i] != class_ids[j]
+                        or not self._same_object(boxes[i], lanes[i], boxes[j], lanes[j])):
+                    continue
+                boxes[i, :2] = np.minimum(boxes[i, :2], boxes[j, :2])
+                boxes[i, 2:] = np.maximum(boxes[i, 2:], boxes[j, 2:])
+                scores[i] = max(scores[i], scores[j])
+                keep[j] = False
+        return boxes[keep], scores[keep], class_ids[keep]